@@ -0,0 +1,89 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Measure the per-keystroke cost of parsing raw fact strings.
+
+Simulates typing a long raw fact with many tags character by character. For
+each keystroke the text is parsed twice, once by ``RawFactEntry`` and once by
+its completion, just like it happens within the client.
+
+Usage:
+    python benchmarks/raw_fact_parser.py [--tags N] [--repeat N]
+"""
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import argparse
+import re
+import timeit
+
+from hamster_gtk import helpers
+
+
+def get_raw_fact(tags):
+    """Return a long raw fact string with ``tags`` tags."""
+    return '2016-02-01 12:00 - 2016-02-01 13:30 benchmarking@hamster-gtk {tags}, {desc}'.format(
+        tags=' '.join(['#tag{}'.format(index) for index in range(tags)]),
+        desc='Some lengthy description ' * 5,
+    )
+
+
+def compile_per_call(text):
+    """Parse like ``decompose_raw_fact_string`` used to: build and compile the regex each time."""
+    return re.compile(helpers._get_raw_fact_regex(), re.UNICODE).match(text)
+
+
+def precompiled(text):
+    """Parse with the precompiled pattern but without memoization."""
+    return helpers.raw_fact_parser.pattern.match(text)
+
+
+def memoized(text):
+    """Parse with the memoizing module level parser."""
+    return helpers.raw_fact_parser.parse(text)
+
+
+def type_text(parse, text):
+    """Feed each prefix of ``text`` to ``parse`` twice, as entry and completion do."""
+    for end in range(1, len(text) + 1):
+        prefix = text[:end]
+        parse(prefix)
+        parse(prefix)
+
+
+def main():
+    """Run the benchmark and print the per-keystroke cost of each variant."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tags', type=int, default=30, help="Amount of tags in the raw fact.")
+    parser.add_argument('--repeat', type=int, default=20, help="Amount of typing runs.")
+    args = parser.parse_args()
+
+    text = get_raw_fact(args.tags)
+    keystrokes = len(text) * args.repeat
+    print("Raw fact of {} characters with {} tags.".format(len(text), args.tags))
+    for variant in (compile_per_call, precompiled, memoized):
+        # Start each run with an empty cache, so typing new text is not for free.
+        helpers.raw_fact_parser._cache.clear()
+        seconds = timeit.timeit(lambda: type_text(variant, text), number=args.repeat)
+        print("{:>20}: {:8.2f} µs per keystroke".format(
+            variant.__name__, seconds / keystrokes * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- encoding: utf-8 -*-
+
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Run backend queries off the GTK main loop.
+
+Backend queries against large stores can take seconds. Running them on the
+main thread freezes the whole UI for that time. ``BackgroundWorker`` provides a
+single worker thread that processes such jobs one after another and hands
+their results back to the main loop.
+
+Note:
+    Backend sessions and connections must not be shared between threads (most
+    notably ``sqlite`` refuses to do so). This is why the worker creates its own
+    ``HamsterControl`` instance *within* its thread instead of reusing the one
+    owned by the application.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+
+import hamster_lib
+from gi.repository import GLib
+from six.moves import queue
+
+
+class BackgroundWorker(object):
+    """Process jobs in a dedicated thread with its own backend controller."""
+
+    def __init__(self, config):
+        """
+        Initialize worker.
+
+        The actual thread is only started once the first job is submitted.
+
+        Args:
+            config (dict): Backend config used to create the workers controller.
+        """
+        self._config = config
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, job, callback, *args):
+        """
+        Queue a job to be run by the worker thread.
+
+        Args:
+            job (callable): Will be called as ``job(controller, *args)`` within
+                the worker thread. ``controller`` is the workers own
+                ``HamsterControl`` instance.
+            callback (callable): Will be called as ``callback(result, error)``
+                within the main loop once the job is done. If the job raised,
+                ``result`` is ``None`` and ``error`` the exception instance.
+            *args: Additional positional arguments passed on to ``job``.
+        """
+        self._ensure_thread()
+        self._jobs.put((job, callback, args))
+
+    def update_config(self, config):
+        """Make sure all subsequent jobs use a controller based on ``config``."""
+        self._jobs.put((self._reconfigure, None, (config,)))
+
+    def stop(self):
+        """Signal the worker thread to terminate once all pending jobs are done."""
+        if self._thread:
+            self._jobs.put(None)
+
+    def _ensure_thread(self):
+        """Start the worker thread unless it is running already."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='hamster-gtk-worker')
+            # Do not keep the application alive because of an outstanding job.
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        """Main function of the worker thread."""
+        controller = None
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+
+            job, callback, args = item
+            if job == self._reconfigure:
+                controller = None
+                self._config = args[0]
+                continue
+
+            result, error = None, None
+            try:
+                if controller is None:
+                    controller = hamster_lib.HamsterControl(self._config)
+                result = job(controller, *args)
+            except Exception as err:
+                error = err
+            GLib.idle_add(self._deliver, callback, result, error)
+
+    def _reconfigure(self, config):
+        """Marker job. Handled by ``_run`` itself."""
+        pass
+
+    def _deliver(self, callback, result, error):
+        """Run a jobs callback within the main loop."""
+        callback(result, error)
+        # Make sure we are not called again by ``GLib.idle_add``.
+        return False
@@ -0,0 +1,30 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide the clock all durations and deadlines are measured with.
+
+This must not import GTK, as it is used by modules that are imported before
+(or without) it.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import time
+
+# ``time.monotonic`` is not available on python 2.
+clock = getattr(time, 'monotonic', time.time)
@@ -0,0 +1,140 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide *frecency* scores which combine frequency and recency of use.
+
+Each use contributes a weight that halves every ``half_life``. The score of a
+candidate is the sum of the weights of all its uses. As all scores decay at the
+same rate, we can store them relative to a fixed epoch instead of the current
+time. This keeps their order intact and means scores never have to be updated
+just because time passed. Weights relative to the epoch grow exponentially, so
+we keep the (natural) logarithm of each score instead of the score itself.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import math
+
+# Time after which the weight of a use has halved.
+DEFAULT_HALF_LIFE = datetime.timedelta(days=14)
+# Point in time scores are stored relative to.
+EPOCH = datetime.datetime(2016, 1, 1)
+
+
+class FrecencyScores(object):
+    """Decaying scores of arbitrary keys, maintained incrementally."""
+
+    def __init__(self, half_life=DEFAULT_HALF_LIFE):
+        """
+        Initialize empty scores.
+
+        Args:
+            half_life (datetime.timedelta, optional): Time after which the
+                weight of a use has halved.
+        """
+        self._half_life = half_life.total_seconds()
+        self._rate = math.log(2) / self._half_life
+        self._scores = {}
+
+    def __len__(self):
+        """Return the amount of keys with a score."""
+        return len(self._scores)
+
+    def __contains__(self, key):
+        """Check if ``key`` has a score."""
+        return key in self._scores
+
+    def get(self, key):
+        """
+        Return the logarithm of the score of ``key``, relative to ``EPOCH``.
+
+        This is only meaningful in comparison to other scores. Use
+        ``get_current`` for an absolute value.
+        """
+        return self._scores.get(key, float('-inf'))
+
+    def get_current(self, key, now=None):
+        """Return the score of ``key`` as of ``now``."""
+        if key not in self._scores:
+            return 0.0
+        if now is None:
+            now = datetime.datetime.now()
+        return math.exp(self.get(key) - self._get_log_weight(now))
+
+    def add_use(self, key, moment):
+        """Account for a use of ``key`` at ``moment``."""
+        weight = self._get_log_weight(moment)
+        if key not in self._scores:
+            self._scores[key] = weight
+            return
+        # log(exp(a) + exp(b)) without leaving the logarithmic domain.
+        high, low = max(self._scores[key], weight), min(self._scores[key], weight)
+        self._scores[key] = high + math.log1p(math.exp(low - high))
+
+    def remove_use(self, key, moment):
+        """Revert a use of ``key`` at ``moment`` that has been accounted for before."""
+        if key not in self._scores:
+            return
+        # log(exp(a) - exp(b)) without leaving the logarithmic domain.
+        difference = self._get_log_weight(moment) - self._scores[key]
+        # Allow for rounding errors once the last use got removed.
+        if difference >= -1e-9:
+            del self._scores[key]
+        else:
+            self._scores[key] += math.log1p(-math.exp(difference))
+
+    def clear(self):
+        """Drop all scores."""
+        self._scores.clear()
+
+    def dump(self):
+        """
+        Return all scores as JSON serializable dictionary.
+
+        Returns:
+            dict: Dictionary to be passed to ``restore`` later on.
+        """
+        return {
+            'half_life': self._half_life,
+            'scores': [list(key) + [score] for key, score in self._scores.items()],
+        }
+
+    def restore(self, data):
+        """
+        Replace all scores with the ones returned by ``dump``.
+
+        Args:
+            data (dict): Dictionary returned by ``dump``.
+
+        Returns:
+            bool: ``True`` if scores were restored. ``False`` if ``data`` can
+            not be used, in which case the scores are left untouched.
+        """
+        try:
+            if data['half_life'] != self._half_life:
+                return False
+            scores = {tuple(entry[:-1]): float(entry[-1]) for entry in data['scores']}
+        except (ValueError, KeyError, TypeError, IndexError):
+            return False
+        self._scores = scores
+        return True
+
+    def _get_log_weight(self, moment):
+        """Return the logarithm of the weight of a use at ``moment``, relative to ``EPOCH``."""
+        return self._rate * (moment - EPOCH).total_seconds()
@@ -0,0 +1,564 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide a long lived index of autocompletion candidates.
+
+Instead of collecting all candidates from scratch whenever a fact changes,
+the index keeps track of how many recent facts refer to each candidate and
+only inserts or removes the affected entries.
+
+The index is persisted between sessions, so usually all it takes at startup is
+reading a single file. It is only rebuilt from the database if the file can not
+be used or the database has been changed by someone else in the meantime.
+
+Candidates are kept in *models*. Each segment of a raw fact string has a model
+of its own, except for descriptions. Those are suggested per activity, so there
+is a description model for each activity instead.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import heapq
+import logging
+import os.path
+
+from hamster_lib.helpers import time as time_helpers
+from six import text_type
+
+from ..clock import clock as _clock
+from ..config import STORE_KEYS
+from . import storage
+from .frecency import FrecencyScores
+from .matching import CandidateIndex
+from .sources import (get_activity_key, get_activity_text, get_activity_usage,
+                      get_activity_uses, get_description_usage, get_tag_names, get_tag_usage)
+
+# Segments of a raw fact string we provide candidates for, regardless of activity.
+SEGMENTS = ('activity', 'category', 'activity+category', 'tags')
+# Segment we provide candidates for depending on the activity.
+DESCRIPTION_SEGMENT = 'description'
+
+# Maximum amount of candidates returned by ``CompletionIndex.match``.
+MAX_RESULTS = 50
+
+# Shorter texts are not matched fuzzily as almost anything would match.
+MIN_FUZZY_QUERY_LENGTH = 2
+
+# File within the users cache directory the index is persisted to.
+INDEX_FILE_NAME = 'completion-index.json'
+
+# Seconds to wait before populating again after a population failed. The delay
+# doubles with each further failure, up to ``MAX_POPULATE_RETRY_DELAY``.
+POPULATE_RETRY_DELAY = 5
+MAX_POPULATE_RETRY_DELAY = 300
+
+logger = logging.getLogger(__name__)
+
+# Config keys affecting which facts candidates are collected from.
+CONFIG_KEYS = STORE_KEYS | frozenset(('day_start', 'autocomplete_activities_range'))
+# Config keys whose change may bring up uses our current scores do not account for.
+RESCORE_CONFIG_KEYS = STORE_KEYS | frozenset(('autocomplete_activities_range',))
+
+
+class CompletionIndex(object):
+    """
+    Index of activity, category and tag names as well as descriptions used by recent facts.
+
+    For each segment the candidates matching a given text can be queried,
+    ranked by their *frecency*. The index is kept up to date as long as the
+    application is running.
+
+    The index is persisted by ``save`` and loaded again by the first
+    population, unless the database it has been built from has changed since.
+    As the usage statistics loaded are not recomputed, candidates that were
+    used within the reference frame before keep counting uses from outside of
+    it. Candidates not used within the reference frame at all are dropped.
+
+    Note:
+        The index is populated by the applications background worker. Until
+        it is ready no candidates are returned at all. Once it is,
+        ``completion-index-ready`` is emitted by the signal handler.
+    """
+
+    def __init__(self, app):
+        """
+        Initialize index.
+
+        Args:
+            app (hamster_gtk.HamsterGTK): Application instance.
+        """
+        self._app = app
+        self._populated = False
+        # Models are keyed by segment, description models by
+        # ``(DESCRIPTION_SEGMENT, activity)`` tuples.
+        self._candidates = {segment: CandidateIndex() for segment in SEGMENTS}
+        # Maps each model to a ``{text: [refcount, last_used]}`` dict.
+        self._usage = {segment: {} for segment in SEGMENTS}
+        # Facts starting before this are not accounted for.
+        self._window_start = None
+        # Keyed by ``(segment, text)`` tuples.
+        self._scores = FrecencyScores()
+        self._path = os.path.join(app._appdirs.user_cache_dir, INDEX_FILE_NAME)
+        # Identifier and modification time of the database the index
+        # reflects. Used to tell if a persisted index is still valid.
+        self._database = None
+        self._database_mtime = None
+        # Modification time of the database after our last commit, as long as
+        # nobody else changed it since the index has been populated. ``None``
+        # once someone did.
+        self._committed_mtime = None
+        self._watched_store = None
+        # Whether the background worker is populating the index right now.
+        self._populating = False
+        # ``None`` unless another population has been requested in the
+        # meantime. Its ``rescore`` argument otherwise.
+        self._repopulate = None
+        # Amount of populations failed in a row and when to try again.
+        self._failures = 0
+        self._retry_at = None
+
+        signal_handler = self._app.controller.signal_handler
+        signal_handler.connect('fact-added', self._on_fact_added)
+        signal_handler.connect('fact-updated', self._on_fact_updated)
+        signal_handler.connect('fact-removed', self._on_fact_removed)
+        signal_handler.connect('facts-changed', self._on_facts_changed)
+        signal_handler.connect('config-changed', self._on_config_changed)
+        self._watch_store()
+
+    def match(self, segment, text, limit=MAX_RESULTS, activity=None):
+        """
+        Return the best candidates of a segment matching ``text``.
+
+        Candidates starting with ``text`` come first, followed by those just
+        containing it. Each group is ranked by ``_get_score``. If there are
+        not enough of those, candidates matching ``text`` fuzzily are added,
+        ranked by how well they match.
+
+        Args:
+            segment (text_type): One of ``SEGMENTS`` or ``DESCRIPTION_SEGMENT``.
+            text (text_type): Text to be matched, case is ignored.
+            limit (int, optional): Maximum amount of candidates returned.
+            activity (text_type, optional): ``activity+category`` text of the
+                activity descriptions are suggested for. Only used for
+                ``DESCRIPTION_SEGMENT``.
+
+        Returns:
+            list: List of candidate texts. Empty as long as the index is not
+            populated.
+        """
+        if not self._populated:
+            self.ensure_populated()
+            return []
+
+        if segment == DESCRIPTION_SEGMENT:
+            model = (DESCRIPTION_SEGMENT, activity)
+        else:
+            model = segment
+        candidates = self._candidates.get(model)
+        if candidates is None:
+            return []
+
+        prefix_matches = candidates.get_prefix_matches(text)
+        result = self._rank(model, prefix_matches, limit)
+        if len(result) < limit:
+            substring_matches = candidates.get_substring_matches(text) - prefix_matches
+            result.extend(self._rank(model, substring_matches, limit - len(result)))
+        if len(result) < limit and len(text) >= MIN_FUZZY_QUERY_LENGTH:
+            fuzzy_matches = candidates.get_fuzzy_matches(
+                text, exclude=prefix_matches | substring_matches)
+            result.extend(heapq.nlargest(limit - len(result), fuzzy_matches,
+                key=lambda match: (fuzzy_matches[match], self._get_score(model, match))))
+        return result
+
+    def populate(self, rescore=False):
+        """
+        (Re-)build the index from recent usage of activities, tags and descriptions.
+
+        This blocks until all queries are done, see ``populate_async``.
+
+        The first population loads the persisted index instead, if possible.
+
+        Args:
+            rescore (bool, optional): If ``True`` frecency scores are recomputed
+                from all recent facts and no persisted index is loaded.
+                Otherwise scores are only recomputed if there are none yet.
+        """
+        start, end = self._get_window()
+        config = self._app._config
+        self._apply(start, self._collect(self._app.controller.store, config, start, end, rescore,
+                                         not self._populated))
+
+    def populate_async(self, rescore=False):
+        """
+        (Re-)build the index using the background worker.
+
+        This returns right away. Until the worker is done, the index keeps
+        serving its current candidates. If a population is running already,
+        another one is run once it finished.
+
+        Args:
+            rescore (bool, optional): See ``populate``.
+        """
+        if self._populating:
+            self._repopulate = bool(self._repopulate) or rescore
+            return
+        self._populating = True
+        self._app.startup_tracer.begin('populate completion index')
+        start, end = self._get_window()
+        self._app.worker.submit(self._collect_job, self._on_populated, self._app._config,
+                                start, end, rescore, not self._populated)
+
+    def ensure_populated(self):
+        """
+        Populate the index using the background worker, unless done already.
+
+        Unlike ``populate_async``, this does nothing if the index has been
+        populated already or is being populated right now. After a failed
+        population, this also waits for the retry delay to pass.
+        """
+        if self._populated or self._populating:
+            return
+        if self._retry_at is not None and _clock() < self._retry_at:
+            return
+        self.populate_async()
+
+    def save(self):
+        """
+        Persist the index, if it has been populated.
+
+        Nothing is persisted if the modification time of the database is not
+        known, as there would be no way to tell if the snapshot is still valid.
+        Failing to write the snapshot is logged but not raised, as this is
+        called upon shutdown.
+        """
+        if not self._populated or self._database_mtime is None:
+            return
+        try:
+            storage.write_snapshot(self._path, storage.IndexSnapshot(
+                self._database, self._database_mtime, self._window_start, self._usage,
+                self._scores.dump()))
+        except (IOError, OSError) as error:
+            logger.error("Failed to save the completion index to %s: %s", self._path, error)
+
+    def add_fact(self, fact):
+        """Account for a new fact."""
+        if self._populated and self._is_relevant(fact):
+            activity, category = get_activity_key(fact.activity)
+            self._add(self._get_fact_texts(fact), last_used=fact.start)
+            self._add_use(activity, category, fact.start)
+
+    def remove_fact(self, fact):
+        """Drop a fact that has been accounted for before."""
+        if self._populated and self._is_relevant(fact):
+            activity, category = get_activity_key(fact.activity)
+            self._remove(self._get_fact_texts(fact))
+            for segment, text in self._get_texts(activity, category):
+                self._scores.remove_use((segment, text), fact.start)
+
+    def _collect(self, store, config, start, end, rescore, load):
+        """
+        Collect everything needed to populate the index.
+
+        Note:
+            This may be run within the worker thread, so it must not change
+            the state of the index.
+
+        Args:
+            store (hamster_lib.storage.BaseStore): Store to be queried.
+            config (dict): Backend config ``store`` is based on.
+            start (datetime.datetime): Start of the reference frame.
+            end (datetime.datetime): End of the reference frame.
+            rescore (bool): Whether frecency scores are to be recomputed.
+            load (bool): Whether the persisted index is to be used if possible.
+
+        Returns:
+            tuple: ``(database, database_mtime, usage, candidates, scores)``
+            tuple. ``scores`` is a ``FrecencyScores`` instance, or ``None`` if
+            the current scores are to be kept.
+        """
+        database = storage.get_database_id(config)
+        database_mtime = storage.get_database_mtime(config)
+        if load and not rescore:
+            result = self._load(database, database_mtime, start)
+            if result:
+                return result
+
+        usage = {segment: {} for segment in SEGMENTS}
+        for item in self._get_usage(store, start, end):
+            for model, text in self._get_texts(item.activity, item.category):
+                _merge_usage(usage, model, text, item.count, item.last_used)
+        for item in self._get_tag_usage(store, start, end):
+            _merge_usage(usage, 'tags', item.tag, item.count, item.last_used)
+        for item in self._get_description_usage(store, start, end):
+            model = self._get_description_model(item.activity, item.category)
+            _merge_usage(usage, model, item.description, item.count, item.last_used)
+
+        scores = None
+        if rescore or load:
+            scores = FrecencyScores()
+            for use in self._get_uses(store, start, end):
+                for segment, text in self._get_texts(use.activity, use.category):
+                    scores.add_use((segment, text), use.start)
+        return (database, database_mtime, usage, _get_candidates(usage), scores)
+
+    def _load(self, database, database_mtime, start):
+        """
+        Return the persisted index in the form returned by ``_collect``.
+
+        Returns:
+            tuple: ``None`` if there is no persisted index or it does not
+            reflect the current state of the database. An unknown modification
+            time of the database counts as a change.
+        """
+        if database_mtime is None:
+            return None
+        snapshot = storage.read_snapshot(self._path)
+        if (snapshot is None or snapshot.database != database or
+                snapshot.database_mtime != database_mtime or snapshot.window_start > start):
+            return None
+        scores = FrecencyScores()
+        if not scores.restore(snapshot.scores):
+            return None
+        usage = {segment: {} for segment in SEGMENTS}
+        for model, entries in snapshot.usage.items():
+            entries = {text: entry for text, entry in entries.items()
+                       if not entry[1] or entry[1] >= start}
+            if entries or model in SEGMENTS:
+                usage[model] = entries
+        return (database, database_mtime, usage, _get_candidates(usage), scores)
+
+    def _collect_job(self, controller, config, start, end, rescore, load):
+        """Run ``_collect`` as background worker job."""
+        return (start, self._collect(controller.store, config, start, end, rescore, load))
+
+    def _apply(self, window_start, collected):
+        """Replace the contents of the index with what has been collected by ``_collect``."""
+        self._database, self._database_mtime, self._usage, self._candidates, scores = collected
+        self._committed_mtime = self._database_mtime
+        self._window_start = window_start
+        if scores is not None:
+            self._scores = scores
+        self._populated = True
+
+    def _add_use(self, activity, category, moment):
+        """Add a use at ``moment`` to the frecency scores of all texts of an activity."""
+        for segment, text in self._get_texts(activity, category):
+            self._scores.add_use((segment, text), moment)
+
+    def _add(self, texts, count=1, last_used=None):
+        """Increment the refcount of ``(model, text)`` tuples, adding them if required."""
+        for model, text in texts:
+            if _merge_usage(self._usage, model, text, count, last_used):
+                self._candidates.setdefault(model, CandidateIndex()).add(text)
+
+    def _remove(self, texts, count=1):
+        """Decrement the refcount of ``(model, text)`` tuples, removing unused ones."""
+        for model, text in texts:
+            usage = self._usage.get(model, {}).get(text)
+            if not usage:
+                continue
+            usage[0] -= count
+            if usage[0] <= 0:
+                del self._usage[model][text]
+                self._candidates[model].remove(text)
+                # Do not keep empty description models around.
+                if model not in SEGMENTS and not self._usage[model]:
+                    del self._usage[model]
+                    del self._candidates[model]
+
+    def _rank(self, model, texts, limit):
+        """Return the ``limit`` best scored of ``texts``, best first."""
+        return heapq.nlargest(limit, texts,
+            key=lambda text: self._get_score(model, text))
+
+    def _get_score(self, model, text):
+        """Return a sortable score of a candidate, based on its usage."""
+        count, last_used = self._usage[model][text]
+        # Ties are broken by name to get stable results.
+        return (self._scores.get((model, text)), count, last_used or datetime.datetime.min,
+                text)
+
+    def _get_texts(self, activity, category):
+        """Return ``(segment, text)`` tuples for each segment an activity is relevant to."""
+        result = [('activity', activity)]
+        if category:
+            result.append(('category', category))
+        result.append(('activity+category', get_activity_text(activity, category)))
+        return result
+
+    def _get_fact_texts(self, fact):
+        """Return ``(model, text)`` tuples for each model a fact is relevant to."""
+        activity, category = get_activity_key(fact.activity)
+        result = self._get_texts(activity, category)
+        result.extend([('tags', tag) for tag in get_tag_names(fact)])
+        if fact.description:
+            result.append((self._get_description_model(activity, category),
+                           text_type(fact.description)))
+        return result
+
+    def _get_description_model(self, activity, category):
+        """Return the key of the description model of an activity."""
+        return (DESCRIPTION_SEGMENT, get_activity_text(activity, category))
+
+    def _get_window(self):
+        """
+        Return the timeframe whose facts are considered for autocompletion.
+
+        This is the place where we define which reference frame should be used
+        for autocomplete suggestions.
+        """
+        config = self._app._config
+        today = datetime.date.today()
+        start = today - datetime.timedelta(days=config['autocomplete_activities_range'])
+        return (datetime.datetime.combine(start, config['day_start']),
+                time_helpers.end_day_to_datetime(today, config))
+
+    def _get_usage(self, store, start, end):
+        """Return ``ActivityUsage`` tuples for all activities used within the timeframe."""
+        return get_activity_usage(store, start, end)
+
+    def _get_tag_usage(self, store, start, end):
+        """Return ``TagUsage`` tuples for all tags used within the timeframe."""
+        return get_tag_usage(store, start, end)
+
+    def _get_description_usage(self, store, start, end):
+        """Return ``DescriptionUsage`` tuples for all descriptions used within the timeframe."""
+        return get_description_usage(store, start, end)
+
+    def _get_uses(self, store, start, end):
+        """Return ``ActivityUse`` tuples for each use of an activity within the timeframe."""
+        return get_activity_uses(store, start, end)
+
+    def _watch_store(self):
+        """Make sure commits of the current store are noticed."""
+        store = self._app.controller.store
+        if store is not self._watched_store:
+            self._watched_store = store
+            storage.watch_commits(store, self._on_before_commit, self._on_after_commit)
+
+    def _is_relevant(self, fact):
+        """Check if a stored fact falls within the autocompletion reference frame."""
+        # *Ongoing facts* have not been stored yet.
+        if fact.pk is None or not fact.end:
+            return False
+        return fact.start >= self._window_start
+
+    # Callbacks
+    def _on_populated(self, result, error):
+        """Callback triggered once the background worker collected all candidates."""
+        self._app.startup_tracer.end('populate completion index')
+        self._populating = False
+        rescore, self._repopulate = self._repopulate, None
+        if rescore is not None:
+            # The result is outdated already.
+            self.populate_async(rescore)
+        if error:
+            # Raising within the main loop would not reach anyone.
+            self._failures += 1
+            delay = min(POPULATE_RETRY_DELAY * 2 ** (self._failures - 1),
+                        MAX_POPULATE_RETRY_DELAY)
+            self._retry_at = _clock() + delay
+            logger.error("Populating the completion index failed, retrying in %s seconds: %s",
+                         delay, error)
+            # The index did not change, so there is nothing to announce.
+            return
+        self._failures = 0
+        self._retry_at = None
+        self._apply(*result)
+        self._app.controller.signal_handler.emit('completion-index-ready')
+
+    def _on_fact_added(self, sender, fact):
+        """Callback triggered when a fact has been added."""
+        self._on_fact_changed()
+        self.add_fact(fact)
+
+    def _on_fact_updated(self, sender, old_fact, new_fact):
+        """Callback triggered when a fact has been updated."""
+        self._on_fact_changed()
+        self.remove_fact(old_fact)
+        self.add_fact(new_fact)
+
+    def _on_fact_removed(self, sender, fact):
+        """Callback triggered when a fact has been removed."""
+        self._on_fact_changed()
+        self.remove_fact(fact)
+
+    def _on_fact_changed(self):
+        """Make sure changes are not lost because a population is running right now."""
+        if self._populating:
+            self.populate_async(rescore=True)
+        # Changes that only touched the tmpfile (such as starting an *ongoing
+        # fact*) did not commit anything, so this is the old value then.
+        self._database_mtime = self._committed_mtime
+
+    def _on_before_commit(self, session):
+        """Callback triggered right before the store commits to the database."""
+        if self._committed_mtime != storage.get_database_mtime(self._app._config):
+            # Someone else changed the database, so the index may not reflect it.
+            self._committed_mtime = None
+
+    def _on_after_commit(self, session):
+        """Callback triggered right after the store committed to the database."""
+        if self._committed_mtime is not None:
+            self._committed_mtime = storage.get_database_mtime(self._app._config)
+
+    def _on_facts_changed(self, sender):
+        """Callback triggered when arbitrary facts may have changed."""
+        if self._populated or self._populating:
+            self.populate_async(rescore=True)
+
+    def _on_config_changed(self, sender, keys):
+        """Callback triggered when the config changed. This may include the reference frame."""
+        if not keys & CONFIG_KEYS:
+            return
+        if keys & STORE_KEYS:
+            # The snapshot describes the previous database.
+            storage.remove_snapshot(self._path)
+            self._watch_store()
+        if self._populated or self._populating:
+            self.populate_async(rescore=bool(keys & RESCORE_CONFIG_KEYS))
+
+
+def _merge_usage(usage, model, text, count, last_used):
+    """
+    Add uses of ``text`` to a ``{model: {text: [count, last_used]}}`` dictionary.
+
+    Returns:
+        bool: ``True`` if ``text`` has been new to ``model``.
+    """
+    entries = usage.setdefault(model, {})
+    entry = entries.get(text)
+    if entry:
+        entry[0] += count
+        if last_used and (not entry[1] or last_used > entry[1]):
+            entry[1] = last_used
+        return False
+    entries[text] = [count, last_used]
+    return True
+
+
+def _get_candidates(usage):
+    """Return a ``CandidateIndex`` for each model of a usage dictionary."""
+    result = {}
+    for model, entries in usage.items():
+        candidates = CandidateIndex()
+        for text in entries:
+            candidates.add(text)
+        result[model] = candidates
+    return result
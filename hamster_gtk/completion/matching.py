@@ -0,0 +1,269 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide fast lookups of completion candidates matching a given text.
+
+Testing each candidate for a match does not scale to thousands of candidates
+when done on every keystroke. Instead candidates are indexed by their prefixes
+(a trie) and the n-grams they contain, so the set of matches can be determined
+by a few dictionary lookups.
+
+Fuzzy matching, where the characters of a query just have to appear in order,
+can not be indexed this way. It is scored similar to ``fzf`` and limited to a
+time budget per query instead.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+from ..clock import clock as _clock
+
+# Longest n-grams kept by ``CandidateIndex``. Longer queries intersect the
+# candidates of all their n-grams of this length.
+NGRAM_SIZE = 3
+
+# Time in seconds a single fuzzy query may take.
+FUZZY_BUDGET = 0.005
+# Amount of candidates scored between checks of the time budget.
+FUZZY_BUDGET_INTERVAL = 128
+
+# Fuzzy scoring parameters.
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 8
+BONUS_CONSECUTIVE = 8
+PENALTY_GAP_START = 3
+PENALTY_GAP_EXTENSION = 1
+PENALTY_TYPO = 16
+# Queries need to be at least that long to tolerate a typo.
+MIN_TYPO_QUERY_LENGTH = 4
+
+
+def casefold(text):
+    """Return ``text`` in a form suitable for case insensitive comparison."""
+    # ``str.casefold`` is not available on python 2.
+    return getattr(text, 'casefold', text.lower)()
+
+
+def _find_subsequence(query, folded):
+    """
+    Return the positions of the shortest occurrence of ``query`` as subsequence.
+
+    Returns:
+        tuple: ``(positions, None)`` on success, ``(None, index)`` otherwise.
+        ``index`` being the position of the first query character that could
+        not be found.
+    """
+    # Find the earliest end of a match, ...
+    position = 0
+    for index, character in enumerate(query):
+        position = folded.find(character, position)
+        if position < 0:
+            return (None, index)
+        position += 1
+    end = position
+    # ... then the latest start of a match with that end ...
+    for character in reversed(query):
+        position = folded.rfind(character, 0, position)
+    # ... and finally the positions within that window.
+    positions = []
+    for character in query:
+        position = folded.find(character, position, end)
+        positions.append(position)
+        position += 1
+    return (positions, None)
+
+
+def _score_positions(folded, positions):
+    """Return the score of a match at ``positions`` of ``folded``."""
+    score = 0
+    previous = None
+    for position in positions:
+        score += SCORE_MATCH
+        if position == 0 or not folded[position - 1].isalnum():
+            score += BONUS_BOUNDARY
+        if previous is not None:
+            gap = position - previous - 1
+            if gap:
+                score -= PENALTY_GAP_START + (gap - 1) * PENALTY_GAP_EXTENSION
+            else:
+                score += BONUS_CONSECUTIVE
+        previous = position
+    return score
+
+
+def fuzzy_score(query, folded):
+    """
+    Return how well ``folded`` matches ``query`` as a subsequence.
+
+    Matches are rewarded for consecutive characters and characters at word
+    boundaries and penalized for gaps. For queries of at least
+    ``MIN_TYPO_QUERY_LENGTH`` characters, a single character that can not be
+    found is tolerated at the cost of ``PENALTY_TYPO``.
+
+    Args:
+        query (text_type): Casefolded query.
+        folded (text_type): Casefolded candidate.
+
+    Returns:
+        int: Score, higher is better. ``None`` if ``folded`` does not match.
+    """
+    positions, missing = _find_subsequence(query, folded)
+    if positions is not None:
+        return _score_positions(folded, positions)
+    if len(query) < MIN_TYPO_QUERY_LENGTH:
+        return None
+    positions, missing = _find_subsequence(query[:missing] + query[missing + 1:], folded)
+    if positions is None:
+        return None
+    return _score_positions(folded, positions) - PENALTY_TYPO
+
+
+class CandidateIndex(object):
+    """
+    Index of candidate texts that supports prefix and substring queries.
+
+    All lookups are case insensitive.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        # Each trie node is a ``[children, texts]`` list, ``texts`` being all
+        # candidates whose folded form starts with the nodes prefix.
+        self._trie = [{}, set()]
+        # Maps each n-gram (of length 1 to ``NGRAM_SIZE``) to all candidates containing it.
+        self._ngrams = {}
+        # Maps candidates to their folded form.
+        self._folded = {}
+
+    def __len__(self):
+        """Return the amount of candidates."""
+        return len(self._folded)
+
+    def __contains__(self, text):
+        """Check if ``text`` is a candidate."""
+        return text in self._folded
+
+    def __iter__(self):
+        """Iterate over all candidates."""
+        return iter(self._folded)
+
+    def add(self, text):
+        """Add a candidate. Adding an existing candidate again has no effect."""
+        if text in self._folded:
+            return
+        folded = casefold(text)
+        self._folded[text] = folded
+
+        node = self._trie
+        node[1].add(text)
+        for character in folded:
+            node = node[0].setdefault(character, [{}, set()])
+            node[1].add(text)
+
+        for ngram in self._get_ngrams(folded):
+            self._ngrams.setdefault(ngram, set()).add(text)
+
+    def remove(self, text):
+        """
+        Remove a candidate.
+
+        Raises:
+            KeyError: If ``text`` is no candidate.
+        """
+        folded = self._folded.pop(text)
+
+        node = self._trie
+        node[1].discard(text)
+        for character in folded:
+            parent, node = node, node[0][character]
+            node[1].discard(text)
+            if not node[1]:
+                # No candidate is left below this node.
+                del parent[0][character]
+                break
+
+        for ngram in self._get_ngrams(folded):
+            texts = self._ngrams[ngram]
+            texts.discard(text)
+            if not texts:
+                del self._ngrams[ngram]
+
+    def clear(self):
+        """Remove all candidates."""
+        self.__init__()
+
+    def get_prefix_matches(self, query):
+        """Return a frozenset of the candidates starting with ``query``."""
+        node = self._trie
+        for character in casefold(query):
+            node = node[0].get(character)
+            if node is None:
+                return frozenset()
+        # The set is updated along with the index, so it must not be handed out.
+        return frozenset(node[1])
+
+    def get_substring_matches(self, query):
+        """Return a frozenset of the candidates containing ``query``."""
+        folded = casefold(query)
+        if not folded:
+            return frozenset(self._folded)
+        if len(folded) <= NGRAM_SIZE:
+            return frozenset(self._ngrams.get(folded, ()))
+
+        ngrams = sorted([self._ngrams.get(folded[index:index + NGRAM_SIZE], set())
+                         for index in range(len(folded) - NGRAM_SIZE + 1)], key=len)
+        # Start with the smallest set to keep the intersection cheap.
+        result = set(ngrams[0])
+        for texts in ngrams[1:]:
+            result.intersection_update(texts)
+            if not result:
+                return frozenset()
+        # Containing all n-grams does not imply containing them in order.
+        return frozenset(text for text in result if folded in self._folded[text])
+
+    def get_fuzzy_matches(self, query, exclude=(), budget=FUZZY_BUDGET):
+        """
+        Return candidates matching ``query`` fuzzily, along with their score.
+
+        Scoring stops once ``budget`` is exceeded, so the result may be
+        incomplete for huge amounts of candidates.
+
+        Args:
+            query (text_type): Text to be matched, case is ignored.
+            exclude (container, optional): Candidates not to be considered.
+            budget (float, optional): Time in seconds scoring may take.
+
+        Returns:
+            dict: Dictionary mapping matching candidates to their score.
+        """
+        folded_query = casefold(query)
+        result = {}
+        deadline = _clock() + budget
+        for count, (text, folded) in enumerate(self._folded.items(), 1):
+            if text not in exclude:
+                score = fuzzy_score(folded_query, folded)
+                if score is not None:
+                    result[text] = score
+            if not count % FUZZY_BUDGET_INTERVAL and _clock() > deadline:
+                break
+        return result
+
+    def _get_ngrams(self, folded):
+        """Return the set of all n-grams of length 1 to ``NGRAM_SIZE`` within ``folded``."""
+        return {folded[index:index + size]
+                for size in range(1, NGRAM_SIZE + 1)
+                for index in range(len(folded) - size + 1)}
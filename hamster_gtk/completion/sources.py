@@ -0,0 +1,267 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide the data autocompletion candidates are collected from.
+
+All we need to know for autocompletion is which activity/category pairs, tags
+and descriptions have been used recently, how often and when. Loading all recent
+facts including all their relations just to find out would be quite a waste.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import operator
+from collections import namedtuple
+
+from six import text_type
+
+ActivityUsage = namedtuple('ActivityUsage', ('activity', 'category', 'count', 'last_used'))
+ActivityUse = namedtuple('ActivityUse', ('activity', 'category', 'start'))
+TagUsage = namedtuple('TagUsage', ('tag', 'count', 'last_used'))
+DescriptionUsage = namedtuple('DescriptionUsage', ('activity', 'category', 'description',
+                                                   'count', 'last_used'))
+
+
+def _is_sqlalchemy_store(store):
+    """
+    Check if ``store`` is SQLAlchemy based.
+
+    The backend is only imported once it is used, as importing SQLAlchemy takes
+    a while and is not needed to start the application.
+    """
+    from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
+    return isinstance(store, SQLAlchemyStore)
+
+
+def get_activity_usage(store, start, end):
+    """
+    Return usage statistics of all activities used by facts within a timeframe.
+
+    For SQLAlchemy based stores this is a single aggregated query. Any other
+    store falls back to fetching and aggregating all facts within the timeframe.
+
+    Args:
+        store (hamster_lib.storage.BaseStore): Store to be queried.
+        start (datetime.datetime): Start of the timeframe.
+        end (datetime.datetime): End of the timeframe.
+
+    Returns:
+        list: List of ``ActivityUsage`` tuples, most recently used first.
+        ``activity`` and ``category`` are names, the latter may be ``None``.
+    """
+    if _is_sqlalchemy_store(store):
+        return _query_activity_usage(store.session, start, end)
+    return aggregate_activity_usage(store.facts.get_all(start, end))
+
+
+def _query_activity_usage(session, start, end):
+    """Return ``ActivityUsage`` tuples as computed by the database."""
+    from hamster_lib.backends.sqlalchemy.objects import (AlchemyActivity, AlchemyCategory,
+                                                         AlchemyFact)
+    from sqlalchemy import func
+
+    last_used = func.max(AlchemyFact.start)
+    query = session.query(
+        AlchemyActivity.name, AlchemyCategory.name, func.count(AlchemyFact.pk), last_used,
+    ).select_from(AlchemyFact).join(AlchemyFact.activity).outerjoin(AlchemyActivity.category)
+    query = query.filter(AlchemyFact.start >= start, AlchemyFact.end <= end)
+    query = query.group_by(AlchemyActivity.pk, AlchemyActivity.name, AlchemyCategory.name)
+    query = query.order_by(last_used.desc())
+    return [ActivityUsage(*row) for row in query]
+
+
+def get_activity_uses(store, start, end):
+    """
+    Return each use of an activity by a fact within a timeframe.
+
+    This is what is needed to compute scores that depend on each individual
+    use. Only the names and the facts start are transferred.
+
+    Args:
+        store (hamster_lib.storage.BaseStore): Store to be queried.
+        start (datetime.datetime): Start of the timeframe.
+        end (datetime.datetime): End of the timeframe.
+
+    Returns:
+        list: List of ``ActivityUse`` tuples.
+    """
+    if _is_sqlalchemy_store(store):
+        from hamster_lib.backends.sqlalchemy.objects import (AlchemyActivity, AlchemyCategory,
+                                                             AlchemyFact)
+
+        query = store.session.query(
+            AlchemyActivity.name, AlchemyCategory.name, AlchemyFact.start,
+        ).select_from(AlchemyFact).join(AlchemyFact.activity).outerjoin(AlchemyActivity.category)
+        query = query.filter(AlchemyFact.start >= start, AlchemyFact.end <= end)
+        return [ActivityUse(*row) for row in query]
+    return [ActivityUse(*(get_activity_key(fact.activity) + (fact.start,)))
+            for fact in store.facts.get_all(start, end)]
+
+
+def get_tag_usage(store, start, end):
+    """
+    Return usage statistics of all tags used by facts within a timeframe.
+
+    Args:
+        store (hamster_lib.storage.BaseStore): Store to be queried.
+        start (datetime.datetime): Start of the timeframe.
+        end (datetime.datetime): End of the timeframe.
+
+    Returns:
+        list: List of ``TagUsage`` tuples, most recently used first.
+    """
+    if _is_sqlalchemy_store(store):
+        from hamster_lib.backends.sqlalchemy.objects import AlchemyFact, AlchemyTag
+        from sqlalchemy import func
+
+        last_used = func.max(AlchemyFact.start)
+        query = store.session.query(
+            AlchemyTag.name, func.count(AlchemyFact.pk), last_used,
+        ).select_from(AlchemyFact).join(AlchemyFact.tags)
+        query = query.filter(AlchemyFact.start >= start, AlchemyFact.end <= end)
+        query = query.group_by(AlchemyTag.pk, AlchemyTag.name).order_by(last_used.desc())
+        return [TagUsage(*row) for row in query]
+    return aggregate_tag_usage(store.facts.get_all(start, end))
+
+
+def get_description_usage(store, start, end):
+    """
+    Return usage statistics of all descriptions of facts within a timeframe.
+
+    Descriptions are accounted for per activity, facts without a description
+    are ignored.
+
+    Args:
+        store (hamster_lib.storage.BaseStore): Store to be queried.
+        start (datetime.datetime): Start of the timeframe.
+        end (datetime.datetime): End of the timeframe.
+
+    Returns:
+        list: List of ``DescriptionUsage`` tuples, most recently used first.
+    """
+    if _is_sqlalchemy_store(store):
+        from hamster_lib.backends.sqlalchemy.objects import (AlchemyActivity, AlchemyCategory,
+                                                             AlchemyFact)
+        from sqlalchemy import func
+
+        last_used = func.max(AlchemyFact.start)
+        query = store.session.query(
+            AlchemyActivity.name, AlchemyCategory.name, AlchemyFact.description,
+            func.count(AlchemyFact.pk), last_used,
+        ).select_from(AlchemyFact).join(AlchemyFact.activity).outerjoin(AlchemyActivity.category)
+        query = query.filter(AlchemyFact.start >= start, AlchemyFact.end <= end,
+                             AlchemyFact.description.isnot(None),
+                             AlchemyFact.description != '')
+        query = query.group_by(AlchemyActivity.pk, AlchemyActivity.name, AlchemyCategory.name,
+                               AlchemyFact.description)
+        query = query.order_by(last_used.desc())
+        return [DescriptionUsage(*row) for row in query]
+    return aggregate_description_usage(store.facts.get_all(start, end))
+
+
+def aggregate_activity_usage(facts):
+    """
+    Return ``ActivityUsage`` tuples for all activities referred to by ``facts``.
+
+    Args:
+        facts (iterable): Iterable of ``hamster_lib.Fact`` instances.
+
+    Returns:
+        list: List of ``ActivityUsage`` tuples, most recently used first.
+    """
+    usage = _aggregate_usage(
+        (get_activity_key(fact.activity), fact.start) for fact in facts)
+    return [ActivityUsage(activity, category, count, last_used)
+            for (activity, category), count, last_used in usage]
+
+
+def aggregate_tag_usage(facts):
+    """
+    Return ``TagUsage`` tuples for all tags referred to by ``facts``.
+
+    Args:
+        facts (iterable): Iterable of ``hamster_lib.Fact`` instances.
+
+    Returns:
+        list: List of ``TagUsage`` tuples, most recently used first.
+    """
+    usage = _aggregate_usage(
+        (tag, fact.start) for fact in facts for tag in get_tag_names(fact))
+    return [TagUsage(*item) for item in usage]
+
+
+def aggregate_description_usage(facts):
+    """
+    Return ``DescriptionUsage`` tuples for all descriptions of ``facts``.
+
+    Args:
+        facts (iterable): Iterable of ``hamster_lib.Fact`` instances.
+
+    Returns:
+        list: List of ``DescriptionUsage`` tuples, most recently used first.
+    """
+    usage = _aggregate_usage(
+        (get_activity_key(fact.activity) + (text_type(fact.description),), fact.start)
+        for fact in facts if fact.description)
+    return [DescriptionUsage(activity, category, description, count, last_used)
+            for (activity, category, description), count, last_used in usage]
+
+
+def _aggregate_usage(uses):
+    """
+    Count ``(key, start)`` tuples per key and keep the latest start.
+
+    Returns:
+        list: List of ``(key, count, last_used)`` tuples, most recently used first.
+    """
+    usage = {}
+    for key, start in uses:
+        count, last_used = usage.get(key, (0, start))
+        usage[key] = (count + 1, max(last_used, start))
+    result = [(key, count, last_used) for key, (count, last_used) in usage.items()]
+    return sorted(result, key=operator.itemgetter(2), reverse=True)
+
+
+def get_tag_names(fact):
+    """Return the names of all tags of ``hamster_lib.Fact``."""
+    return [text_type(tag.name) for tag in fact.tags]
+
+
+def get_activity_key(activity):
+    """Return an ``(activity name, category name)`` tuple for ``hamster_lib.Activity``."""
+    if activity.category:
+        category = text_type(activity.category.name)
+    else:
+        category = None
+    return (text_type(activity.name), category)
+
+
+def get_activity_text(activity, category):
+    """
+    Return the ``activity+category`` text of an activity.
+
+    Args:
+        activity (text_type): Name of the activity.
+        category (text_type): Name of its category, may be ``None``.
+
+    Returns:
+        text_type: ``activity@category``, or just ``activity`` if there is no category.
+    """
+    if category:
+        return '{activity}@{category}'.format(activity=activity, category=category)
+    return activity
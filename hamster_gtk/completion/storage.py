@@ -0,0 +1,166 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Persist the completion index between sessions.
+
+The whole index is written to a single, compact JSON file. Reading it back is
+a lot cheaper than aggregating all recent facts again. As the file is nothing
+but a cache, anything unexpected about it just means it is not used.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import io
+import json
+import os
+from collections import namedtuple
+
+from six import string_types, text_type
+
+from .frecency import EPOCH
+
+# Bump this whenever the file format changes.
+INDEX_VERSION = 1
+
+# ``usage`` maps each model key to a ``{text: [count, last_used]}`` dict.
+# ``scores`` is what ``FrecencyScores.dump`` returned.
+IndexSnapshot = namedtuple('IndexSnapshot', ('database', 'database_mtime', 'window_start',
+                                             'usage', 'scores'))
+
+
+def write_snapshot(path, snapshot):
+    """
+    Write an ``IndexSnapshot`` to ``path``.
+
+    Args:
+        path (text_type): Path of the file to be (over-)written.
+        snapshot (IndexSnapshot): Snapshot to be written.
+    """
+    data = {
+        'version': INDEX_VERSION,
+        'database': snapshot.database,
+        'database_mtime': snapshot.database_mtime,
+        'window_start': _encode_moment(snapshot.window_start),
+        'usage': [[model, [[text, count, _encode_moment(last_used)]
+                           for text, (count, last_used) in entries.items()]]
+                  for model, entries in snapshot.usage.items()],
+        'scores': snapshot.scores,
+    }
+    # Write to a temporary file first so we never leave a truncated file behind.
+    tmp_path = '{}.tmp'.format(path)
+    with io.open(tmp_path, 'w', encoding='utf-8') as fobj:
+        fobj.write(text_type(json.dumps(data, ensure_ascii=False, separators=(',', ':'))))
+    os.rename(tmp_path, path)
+
+
+def read_snapshot(path):
+    """
+    Read an ``IndexSnapshot`` written by ``write_snapshot``.
+
+    Args:
+        path (text_type): Path of the file to be read.
+
+    Returns:
+        IndexSnapshot: The snapshot stored, or ``None`` if the file does not
+        exist, is invalid or has been written by a different version.
+    """
+    try:
+        with io.open(path, encoding='utf-8') as fobj:
+            data = json.loads(fobj.read())
+        if data['version'] != INDEX_VERSION:
+            return None
+        usage = {}
+        for model, entries in data['usage']:
+            if not isinstance(model, string_types):
+                model = tuple(model)
+            usage[model] = {text: [count, _decode_moment(last_used)]
+                            for text, count, last_used in entries}
+        return IndexSnapshot(data['database'], data['database_mtime'],
+                             _decode_moment(data['window_start']), usage, data['scores'])
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def remove_snapshot(path):
+    """Remove the snapshot at ``path``, if there is any."""
+    try:
+        os.remove(path)
+    except (IOError, OSError):
+        pass
+
+
+def watch_commits(store, before, after):
+    """
+    Have callbacks triggered around each commit of a store to its database.
+
+    Args:
+        store (hamster_lib.storage.BaseStore): Store to be watched.
+        before (callable): Called with the session right before each commit.
+        after (callable): Called with the session right after each commit.
+
+    Returns:
+        bool: Whether ``store`` can be watched at all. Only SQLAlchemy based
+        stores can.
+    """
+    from hamster_lib.backends.sqlalchemy.storage import SQLAlchemyStore
+    from sqlalchemy import event
+
+    if not isinstance(store, SQLAlchemyStore):
+        return False
+    event.listen(store.session, 'before_commit', before)
+    event.listen(store.session, 'after_commit', after)
+    return True
+
+
+def get_database_id(config):
+    """Return a text identifying the database used by a given backend config."""
+    if config['db_engine'] == 'sqlite':
+        return config['db_path']
+    return '{engine}://{user}@{host}:{port}/{name}'.format(
+        engine=config['db_engine'], user=config.get('db_user'), host=config.get('db_host'),
+        port=config.get('db_port'), name=config.get('db_name'))
+
+
+def get_database_mtime(config):
+    """
+    Return the modification time of the database file used by a given backend config.
+
+    Returns:
+        float: Modification time or ``None`` if the database is no (existing) file.
+    """
+    if config['db_engine'] != 'sqlite':
+        return None
+    try:
+        return os.path.getmtime(config['db_path'])
+    except (IOError, OSError):
+        return None
+
+
+def _encode_moment(moment):
+    """Return ``datetime.datetime`` as seconds since ``EPOCH``. ``None`` is kept."""
+    if moment is None:
+        return None
+    return (moment - EPOCH).total_seconds()
+
+
+def _decode_moment(seconds):
+    """Return the ``datetime.datetime`` represented by seconds since ``EPOCH``."""
+    if seconds is None:
+        return None
+    return EPOCH + datetime.timedelta(seconds=seconds)
@@ -0,0 +1,151 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide a cache of the config parsed from our config file.
+
+Parsing the file involves converting each value to its proper type. As long as
+the file does not change, there is no need to do this more than once.
+
+Once the config is saved, ``config-changed`` is emitted with the set of keys
+that changed. The key sets defined here tell listeners whether they are affected.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# Config keys whose change requires a new backend store, as they may point to
+# another database.
+STORE_KEYS = frozenset(('store', 'db_engine', 'db_path', 'db_host', 'db_port', 'db_name',
+                        'db_user', 'db_password'))
+# Config keys used by the backend.
+BACKEND_KEYS = STORE_KEYS | frozenset(('day_start', 'fact_min_delta', 'tmpfile_path'))
+
+
+def get_changed_keys(old, new):
+    """
+    Return the keys whose values differ between two configs.
+
+    Args:
+        old (collections.Mapping): Previous config.
+        new (collections.Mapping): New config.
+
+    Returns:
+        frozenset: Keys that have been added, removed or changed.
+    """
+    return frozenset(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+
+class Config(Mapping):
+    """
+    Immutable config dictionary.
+
+    As instances are shared by all parts of the application, none of them may
+    change it. To change the config, save a new dictionary instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize config. Takes the same arguments as ``dict``."""
+        self._values = dict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        """Return the value of ``key``."""
+        return self._values[key]
+
+    def __iter__(self):
+        """Return an iterator over all keys."""
+        return iter(self._values)
+
+    def __len__(self):
+        """Return the amount of keys."""
+        return len(self._values)
+
+    def __repr__(self):
+        """Return a representation including all values."""
+        return '{}({!r})'.format(self.__class__.__name__, self._values)
+
+
+class ConfigCache(object):
+    """
+    Cache the config parsed from a file for as long as the file is unchanged.
+
+    Whether the file changed is determined by its inode, modification time and
+    size, so replacing it counts as a change as well.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize cache.
+
+        Args:
+            path (text_type): Path of the config file.
+        """
+        self._path = path
+        self._config = None
+        self._stamp = None
+
+    def get(self, load):
+        """
+        Return the config, parsing the file again only if it changed.
+
+        Args:
+            load (callable): Called without arguments to parse the file. Returns a
+                config dictionary.
+
+        Returns:
+            Config: Current config.
+        """
+        stamp = self._get_stamp()
+        if self._config is None or stamp is None or stamp != self._stamp:
+            config = Config(load())
+            # ``load`` may have created the file in the first place.
+            self._stamp = stamp or self._get_stamp()
+            self._config = config
+        return self._config
+
+    def set(self, config):
+        """
+        Use a config just written to the file without parsing it again.
+
+        Args:
+            config (dict): Config dictionary that has been written.
+
+        Returns:
+            Config: The config now cached.
+        """
+        self._config = Config(config)
+        self._stamp = self._get_stamp()
+        return self._config
+
+    def invalidate(self):
+        """Make sure the file is parsed again on the next ``get``."""
+        self._config = None
+        self._stamp = None
+
+    def _get_stamp(self):
+        """Return a tuple that changes whenever the file does, ``None`` if there is no file."""
+        try:
+            stat = os.stat(self._path)
+        except (IOError, OSError):
+            return None
+        return (stat.st_ino, stat.st_mtime, stat.st_size)
@@ -0,0 +1,197 @@
+# -*- encoding: utf-8 -*-
+
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Provide a per-day cache of facts used by the overview.
+
+Browsing the overview back and forth queries overlapping dateranges. Instead of
+asking the backend each time, we keep the facts of recently used days around.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import threading
+from collections import OrderedDict
+from gettext import gettext as _
+
+from hamster_lib.helpers import time as time_helpers
+
+# Amount of days kept in the cache before the least recently used ones are dropped.
+DEFAULT_CACHE_SIZE = 366
+
+
+class FactCache(object):
+    """
+    Least recently used cache of facts, keyed by the day they started.
+
+    'Days' are *work days* in the sense of ``day_start``. Each cached day
+    holds all facts that started on this day, regardless of when they end.
+
+    Note:
+        The cache may be accessed from the background worker thread as well.
+        All access to the cached data is therefore guarded by a lock.
+    """
+
+    def __init__(self, config, size=DEFAULT_CACHE_SIZE):
+        """
+        Initialize cache.
+
+        Args:
+            config (dict): Config dictionary. Needed to determine ``day_start``.
+            size (int, optional): Maximum amount of days to be kept.
+        """
+        self._config = config
+        self._size = size
+        self._days = OrderedDict()
+        self._lock = threading.Lock()
+        # Incremented on each invalidation so that results of queries that
+        # were running at that time are not stored.
+        self._generation = 0
+
+    def get_facts(self, store, start, end):
+        """
+        Return all facts that start and end within the given daterange.
+
+        This mirrors the semantics of ``FactManager.get_all`` for ``datetime.date``
+        arguments, but only queries the backend for days that are not cached yet.
+
+        Args:
+            store (hamster_lib.storage.BaseStore): Store to be queried for any
+                missing day.
+            start (datetime.date): First day of the range.
+            end (datetime.date): Last day of the range.
+
+        Returns:
+            list: List of ``hamster_lib.Fact`` instances.
+
+        Raises:
+            TypeError: If ``start`` or ``end`` are not ``datetime.date`` instances.
+            ValueError: If ``end`` is before ``start``.
+        """
+        for value in (start, end):
+            if not isinstance(value, datetime.date) or isinstance(value, datetime.datetime):
+                raise TypeError(_("You need to pass 'datetime.date' instances."))
+        if end < start:
+            raise ValueError(_("End value can not be earlier than start!"))
+
+        days = self._get_days(start, end)
+        with self._lock:
+            generation = self._generation
+            cached = {day: self._days[day] for day in days if day in self._days}
+
+        for run_start, run_end in self._get_missing_runs(days, cached):
+            fetched = self._fetch(store, run_start, run_end)
+            cached.update(fetched)
+            with self._lock:
+                if generation == self._generation:
+                    self._days.update(fetched)
+
+        with self._lock:
+            for day in days:
+                # Mark as most recently used.
+                if day in self._days:
+                    self._days[day] = self._days.pop(day)
+            while len(self._days) > self._size:
+                self._days.popitem(last=False)
+
+        range_end = time_helpers.end_day_to_datetime(end, self._config)
+        result = []
+        for day in days:
+            result.extend([fact for fact in cached[day] if fact.end <= range_end])
+        return result
+
+    def invalidate(self, days=None):
+        """
+        Drop cached facts.
+
+        Args:
+            days (iterable, optional): Days to be dropped. If ``None`` the whole
+                cache is cleared.
+        """
+        with self._lock:
+            self._generation += 1
+            if days is None:
+                self._days.clear()
+            else:
+                for day in days:
+                    self._days.pop(day, None)
+
+    def invalidate_fact(self, fact):
+        """Drop all cached days affected by a given fact."""
+        if fact.start:
+            self.invalidate([self.get_day(fact.start)])
+
+    def update_config(self, config):
+        """Use a new config. As this may affect any cached day, the cache is cleared."""
+        self._config = config
+        self.invalidate()
+
+    def get_day(self, moment):
+        """Return the (work) day a given ``datetime.datetime`` belongs to."""
+        day_start = self._config['day_start']
+        offset = datetime.timedelta(hours=day_start.hour, minutes=day_start.minute,
+                                    seconds=day_start.second)
+        return (moment - offset).date()
+
+    def _get_days(self, start, end):
+        """Return a list of all days from ``start`` to ``end`` (inclusive)."""
+        return [start + datetime.timedelta(days=offset)
+                for offset in range((end - start).days + 1)]
+
+    def _get_missing_runs(self, days, cached):
+        """Return ``(start, end)`` tuples for each consecutive run of uncached days."""
+        runs = []
+        run_start = None
+        for day in days:
+            if day not in cached:
+                if run_start is None:
+                    run_start = day
+                run_end = day
+            elif run_start is not None:
+                runs.append((run_start, run_end))
+                run_start = None
+        if run_start is not None:
+            runs.append((run_start, run_end))
+        return runs
+
+    def _fetch(self, store, start, end):
+        """
+        Query the backend for all facts starting within the given range.
+
+        Returns:
+            dict: Dictionary with one (possibly empty) list of facts for each day.
+        """
+        result = {day: [] for day in self._get_days(start, end)}
+        # The public ``get_all`` only returns facts that also *end* within the
+        # range. We need all facts *starting* within the range instead so each
+        # day is complete regardless of the range it is queried for later on.
+        # Only the private ``_get_all`` supports this (``partial``), which is
+        # why ``setup.py`` pins ``hamster-lib`` to the release series it has
+        # been checked against.
+        facts = store.facts._get_all(
+            datetime.datetime.combine(start, self._config['day_start']),
+            time_helpers.end_day_to_datetime(end, self._config),
+            partial=True,
+        )
+        for fact in facts:
+            day = self.get_day(fact.start)
+            if day in result:
+                result[day].append(fact)
+        return result
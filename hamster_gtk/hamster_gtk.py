@@ -22,9 +22,11 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import contextlib
 import datetime
 import os.path
 import traceback
+from collections import OrderedDict
 from gettext import gettext as _
 
 import gi
@@ -35,22 +37,36 @@ import hamster_lib
 # under python 2 is practically non existing and manual encoding is not easily
 # possible.
 from configparser import SafeConfigParser
-from gi.repository import Gdk, Gio, GObject, Gtk
+from gi.repository import Gdk, Gio, GLib, GObject, Gtk
 from hamster_lib.helpers import config_helpers
 from six import text_type
 
-from hamster_gtk.misc import HamsterAboutDialog as AboutDialog
-from hamster_gtk.overview import OverviewDialog
-from hamster_gtk.preferences import PreferencesDialog
+from hamster_gtk.background import BackgroundWorker
+from hamster_gtk.completion import CompletionIndex
+from hamster_gtk.config import BACKEND_KEYS, STORE_KEYS, ConfigCache, get_changed_keys
+from hamster_gtk.fact_cache import FactCache
+from hamster_gtk.helpers import _u
+from hamster_gtk.launcher import APPLICATION_ID
+from hamster_gtk.profiling import (KEYSTROKE_METRICS, KeystrokeProfiler, StartupTracer,
+                                   is_keystroke_profiling_enabled)
 from hamster_gtk.tracking import TrackingScreen
 
 
 APP_NAME = 'Hamster-GTK'
 DEFAULT_WINDOW_SIZE = (400, 200)
+CONFIG_FILE_NAME = 'hamster-gtk.conf'
 
 resources_path = os.path.join(os.path.dirname(__file__), 'resources/hamster-gtk.gresource')
-resources = Gio.resource_load(resources_path)
-Gio.resources_register(resources)
+# Only loaded once the application starts up, see ``register_resources``.
+resources = None
+
+
+def register_resources():
+    """Load and register our ``Gio.Resource`` bundle unless done already."""
+    global resources
+    if resources is None:
+        resources = Gio.resource_load(resources_path)
+        Gio.resources_register(resources)
 
 
 class HeaderBar(Gtk.HeaderBar):
@@ -95,16 +111,19 @@ class MainWindow(Gtk.ApplicationWindow):
         self.set_default_size(*DEFAULT_WINDOW_SIZE)
 
         # Setup css
-        style_provider = Gtk.CssProvider()
-        style_provider.load_from_resource('/org/projecthamster/hamster-gtk/css/hamster-gtk.css')
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(),
-            style_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        with self.app.startup_tracer.span('load CSS'):
+            style_provider = Gtk.CssProvider()
+            style_provider.load_from_resource(
+                '/org/projecthamster/hamster-gtk/css/hamster-gtk.css')
+            Gtk.StyleContext.add_provider_for_screen(
+                Gdk.Screen.get_default(),
+                style_provider,
+                Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+            )
 
         # Set tracking as default screen at startup.
-        self.add(TrackingScreen(self.app))
+        with self.app.startup_tracer.span('create TrackingScreen'):
+            self.add(TrackingScreen(self.app))
 
 
 # [FIXME]
@@ -115,35 +134,131 @@ class SignalHandler(GObject.GObject):
 
     Once signals have been 'registered' here you can ``emit`` or ``connect`` to
     them via its class instances.
+
+    Changes to individual facts are announced by ``fact-added``, ``fact-updated``
+    (passing the old and the new fact) and ``fact-removed``. This allows listeners
+    to update just what is affected. ``facts-changed`` is reserved for changes
+    where we can not tell which facts have been affected. Listeners should
+    assume that any fact may have changed.
+
+    ``config-changed`` passes the ``frozenset`` of config keys that changed, so
+    listeners can skip anything that does not concern them.
+
+    As listeners react to ``facts-changed`` and ``config-changed`` with expensive
+    reloads, emissions of those signals are coalesced: No matter how often they
+    are emitted within one main loop iteration, listeners are called only once.
+    The sets of keys passed by ``config-changed`` emissions are merged for this.
+    Use :meth:`batch` to extend this to an arbitrary block of code.
+
+    ``completion-index-ready`` is emitted whenever the applications
+    ``CompletionIndex`` has been (re-)populated in the background.
     """
 
+    # Signals whose emissions are coalesced. All their arguments must be sets.
+    COALESCED_SIGNALS = ('facts-changed', 'config-changed')
+
     __gsignals__ = {
         str('facts-changed'): (GObject.SIGNAL_RUN_LAST, None, ()),
+        str('fact-added'): (GObject.SIGNAL_RUN_LAST, None, (GObject.TYPE_PYOBJECT,)),
+        str('fact-updated'): (GObject.SIGNAL_RUN_LAST, None, (GObject.TYPE_PYOBJECT,
+                                                              GObject.TYPE_PYOBJECT)),
+        str('fact-removed'): (GObject.SIGNAL_RUN_LAST, None, (GObject.TYPE_PYOBJECT,)),
         str('daterange-changed'): (GObject.SIGNAL_RUN_LAST, None, (GObject.TYPE_PYOBJECT,)),
-        str('config-changed'): (GObject.SIGNAL_RUN_LAST, None, ()),
+        str('config-changed'): (GObject.SIGNAL_RUN_LAST, None, (GObject.TYPE_PYOBJECT,)),
+        str('completion-index-ready'): (GObject.SIGNAL_RUN_LAST, None, ()),
     }
 
     def __init__(self):
         """Initialize instance."""
         super(SignalHandler, self).__init__()
+        # Coalesced signals emitted but not delivered yet, and their arguments.
+        self._pending = OrderedDict()
+        self._flush_source = None
+        self._batch_depth = 0
+
+    def emit(self, signal_name, *args):
+        """
+        Emit a signal.
+
+        Coalesced signals are not delivered right away but once the main loop
+        is idle (or the outermost :meth:`batch` is left).
+        """
+        if signal_name not in self.COALESCED_SIGNALS:
+            return super(SignalHandler, self).emit(signal_name, *args)
+
+        if signal_name in self._pending:
+            args = tuple(frozenset(pending).union(arg)
+                         for pending, arg in zip(self._pending[signal_name], args))
+        self._pending[signal_name] = args
+        if not self._batch_depth and self._flush_source is None:
+            self._flush_source = GLib.idle_add(self._on_idle_flush)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager to deliver coalesced signals only once the block is left.
+
+        This is meant for bulk operations. Batches may be nested.
+
+        Example:
+            with signal_handler.batch():
+                for fact in facts:
+                    store.facts.save(fact)
+                    signal_handler.emit('facts-changed')
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        """Deliver all pending coalesced signals right away."""
+        if self._flush_source is not None:
+            GLib.source_remove(self._flush_source)
+            self._flush_source = None
+        pending, self._pending = self._pending, OrderedDict()
+        for signal_name, args in pending.items():
+            super(SignalHandler, self).emit(signal_name, *args)
+
+    def _on_idle_flush(self):
+        """Deliver pending signals once the main loop is idle."""
+        self._flush_source = None
+        self.flush()
+        return False
 
 
 class HamsterGTK(Gtk.Application):
     """Main application class."""
 
-    def __init__(self):
-        """Setup instance and make sure default signals are connected to methods."""
-        super(HamsterGTK, self).__init__(application_id='org.projecthamster.hamster-gtk')
+    def __init__(self, startup_tracer=None):
+        """
+        Setup instance and make sure default signals are connected to methods.
+
+        Args:
+            startup_tracer (hamster_gtk.profiling.StartupTracer, optional): Tracer
+                recording the startup phases. Tracing ends once the main window
+                has been drawn and autocompletion candidates are available.
+        """
+        super(HamsterGTK, self).__init__(application_id=APPLICATION_ID)
         self.set_resource_base_path('/org/projecthamster/hamster-gtk')
         self.window = None
+        self.startup_tracer = startup_tracer or StartupTracer()
+        self.startup_tracer.wait_for('first draw', 'completion index ready')
 
         self._appdirs = config_helpers.HamsterAppDirs('hamster-gtk')
 
         # Which config backend to use.
         self.config_store = 'file'
+        # The config file is only parsed again if it changed.
+        self._config_cache = ConfigCache(
+            config_helpers.get_config_path(self._appdirs, CONFIG_FILE_NAME))
         # Yes this is redundent, but more transparent. And we can worry about
         # this unwarrented assignment once it actually matters.
-        self._config = self._reload_config()
+        with self.startup_tracer.span('reload config'):
+            self._config = self._reload_config()
         self.config = self._config
 
         self._create_actions()
@@ -162,9 +277,13 @@ class HamsterGTK(Gtk.Application):
         Returns:
             dict: Dictionary of config keys and values.
         """
+        changed = get_changed_keys(self._reload_config(), config)
         cp_instance = self._config_to_configparser(config)
-        config_helpers.write_config_file(cp_instance, self._appdirs, 'hamster-gtk.conf')
-        self.controller.signal_handler.emit('config-changed')
+        config_helpers.write_config_file(cp_instance, self._appdirs, CONFIG_FILE_NAME)
+        # No need to parse what we just wrote.
+        self._config_cache.set(config)
+        if changed:
+            self.controller.signal_handler.emit('config-changed', changed)
 
     def _create_actions(self):
         """Create actions and register them in the application."""
@@ -180,6 +299,11 @@ class HamsterGTK(Gtk.Application):
         about_action.connect('activate', self._on_about_action)
         self.add_action(about_action)
 
+        # Parameter is the raw fact string of the fact to be started.
+        start_tracking_action = Gio.SimpleAction.new('start-tracking', GLib.VariantType.new('s'))
+        start_tracking_action.connect('activate', self._on_start_tracking_action)
+        self.add_action(start_tracking_action)
+
         quit_action = Gio.SimpleAction.new('quit')
         quit_action.connect('activate', self._on_quit_action)
         self.add_action(quit_action)
@@ -187,10 +311,34 @@ class HamsterGTK(Gtk.Application):
     def _startup(self, app):
         """Triggered right at startup."""
         print(_('Hamster-GTK started.'))  # NOQA
-        self._reload_config()
-        self.controller = hamster_lib.HamsterControl(self._config)
+        tracer = self.startup_tracer
+        with tracer.span('register resources'):
+            register_resources()
+        with tracer.span('reload config'):
+            self._reload_config()
+        with tracer.span('create HamsterControl'):
+            self.controller = hamster_lib.HamsterControl(self._config)
         self.controller.signal_handler = SignalHandler()
+        if tracer.enabled:
+            self.controller.signal_handler.connect(
+                'completion-index-ready', lambda sender: tracer.mark('completion index ready'))
+        # Facts of recently used days, shared by all our widgets.
+        # This needs to be connected first so that it is invalidated before any
+        # other listener fetches facts again.
+        self.fact_cache = FactCache(self._config)
+        self.controller.signal_handler.connect('facts-changed', self._facts_changed)
+        self.controller.signal_handler.connect('fact-added', self._fact_added)
+        self.controller.signal_handler.connect('fact-updated', self._fact_updated)
+        self.controller.signal_handler.connect('fact-removed', self._fact_removed)
         self.controller.signal_handler.connect('config-changed', self._config_changed)
+        # Runs expensive backend queries off the main loop.
+        self.worker = BackgroundWorker(self._config)
+        # Autocompletion candidates shared by all ``RawFactEntry`` instances.
+        self.completion_index = CompletionIndex(self)
+        # Records how long handling each keystroke in a ``RawFactEntry`` takes.
+        # Does nothing unless asked for by the environment.
+        self.keystroke_profiler = KeystrokeProfiler(is_keystroke_profiling_enabled(),
+                                                    KEYSTROKE_METRICS)
         # For convenience only
         # [FIXME]
         # Pick one canonical path and stick to it!
@@ -205,21 +353,41 @@ class HamsterGTK(Gtk.Application):
             # We want to make sure that we leave the mainloop if anything goes
             # wrong setting up the actual window.
             try:
-                self.window = MainWindow(app)
+                with self.startup_tracer.span('create MainWindow'):
+                    self.window = MainWindow(app)
             except:
                 traceback.print_exc()
                 self.quit()
+            if self.startup_tracer.enabled:
+                self._draw_handler_id = self.window.connect('draw', self._on_first_draw)
 
         app.add_window(self.window)
         self.window.show_all()
         self.window.present()
+        # Only now that the window is shown, start collecting autocompletion
+        # candidates. Later activations (such as those forwarded by another
+        # launch) keep the candidates at hand.
+        self.completion_index.ensure_populated()
 
     def _shutdown(self, app):
         """Triggered upon termination."""
+        self.worker.stop()
+        self.completion_index.save()
+        self.startup_tracer.close()
+        if self.keystroke_profiler.enabled:
+            print(self.keystroke_profiler.format_report())  # NOQA
         print('Hamster-GTK shut down.')  # NOQA
 
+    def _on_first_draw(self, window, context):
+        """Callback triggered the first time the main window is drawn."""
+        window.disconnect(self._draw_handler_id)
+        self.startup_tracer.mark('first draw')
+        return False
+
     def _on_overview_action(self, action, parameter):
         """Callback for overview action."""
+        # Dialogs are only imported once needed to keep startup fast.
+        from hamster_gtk.overview import OverviewDialog
         dialog = OverviewDialog(self.window, self)
         dialog.run()
         dialog.destroy()
@@ -229,6 +397,7 @@ class HamsterGTK(Gtk.Application):
         def get_initial():
             """Return current values as a dict."""
             return self._config
+        from hamster_gtk.preferences import PreferencesDialog
         dialog = PreferencesDialog(self.window, self, get_initial())
         response = dialog.run()
         if response == Gtk.ResponseType.APPLY:
@@ -240,26 +409,67 @@ class HamsterGTK(Gtk.Application):
 
     def _on_about_action(self, action, parameter):
         """Bring up, process and shut down about dialog."""
-        dialog = AboutDialog(self.window)
+        from hamster_gtk.misc import HamsterAboutDialog
+        dialog = HamsterAboutDialog(self.window)
         response = dialog.run()
         if response == Gtk.ResponseType.OK:
             pass
         dialog.destroy()
 
+    def _on_start_tracking_action(self, action, parameter):
+        """Callback for start tracking action."""
+        self.activate()
+        tracking_screen = self.window.get_child()
+        tracking_screen.start_tracking_view.start_tracking(_u(parameter.get_string()))
+
     def _on_quit_action(self, action, parameter):
         """Callback for quit action."""
         self.quit()
 
     # We use sender=None for it to be called as a method as well.
     def _reload_config(self):
-        """Reload configuration from designated store."""
-        config = self._get_config_from_file()
+        """
+        Reload configuration from designated store.
+
+        Returns:
+            hamster_gtk.config.Config: Immutable config dictionary. Unless the
+            config file changed, this is the one returned last time.
+        """
+        config = self._config_cache.get(self._get_config_from_file)
         self._config = config
         return config
 
-    def _config_changed(self, sender):
+    def _config_changed(self, sender, keys):
         """Callback triggered when config has been changed."""
-        self.controller.update_config(self._reload_config())
+        config = self._reload_config()
+        if keys & STORE_KEYS:
+            # Connects to the (possibly new) database again.
+            self.controller.update_config(config)
+        elif keys & BACKEND_KEYS:
+            # The store reads all other settings from its config as needed.
+            self.controller.config = config
+            self.controller.store.config = config
+        if keys & BACKEND_KEYS:
+            self.worker.update_config(config)
+        if keys & (STORE_KEYS | {'day_start'}):
+            self.fact_cache.update_config(config)
+
+    def _facts_changed(self, sender):
+        """Callback triggered when facts have been changed in an unspecified way."""
+        self.fact_cache.invalidate()
+
+    def _fact_added(self, sender, fact):
+        """Callback triggered when a fact has been added."""
+        self.fact_cache.invalidate_fact(fact)
+
+    def _fact_updated(self, sender, old_fact, new_fact):
+        """Callback triggered when a fact has been updated."""
+        self.fact_cache.invalidate_fact(old_fact)
+        self.fact_cache.invalidate_fact(new_fact)
+
+    def _fact_removed(self, sender, fact):
+        """Callback triggered when a fact has been removed."""
+        self.fact_cache.invalidate_fact(fact)
 
     def _get_default_config(self):
         """
@@ -403,7 +613,7 @@ class HamsterGTK(Gtk.Application):
         Args:
             cp_instance (SafeConfigParser): Instance to be written to file.
         """
-        config_helpers.write_config_file(configparser_instance, self._appdirs, 'hamster-gtk.conf')
+        config_helpers.write_config_file(configparser_instance, self._appdirs, CONFIG_FILE_NAME)
 
     def _get_config_from_file(self):
         """
@@ -421,7 +631,7 @@ class HamsterGTK(Gtk.Application):
             config = self._get_default_config()
             return self._config_to_configparser(config)
 
-        cp_instance = config_helpers.load_config_file(self._appdirs, 'hamster-gtk.conf',
+        cp_instance = config_helpers.load_config_file(self._appdirs, CONFIG_FILE_NAME,
             get_fallback())
         return self._configparser_to_config(cp_instance)
 
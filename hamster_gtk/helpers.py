@@ -23,10 +23,20 @@ from __future__ import absolute_import, unicode_literals
 
 import datetime
 import re
+from collections import OrderedDict
 
 import six
+from gi.repository import GLib
 from six import text_type
 
+from .clock import clock as _clock
+
+# Time in seconds a single idle callback of ``run_in_idle`` may take.
+IDLE_CHUNK_BUDGET = 0.01
+
+# Amount of raw fact strings whose parsing results are memoized.
+RAW_FACT_PARSER_CACHE_SIZE = 64
+
 
 def _u(string):
     """
@@ -93,6 +103,35 @@ def clear_children(widget):
     return widget
 
 
+def run_in_idle(iterable, budget=IDLE_CHUNK_BUDGET):
+    """
+    Consume an iterable in chunks whenever the main loop is idle.
+
+    Each chunk runs until ``budget`` is exceeded, then control is handed back to
+    the main loop so that pending events and redraws get processed. Usually
+    ``iterable`` will be a generator that does some work between each ``yield``.
+
+    Args:
+        iterable (iterable): Iterable to be exhausted.
+        budget (float, optional): Time in seconds a chunk may take.
+
+    Returns:
+        int: ID of the ``GLib`` event source. Pass it to ``GLib.source_remove``
+        in order to cancel any remaining work.
+    """
+    iterator = iter(iterable)
+
+    def run_chunk():
+        deadline = _clock() + budget
+        for item in iterator:
+            if _clock() >= deadline:
+                # Keep the source, there is more to do.
+                return True
+        return False
+
+    return GLib.idle_add(run_chunk)
+
+
 def get_parent_window(widget):
     """
     Reliably determine parent window of a widget.
@@ -118,27 +157,8 @@ def calendar_date_to_datetime(date):
     return datetime.date(int(year), int(month) + 1, int(day))
 
 
-def decompose_raw_fact_string(text, raw=False):
-    """
-    Try to match a given string with modular regex groups.
-
-    Args:
-        text (text_type): String to be analysed.
-        raw (bool): If ``True``, return the raw match instance, if ``False`` return
-            its corresponding ``groupdict``.
-
-    Returns:
-        re.MatchObject or dict: ``re.MatchObject`` if ``raw=True``, else ``dict``.
-            Returning the ``re.MatchObject`` is particularly useful if one is
-            interested in the groups ``span``s.
-
-    Note:
-        This is not at all about providing valid facts or even raw facts. This function
-        is only trying to extract whatever information can be matched to its various
-        groups (aka 'segments').
-        Nevertheless, this can be the basis for future implementations
-        that replace ``Fact.create_from_raw_string`` with a regex based approach.
-    """
+def _get_raw_fact_regex():
+    """Return the regular expression string matching the segments of a raw fact."""
     time_regex = r'([0-9]|0[0-9]|1[0-9]|2[0-3]):[0-5][0-9]'
     # Whilst we do not really want to do sanity checks here being as specific as
     # possible will enhance matching accuracy.
@@ -158,9 +178,9 @@ def decompose_raw_fact_string(text, raw=False):
     tag_regex = r' (#[^,]+)'
     description_regex = r',.+'
 
-    regex = (
+    return (
         r'^(?P<timeinfo>{timeinfo})?(?P<activity>{activity})?(?P<category>{category})?'
-        '(?P<tags>({tag})*)(?P<description>{description})?$'.format(
+        '(?P<tags>({tag})?)(?P<description>{description})?$'.format(
             timeinfo=timeinfo_regex,
             activity=activity_regex,
             category=category_regex,
@@ -169,8 +189,73 @@ def decompose_raw_fact_string(text, raw=False):
         )
     )
 
-    pattern = re.compile(regex, re.UNICODE)
-    match = pattern.match(text)
+
+class RawFactParser(object):
+    """
+    Match raw fact strings against a precompiled regular expression.
+
+    The raw fact entry parses its text on each keystroke and its completion may
+    ask for the very same text again. We therefore keep the results for the
+    most recently parsed strings around.
+    """
+
+    def __init__(self, cache_size=RAW_FACT_PARSER_CACHE_SIZE):
+        """
+        Initialize parser.
+
+        Args:
+            cache_size (int, optional): Amount of results to be memoized.
+        """
+        self.pattern = re.compile(_get_raw_fact_regex(), re.UNICODE)
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def parse(self, text):
+        """
+        Return the match of ``text``.
+
+        Args:
+            text (text_type): String to be analysed.
+
+        Returns:
+            re.MatchObject: Match instance or ``None`` if ``text`` did not match.
+        """
+        try:
+            match = self._cache.pop(text)
+        except KeyError:
+            match = self.pattern.match(text)
+            if len(self._cache) >= self._cache_size:
+                self._cache.popitem(last=False)
+        # (Re-)insert as most recently used.
+        self._cache[text] = match
+        return match
+
+
+raw_fact_parser = RawFactParser()
+
+
+def decompose_raw_fact_string(text, raw=False):
+    """
+    Try to match a given string with modular regex groups.
+
+    Args:
+        text (text_type): String to be analysed.
+        raw (bool): If ``True``, return the raw match instance, if ``False`` return
+            its corresponding ``groupdict``.
+
+    Returns:
+        re.MatchObject or dict: ``re.MatchObject`` if ``raw=True``, else ``dict``.
+            Returning the ``re.MatchObject`` is particularly useful if one is
+            interested in the groups ``span``s.
+
+    Note:
+        This is not at all about providing valid facts or even raw facts. This function
+        is only trying to extract whatever information can be matched to its various
+        groups (aka 'segments').
+        Nevertheless, this can be the basis for future implementations
+        that replace ``Fact.create_from_raw_string`` with a regex based approach.
+    """
+    match = raw_fact_parser.parse(text)
     result = match
     if match and not raw:
         result = match.groupdict()
@@ -0,0 +1,143 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide the ``hamster-gtk`` command.
+
+Importing GTK widgets, ``hamster_lib`` and SQLAlchemy and setting up the
+backend takes a while. If an instance of the application is running already,
+none of this is needed: all we do is forward activation (or an action) to it
+via D-Bus. This module therefore must not import any of the above itself.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import argparse
+from gettext import gettext as _
+
+import gi
+gi.require_version('Gio', '2.0')  # NOQA
+from gi.repository import Gio, GLib
+
+from hamster_gtk.profiling import (DEFAULT_STARTUP_TRACE_PATH, StartupTracer,
+                                   get_startup_trace_path)
+
+APPLICATION_ID = 'org.projecthamster.hamster-gtk'
+
+DBUS_NAME = 'org.freedesktop.DBus'
+DBUS_PATH = '/org/freedesktop/DBus'
+
+
+def get_parser():
+    """Return the parser of our command line arguments."""
+    parser = argparse.ArgumentParser(prog='hamster-gtk',
+                                     description=_("A GTK interface to the hamster time tracker."))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--overview', dest='action', action='store_const', const='overview',
+                       help=_("open the overview"))
+    group.add_argument('--preferences', dest='action', action='store_const',
+                       const='preferences', help=_("open the preferences"))
+    group.add_argument('--start', dest='raw_fact', metavar='RAW_FACT',
+                       help=_("start tracking a new ongoing fact"))
+    parser.add_argument('--trace-startup', metavar='PATH', nargs='?',
+                        const=DEFAULT_STARTUP_TRACE_PATH,
+                        help=_("write a timeline of the startup phases to PATH"))
+    return parser
+
+
+def get_action(args):
+    """
+    Return the application action asked for on the command line.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        tuple: ``(name, parameter)`` tuple, ``parameter`` being a ``GLib.Variant``
+        or ``None``. If no action has been asked for, ``None`` is returned.
+    """
+    if args.raw_fact is not None:
+        return ('start-tracking', GLib.Variant('s', args.raw_fact))
+    if args.action:
+        return (args.action, None)
+    return None
+
+
+def is_running(application_id=APPLICATION_ID):
+    """Check if any process owns the bus name of our application already."""
+    try:
+        connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        result = connection.call_sync(
+            DBUS_NAME, DBUS_PATH, DBUS_NAME, 'NameHasOwner',
+            GLib.Variant('(s)', (application_id,)), GLib.VariantType.new('(b)'),
+            Gio.DBusCallFlags.NONE, -1, None)
+    except GLib.Error:
+        # No session bus, so there is nobody to forward to either.
+        return False
+    return result.unpack()[0]
+
+
+def forward(action=None, application_id=APPLICATION_ID):
+    """
+    Forward activation or an action to the running instance.
+
+    Args:
+        action (tuple, optional): ``(name, parameter)`` tuple as returned by
+            ``get_action``. If ``None``, the instance is just activated.
+        application_id (text_type, optional): Id of the instance.
+
+    Returns:
+        bool: ``False`` if there is no running instance after all, for example
+        because it terminated in the meantime.
+    """
+    app = Gio.Application(application_id=application_id, flags=Gio.ApplicationFlags.FLAGS_NONE)
+    try:
+        app.register(None)
+    except GLib.Error:
+        return False
+    if not app.get_is_remote():
+        # Our registration is dropped along with ``app``, so that the actual
+        # application can take its place.
+        return False
+    if action:
+        app.activate_action(*action)
+    else:
+        app.activate()
+    # Make sure our message is sent before we exit.
+    app.get_dbus_connection().flush_sync(None)
+    return True
+
+
+def main(argv=None):
+    """Main function, callable by ``setup.py`` entry point."""
+    args = get_parser().parse_args(argv)
+    tracer = StartupTracer(args.trace_startup or get_startup_trace_path())
+    action = get_action(args)
+    with tracer.span('forward to running instance'):
+        forwarded = is_running() and forward(action)
+    if forwarded:
+        tracer.close()
+        return 0
+
+    # Only now that we are the primary instance, pay for the expensive imports.
+    with tracer.span('import hamster_gtk.hamster_gtk'):
+        from hamster_gtk.hamster_gtk import HamsterGTK
+    app = HamsterGTK(startup_tracer=tracer)
+    if action:
+        # Run as soon as the application has been started up and activated.
+        GLib.idle_add(lambda: app.activate_action(*action))
+    return app.run()
@@ -19,42 +19,186 @@
 """Widget meant to handle 'raw-fact' strings and provides autocompletion."""
 from __future__ import absolute_import, unicode_literals
 
-import datetime
+import bisect
 
+import six
 from gi.repository import GObject, Gtk
-from orderedset import OrderedSet
-from six import text_type
 
 from hamster_gtk import helpers
+from hamster_gtk.completion.sources import get_activity_text
 from hamster_gtk.helpers import _u
 
+# Segments autocompletion suggestions are provided for.
+COMPLETION_SEGMENTS = ('activity', 'category', 'activity+category', 'tags', 'description')
 
-def _get_segment_boundaries(segment, match):
-    """
-    Return start and end positions for a given segment.
 
-    Args:
-        segmemt (text_type): The segment we want to know the boundries for. Valid choices are:
-            ``activity``, ``category``, ``activity+category``, ``tags`` and ``description``.
-        match: A match object instance.
+class RawFactSegments(object):
+    """
+    Spans of the segments of a raw fact string, kept up to date while it is edited.
 
-    Returns:
-        tuple: Tuple (int, int) representing the given segment's start and end position.
+    Most edits just insert or delete a few letters within a segment. Those can
+    not change which segments there are, so we only shift the spans by the
+    length of the edit. Anything else causes the whole text to be parsed again.
+    Segments are kept sorted by position, so the one at a given position can be
+    looked up by binary search.
     """
-    # We can not simply use ``match.span`` as ``activity+category`` is not
-    # represented as such in the match instance.
-    if segment == 'activity+category':
-        activity, category = match.group('activity', 'category')
-        start = match.start('activity')
-        end = match.end('category')
-        if not activity:
-            start = match.start('category')
-        if not category:
-            end = match.end('activity')
-        result = (start, end)
-    else:
-        result = (match.start(segment), match.end(segment))
-    return result
+
+    # Segments matched by the raw fact regex, in the order they appear.
+    SEGMENTS = ('timeinfo', 'activity', 'category', 'tags', 'description')
+    # If a position is at the boundary of two segments, the one listed last wins.
+    PRIORITY = ('timeinfo', 'tags', 'description', 'activity', 'category', 'activity+category')
+    # Length of the separators segments start with. Edits within those change
+    # the structure, segments consisting of just those do not match anymore.
+    PREFIX_LENGTHS = {'activity': 0, 'category': 1, 'tags': 2, 'description': 1}
+
+    def __init__(self, text=''):
+        """
+        Initialize instance.
+
+        Args:
+            text (text_type, optional): Raw fact string.
+        """
+        self.update(text)
+
+    @property
+    def valid(self):
+        """Whether the text has been matched at all."""
+        return self._valid
+
+    def update(self, text):
+        """Parse ``text`` from scratch."""
+        self.text = text
+        self._starts, self._ends, self._names = [], [], []
+        match = helpers.decompose_raw_fact_string(text, raw=True)
+        self._valid = match is not None
+        if match:
+            for segment in self.SEGMENTS:
+                start, end = match.span(segment)
+                # Segments that did not match at all have a span of ``(-1, -1)``.
+                if start < end:
+                    self._starts.append(start)
+                    self._ends.append(end)
+                    self._names.append(segment)
+
+    def sync(self, text):
+        """Make sure ``text`` is what our spans refer to, parsing it if required."""
+        if text != self.text:
+            self.update(text)
+
+    def insert(self, position, text):
+        """Account for ``text`` being inserted at ``position``."""
+        new_text = self.text[:position] + text + self.text[position:]
+        index = self._get_edited_index(position, position)
+        if index is None or not self._keeps_structure(self._names[index], text):
+            self.update(new_text)
+            return
+        self.text = new_text
+        self._shift(index, len(text))
+
+    def delete(self, start, end):
+        """Account for the text from ``start`` to ``end`` being deleted."""
+        if end < 0:
+            end = len(self.text)
+        new_text = self.text[:start] + self.text[end:]
+        index = self._get_edited_index(start, end)
+        if index is None or not self._is_safe_deletion(index, start, end):
+            self.update(new_text)
+            return
+        self.text = new_text
+        self._shift(index, start - end)
+
+    def get_span(self, segment):
+        """
+        Return start and end position of a segment.
+
+        Args:
+            segment (text_type): One of ``SEGMENTS`` or ``activity+category``.
+
+        Returns:
+            tuple: ``(start, end)`` tuple or ``None`` if the segment is missing.
+        """
+        if segment == 'activity+category':
+            spans = [span for span in (self.get_span('activity'), self.get_span('category'))
+                     if span]
+            if not spans:
+                return None
+            return (spans[0][0], spans[-1][1])
+        if segment not in self._names:
+            return None
+        index = self._names.index(segment)
+        return (self._starts[index], self._ends[index])
+
+    def get_text(self, segment):
+        """Return the text of a segment, ``None`` if it is missing."""
+        span = self.get_span(segment)
+        if not span:
+            return None
+        return self.text[span[0]:span[1]]
+
+    def get_segment_at(self, position, split_activity=False):
+        """
+        Return the segment a given position is in.
+
+        Args:
+            position (int): Position within the text.
+            split_activity (bool, optional): If ``False`` activity and category
+                are reported as ``activity+category``.
+
+        Returns:
+            text_type or None: Segment identifier or ``None`` if ``position``
+            is not within any segment.
+        """
+        # Only the last segment starting before ``position`` and the one
+        # preceding it (if both share a boundary) can contain it.
+        index = bisect.bisect_right(self._starts, position) - 1
+        candidates = []
+        for candidate in (index - 1, index):
+            if candidate >= 0 and self._starts[candidate] <= position <= self._ends[candidate]:
+                name = self._names[candidate]
+                if not split_activity and name in ('activity', 'category'):
+                    name = 'activity+category'
+                candidates.append(name)
+        if not candidates:
+            return None
+        return max(candidates, key=self.PRIORITY.index)
+
+    def _get_edited_index(self, start, end):
+        """Return the index of the segment an edit lies in or ``None``."""
+        # Edits at the very start of a segment may as well belong to the
+        # previous one.
+        index = bisect.bisect_left(self._starts, start) - 1
+        if index < 0 or end > self._ends[index] or self._names[index] == 'timeinfo':
+            return None
+        if start < self._starts[index] + self.PREFIX_LENGTHS[self._names[index]]:
+            return None
+        return index
+
+    def _keeps_structure(self, segment, text):
+        """Check if inserting or deleting ``text`` keeps the structure of a segment."""
+        if segment == 'description':
+            # A description is anything after the first comma.
+            return '\n' not in text
+        # Anything else may turn into a separator or *timeinfo*.
+        return text.isalpha()
+
+    def _is_safe_deletion(self, index, start, end):
+        """Check if deleting from ``start`` to ``end`` keeps the structure of a segment."""
+        segment = self._names[index]
+        if not self._keeps_structure(segment, self.text[start:end]):
+            return False
+        if self._ends[index] - self._starts[index] - (end - start) <= self.PREFIX_LENGTHS[segment]:
+            return False
+        # Removing letters from an activity starting with a digit may turn
+        # its beginning into *timeinfo*.
+        first = self.text[self._starts[index]]
+        return not (segment == 'activity' and (first.isdigit() or first == '-'))
+
+    def _shift(self, index, delta):
+        """Resize the segment at ``index`` and move all following ones by ``delta``."""
+        self._ends[index] += delta
+        for following in range(index + 1, len(self._starts)):
+            self._starts[following] += delta
+            self._ends[following] += delta
 
 
 class RawFactEntry(Gtk.Entry):
@@ -76,14 +220,22 @@ class RawFactEntry(Gtk.Entry):
         self._app = app
         self._split_activity_autocomplete = split_activity_autocomplete
         self.set_completion(RawFactCompletion(app))
-        # The re.match instance of the current string or None
-        self.match = None
+        # Spans of the segments of the current string.
+        self.segments = RawFactSegments()
         # Identifier for the segment the cursor is currently in. None if no
         # match is available.
         self.current_segment = None
+        # Whether ``insert-text`` or ``delete-text`` has been emitted since the
+        # last ``changed``. Replacing text emits both for a single edit.
+        self._editing = False
+        self.connect('insert-text', self._on_insert_text)
+        self.connect('delete-text', self._on_delete_text)
         self.connect('changed', self._on_changed)
-        self._app.controller.signal_handler.connect('config-changed', self._on_config_changed)
-        self._app.controller.signal_handler.connect('facts-changed', self._on_facts_changed)
+        self.connect('destroy', self._on_destroy)
+        self._config_handler_id = self._app.controller.signal_handler.connect(
+            'config-changed', self._on_config_changed)
+        self._completion_handler_id = self._app.controller.signal_handler.connect(
+            'completion-index-ready', self._on_completion_index_ready)
 
     def replace_segment_text(self, segment_string,):
         """
@@ -96,22 +248,26 @@ class RawFactEntry(Gtk.Entry):
             None
         """
         def add_prefix(segment, string):
-            # [TODO]
-            # Once autocompletion supports more segments with prefixes, this will
-            # need to be extended.
             result = string
             if segment == 'category':
                 result = '@{}'.format(string)
+            elif segment == 'tags':
+                # Only the tag currently edited is replaced, any previous ones
+                # are kept.
+                tags = self.segments.get_text('tags')
+                result = '{}{}'.format(tags[:tags.rfind('#') + 1], string)
+            elif segment == 'description':
+                result = ', {}'.format(string)
             return result
 
-        if not self.match:
+        segment = self.current_segment
+        span = self.segments.get_span(segment) if segment else None
+        if not span:
             return
 
-        match = self.match
-        segment = self.current_segment
         segment_string = add_prefix(segment, segment_string)
-        segment_start, segment_end = _get_segment_boundaries(segment, match)
-        old_string = _u(self.get_text())
+        segment_start, segment_end = span
+        old_string = self.segments.text
         new_string = '{}{}{}'.format(
             old_string[:segment_start],
             segment_string,
@@ -128,90 +284,123 @@ class RawFactEntry(Gtk.Entry):
             text_type or None: Returns ``None`` if ``self.current_segment=None``.
         """
         def remove_prefix(segment, string):
-            # [TODO]
-            # Once autocompletion supports more segments with prefixes, this will
-            # need to be extended.
             result = string
             if segment == 'category':
                 result = string[1:]
+            elif segment == 'tags':
+                # Only the tag currently edited is of interest.
+                result = string[string.rfind('#') + 1:]
+            elif segment == 'description':
+                result = string[1:].lstrip()
             return result
 
         if self.current_segment is None:
             return
 
-        if self.current_segment == 'activity+category':
-            activity, category = self.match.group('activity', 'category')
-            if activity or category:
-                result = ''
-                if activity:
-                    result += activity
-                if category:
-                    result += category
-            else:
-                result = None
-        else:
-            result = self.match.group(self.current_segment)
-            if result:
-                result = remove_prefix(self.current_segment, result)
+        result = self.segments.get_text(self.current_segment)
+        if result:
+            result = remove_prefix(self.current_segment, result)
         return result
 
+    def get_activity_text(self):
+        """
+        Return the ``activity+category`` text of the activity currently entered.
+
+        Returns:
+            text_type or None: Returns ``None`` if there is no activity.
+        """
+        activity = self.segments.get_text('activity')
+        category = self.segments.get_text('category')
+        if not activity or not activity.strip():
+            return
+        if category:
+            category = category[1:].strip()
+        return get_activity_text(activity.strip(), category)
+
     # Callbacks
-    def _on_facts_changed(self, evt):
-        """Callback triggered when facts have changed."""
-        self.set_completion(RawFactCompletion(self._app))
+    def _on_insert_text(self, widget, text, length, position):
+        """Callback triggered right before text is inserted."""
+        self._begin_edit()
+        with self._app.keystroke_profiler.measure('parse_time'):
+            self.segments.insert(self._get_insert_position(position), _u(text))
+
+    def _on_delete_text(self, widget, start, end):
+        """Callback triggered right before text is deleted."""
+        self._begin_edit()
+        with self._app.keystroke_profiler.measure('parse_time'):
+            self.segments.delete(start, end)
+
+    def _begin_edit(self):
+        """Start profiling a keystroke, unless this is part of an edit begun already."""
+        if not self._editing:
+            self._editing = True
+            self._app.keystroke_profiler.begin()
+
+    def _get_insert_position(self, position):
+        """
+        Return the position text passed to ``insert-text`` is inserted at.
+
+        Depending on the PyGObject version ``position`` is either the value or an
+        opaque pointer to it. In the latter case we use the cursor position,
+        which is where typed text goes. Should this be wrong for text inserted
+        programmatically, ``_on_changed`` parses the text again.
+        """
+        if isinstance(position, six.integer_types):
+            return position
+        return self.get_position()
 
     def _on_changed(self, widget):
         """
         Callback triggered whenever entry text is changed.
 
         Its main task is to keep track of which segment of the raw fact string the
-        user is currently editing. For this the whole string is inspected and matched
-        against our regex. By comparing the current cursor position with individual
-        matched segment spans a guess about which one is currently edited is made.
+        user is currently editing. ``self.segments`` has been updated by the
+        preceding ``insert-text`` or ``delete-text`` emission already, so
+        finding the segment at the cursor position is a binary search.
         """
-        def get_segment(match):
-            """
-            Return the segment the cursor is currently in.
-
-            Returns:
-                text_type or None: Segment identifier or None if cursor not within any segment.
-            """
-            result = None
-            cursor_position = self.get_position()
-
-            segments = ['timeinfo', 'tags', 'description']
-            if self._split_activity_autocomplete:
-                segments.extend(('activity', 'category'))
-            else:
-                segments.append('activity+category')
-
-            for segment in segments:
-                start, end = _get_segment_boundaries(segment, match)
-                if start <= cursor_position <= end:
-                    result = segment
-
-            return result
+        self._editing = False
+        completion = self.get_completion()
+        # Should any edit have bypassed our handlers, we parse the text again.
+        with self._app.keystroke_profiler.measure('parse_time'):
+            self.segments.sync(_u(self.get_text()))
+        # Please note that the completion will only filter its model after we
+        # updated it here.
+        if self.segments.valid:
+            self.current_segment = self.segments.get_segment_at(
+                self.get_position(), self._split_activity_autocomplete)
+            if self.current_segment in COMPLETION_SEGMENTS:
+                completion.update_matches(self.current_segment, self.get_segment_text() or '',
+                                          activity=self.get_activity_text())
+                return
+        else:
+            self.current_segment = None
+        completion.clear_matches()
 
-        def run_autocomplete(segment):
-            completion = self.get_completion()
-            completion.set_model(completion.segment_models[segment])
+    def _on_config_changed(self, evt, keys):
+        if 'autocomplete_split_activity' in keys:
+            self._split_activity_autocomplete = self._app._config['autocomplete_split_activity']
 
-        self.match = helpers.decompose_raw_fact_string(_u(self.get_text()), raw=True)
-        # Do nothing if we could not 'match' the raw string.
-        # Please note that the completions 'match function' will be run
-        # regardless of what we do here.
-        if self.match:
-            self.current_segment = get_segment(self.match)
-            if self.current_segment in ('activity', 'category', 'activity+category'):
-                run_autocomplete(self.current_segment)
+    def _on_completion_index_ready(self, sender):
+        """Callback triggered once autocompletion candidates are (re-)populated."""
+        # Suggestions for whatever is being typed right now may have been
+        # unavailable so far.
+        if self.has_focus():
+            self._on_changed(self)
+            self.get_completion().complete()
 
-    def _on_config_changed(self, evt):
-        self._split_activity_autocomplete = self._app._config['autocomplete_split_activity']
+    def _on_destroy(self, widget):
+        """Make sure the signal handler does not keep us around."""
+        self._app.controller.signal_handler.disconnect(self._config_handler_id)
+        self._app.controller.signal_handler.disconnect(self._completion_handler_id)
 
 
 class RawFactCompletion(Gtk.EntryCompletion):
     """
-    Return a completion instance to match 'activity@category' strings.
+    Return a completion instance to match the segments of raw fact strings.
+
+    Candidates are looked up by the applications ``CompletionIndex`` once per
+    keystroke. Only the best ranked matches end up in our model, so GTK has
+    just a handful of rows to consider.
 
     Returns:
         Gtk.EntryCompletion: Completion instance.
@@ -221,97 +410,46 @@ class RawFactCompletion(Gtk.EntryCompletion):
         """Instantiate class."""
         super(RawFactCompletion, self).__init__(*args, **kwargs)
         self._app = app
-        self._activities_model = Gtk.ListStore(GObject.TYPE_STRING)
-        self._categories_model = Gtk.ListStore(GObject.TYPE_STRING)
-        self._activities_with_categories_model = Gtk.ListStore(GObject.TYPE_STRING)
-        self._populate_stores(None)
-        self.set_model(self._activities_model)
+        self._matches_model = Gtk.ListStore(GObject.TYPE_STRING)
+        self.set_model(self._matches_model)
         self.set_text_column(0)
-        self.set_match_func(self._match_anywhere, None)
+        self.set_match_func(self._match_all, None)
         self.connect('match-selected', self._on_match_selected)
-        self.segment_models = {
-            'activity': self._activities_model,
-            'category': self._categories_model,
-            'activity+category': self._activities_with_categories_model,
-        }
-        self._app.controller.signal_handler.connect('config-changed', self._populate_stores)
-
-    def _populate_stores(self, evt):
-        activities, categories = OrderedSet(), OrderedSet()
-
-        self._activities_with_categories_model.clear()
-        self._activities_model.clear()
-        self._categories_model.clear()
-
-        for activity in self._get_activities():
-            activities.add(text_type(activity.name))
-            if activity.category:
-                categories.add(text_type(activity.category.name))
-
-            # While we iterate over all activities anyway, we use this to
-            # populate the 'activity+category' store right away.
-            if activity.category:
-                text = '{activity}@{category}'.format(
-                    activity=activity.name, category=activity.category.name
-                )
-            else:
-                text = activity.name
-            self._activities_with_categories_model.append([text])
-
-        for activity in activities:
-            self._activities_model.append([activity])
-
-        for category in categories:
-            self._categories_model.append([category])
-
-    def _get_activities(self):
-        """
-        Return all activities that should be considered for autocompletion.
 
-        This is the place where we define which reference frame should be used
-        for autocomplete suggestions.
-        """
-        today = datetime.date.today()
-        offset = self._app._config['autocomplete_activities_range']
-        start = today - datetime.timedelta(days=offset)
-        recent_activities = [fact.activity for fact in self._app.controller.facts.get_all(
-            start=start, end=today)]
-        return OrderedSet(recent_activities)
-
-    def _match_anywhere(self, completion, entrystr, iter, data):
+    def update_matches(self, segment, text, activity=None):
         """
-        Check if the entrystring is a substring of our text_column.
+        Replace the models rows with the best matches of ``text``.
 
         Args:
-            entrystr (str): The text extracted from the entry so far. Note that
-                we do not use this at all. Instead we fetch
-                ``self.get_entry().get_segment_text`` in order to get only the text
-                of the currently edited segment.
-            iter: Iterator position indicating the model row we check against.
-                This works because
-                ``self.get_entry()._on_changed`` makes sure that the completion
-                model is set properly according to ``self.get_entry().current_segment``.
-            data: Arbitrary user data.
-
-        Returns:
-            bool: ``True`` if ``self.get_entry.get_segment_text`` is a substring,
-                ``False`` if not.
+            segment (text_type): Segment ``text`` belongs to.
+            text (text_type): Text the user entered for that segment so far.
+            activity (text_type, optional): ``activity+category`` text of the
+                activity entered. Descriptions are suggested based on it.
+        """
+        profiler = self._app.keystroke_profiler
+        with profiler.measure('lookup_time'):
+            matches = self._app.completion_index.match(segment, text, activity=activity)
+        with profiler.measure('model_switch_time'):
+            self._matches_model.clear()
+            for match in matches:
+                self._matches_model.append([match])
+        profiler.count('rows', len(matches))
+
+    def clear_matches(self):
+        """Remove all rows from the model."""
+        self._matches_model.clear()
+
+    def _match_all(self, completion, entrystr, iter, data):
+        """
+        Accept each row of the model.
 
-        Note this is a custom match function, for details on the general generic
-        solution [please see|https://lazka.github.io/pgi-docs/#Gtk-3.0/
+        All rows have been matched against the currently edited segment already
+        by ``update_matches``. For details on custom match functions [please
+        see|https://lazka.github.io/pgi-docs/#Gtk-3.0/
         callbacks.html#Gtk.EntryCompletionMatchFunc].
         """
-        result = False
-        entry = self.get_entry()
-        modelstring = ''
-        hit = self.get_model()[iter][0]
-        # We only need to check if the string was matched at all. Otherwise
-        # there are no 'segments' anyway.
-        if hit and entry.match:
-            modelstring = _u(hit)
-            segment_text = entry.get_segment_text()
-            result = segment_text in modelstring
-        return result
+        self._app.keystroke_profiler.count('match_func_calls')
+        return True
 
     def _on_match_selected(self, completion, model, iter):
         """Callback to be executed once a match is selected by the user."""
@@ -22,7 +22,7 @@ This Module provides the ``Overview`` class to generate a general listing of our
 In order to do that, this module contains multiple auxiliary widgets to render specific aspects.
 
 Due to using default ``Gtk`` classes as bases for our custom widgets (such as
-``HorizontalBarChart``) we are able to greatly reduce the codebase compared to ``legacy hamster``.
+``BarChartColumn``) we are able to greatly reduce the codebase compared to ``legacy hamster``.
 The one major downside is, that we can not easily reimplement its eye candy
 'slide in from the bottom' transition when opening the 'details' widget. Whilst this is unfortunate
 reimplementing this properly is out of the scope right now and a price we are willing to pay.
@@ -31,16 +31,139 @@ reimplementing this properly is out of the scope right now and a price we are wi
 from __future__ import absolute_import
 
 import datetime
+import functools
 import operator
-from collections import defaultdict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
+from gettext import gettext as _
 
 from gi.repository import GObject, Gtk
 from hamster_lib import reports
+from hamster_lib.helpers import time as time_helpers
 
 from .. import widgets
 from ... import helpers
+from ...config import STORE_KEYS
 
 Totals = namedtuple('Totals', ('activity', 'category', 'date'))
+GroupedFacts = namedtuple('GroupedFacts', ('by_activity', 'by_category', 'by_date'))
+
+# Above this amount of facts the overview uses a ``FactTreeView`` instead of a
+# ``FactGrid`` as creating widgets for each fact gets too expensive.
+LARGE_FACT_LIST_THRESHOLD = 500
+
+
+class FactGroups(object):
+    """
+    Facts grouped by date, activity and category including the respective totals.
+
+    Instead of regrouping all facts whenever a single one changes, facts can be
+    added and removed individually. Each such operation only touches the
+    groups and totals of the fact in question.
+
+    Facts are identified by their PK. Facts without one (not saved yet) are
+    identified by the instance itself.
+
+    Attributes:
+        grouped_facts (GroupedFacts): Lists of facts by activity, category and date.
+        totals (Totals): Accumulated ``Fact.delta`` by activity, category and date.
+    """
+
+    def __init__(self, facts=()):
+        """Initialize instance and group any initial facts."""
+        # Maps the key of each fact to the stored instance, in order of addition.
+        self._facts = OrderedDict()
+        self.grouped_facts = GroupedFacts(
+            by_activity=defaultdict(list),
+            by_category=defaultdict(list),
+            by_date=defaultdict(list),
+        )
+        self.totals = Totals(
+            activity=defaultdict(datetime.timedelta),
+            category=defaultdict(datetime.timedelta),
+            date=defaultdict(datetime.timedelta),
+        )
+        for fact in facts:
+            self.add(fact)
+
+    @property
+    def facts(self):
+        """Return a list of all facts currently represented."""
+        return list(self._facts.values())
+
+    def add(self, fact):
+        """Add a fact to all of its groups, keeping each group ordered by start."""
+        self._facts[self._get_key(fact)] = fact
+        delta = fact.delta
+        for groups, totals, key in self._get_groups(fact):
+            group = groups[key]
+            # Facts are mostly added in order, so this usually just appends.
+            position = len(group)
+            while position and group[position - 1].start > fact.start:
+                position -= 1
+            group.insert(position, fact)
+            totals[key] += delta
+
+    def remove(self, fact):
+        """
+        Remove a fact from all of its groups.
+
+        Groups that end up empty are dropped.
+
+        Returns:
+            hamster_lib.Fact: The stored instance that has been removed.
+
+        Raises:
+            KeyError: If the fact is not part of this instance.
+        """
+        stored = self._facts.pop(self._get_key(fact))
+        delta = stored.delta
+        for groups, totals, key in self._get_groups(stored):
+            group = groups[key]
+            group.remove(stored)
+            if group:
+                totals[key] -= delta
+            else:
+                del groups[key]
+                del totals[key]
+        return stored
+
+    def update(self, old_fact, new_fact):
+        """Replace a fact with its updated version."""
+        self.remove(old_fact)
+        self.add(new_fact)
+
+    def get(self, fact):
+        """
+        Return the stored instance representing ``fact``.
+
+        Raises:
+            KeyError: If the fact is not part of this instance.
+        """
+        return self._facts[self._get_key(fact)]
+
+    def __contains__(self, fact):
+        """Check if a fact is part of this instance."""
+        return self._get_key(fact) in self._facts
+
+    def __len__(self):
+        """Return the amount of facts represented."""
+        return len(self._facts)
+
+    def _get_key(self, fact):
+        """Return the key identifying ``fact``."""
+        if fact.pk is None:
+            return id(fact)
+        return fact.pk
+
+    def _get_groups(self, fact):
+        """Return a ``(groups, totals, key)`` triple for each grouping a fact is part of."""
+        # Take note: ``Fact.activity`` is only unique for the composite key
+        # activity.name/activity.category!
+        return (
+            (self.grouped_facts.by_date, self.totals.date, fact.date),
+            (self.grouped_facts.by_activity, self.totals.activity, fact.activity),
+            (self.grouped_facts.by_category, self.totals.category, fact.category),
+        )
 
 
 class OverviewDialog(Gtk.Dialog):
@@ -62,14 +185,29 @@ class OverviewDialog(Gtk.Dialog):
         # ``self._daterange`` as this will trigger ``self.refresh`` which
         # expects ``self._charts``.
         self._charts = False
-        self._daterange = self._get_default_daterange()
-
-        # [FIXME] Should be a property to make sure the signal is emitted
-        self._facts = None
+        self._charts_widget = None
+        self._groups = None
         self._grouped_facts = None
+        self._loading = False
+        # Identifies the most recent background load. Results of any other
+        # load are outdated and will be discarded.
+        self._load_id = 0
+        self.factlist = None
+        # Daterange of the facts currently shown by our widgets.
+        self._drawn_daterange = None
+        self.main_box.pack_start(self._get_layout(), True, True, 0)
+        self._daterange = self._get_default_daterange()
 
+        self.connect('destroy', self._on_destroy)
         self.show_all()
 
+    @property
+    def _facts(self):
+        """Return a list of all facts shown, ``None`` if none have been loaded yet."""
+        if self._groups is None:
+            return None
+        return self._groups.facts
+
     @property
     def _daterange(self):
         """Return the 'daterange' for which this overview displays facts."""
@@ -83,54 +221,249 @@ class OverviewDialog(Gtk.Dialog):
 
     def _connect_signals(self):
         """Connect signals this instance listens for."""
-        self._app.controller.signal_handler.connect('config-changed', self._on_config_changed)
-        self._app.controller.signal_handler.connect('facts-changed', self._on_facts_changed)
-        self._app.controller.signal_handler.connect('daterange-changed',
-            self._on_daterange_changed)
+        signal_handler = self._app.controller.signal_handler
+        self._signal_handler_ids = [
+            signal_handler.connect('config-changed', self._on_config_changed),
+            signal_handler.connect('facts-changed', self._on_facts_changed),
+            signal_handler.connect('fact-added', self._on_fact_added),
+            signal_handler.connect('fact-updated', self._on_fact_updated),
+            signal_handler.connect('fact-removed', self._on_fact_removed),
+            signal_handler.connect('daterange-changed', self._on_daterange_changed),
+        ]
+
+    def _disconnect_signals(self):
+        """Disconnect all signals connected by ``_connect_signals``."""
+        for handler_id in self._signal_handler_ids:
+            self._app.controller.signal_handler.disconnect(handler_id)
+        self._signal_handler_ids = []
 
     def _get_default_daterange(self):
         """Return the default daterange used when none has been selected by user."""
         today = datetime.date.today()
         return (today, today)
 
-    def _on_config_changed(self, sender):
+    def _on_config_changed(self, sender, keys):
         """Callback to be triggered if the applications config has changed."""
-        self.refresh()
+        # Facts are grouped by day, so only the day start and the database matter.
+        if keys & (STORE_KEYS | {'day_start'}):
+            self.refresh()
 
     def _on_facts_changed(self, sender):
         """Callback to be triggered if stored facts have been changed."""
         self.refresh()
 
+    def _on_fact_added(self, sender, fact):
+        """Callback to be triggered if a fact has been added."""
+        self._apply_fact_change(new_fact=fact)
+
+    def _on_fact_updated(self, sender, old_fact, new_fact):
+        """Callback to be triggered if a fact has been updated."""
+        self._apply_fact_change(old_fact, new_fact)
+
+    def _on_fact_removed(self, sender, fact):
+        """Callback to be triggered if a fact has been removed."""
+        self._apply_fact_change(old_fact=fact)
+
     def _on_daterange_changed(self, sender, daterange):
         """Callback to be triggered if the 'daterange' changed."""
         self.refresh()
 
+    def _on_destroy(self, dialog):
+        """Callback to be triggered once the dialog gets destroyed."""
+        self._disconnect_signals()
+        # Make sure results of any pending load are discarded.
+        self._load_id += 1
+
     def refresh(self):
-        """Recompute data and trigger redrawing."""
-        self._facts = self._get_facts()
-        self._grouped_facts, self._totals = self._group_facts()
+        """
+        Reload facts for the current daterange and trigger redrawing.
 
-        helpers.clear_children(self.main_box)
-        if self._charts:
-            self._charts = False
+        Facts are fetched and grouped by the applications background worker.
+        A spinner is shown instead of the facts listing until the results arrive.
+        """
+        self._load_id += 1
+        self._loading = True
+        self._show_spinner()
+        self._app.worker.submit(self._load_facts,
+            functools.partial(self._on_facts_loaded, self._load_id), self._daterange)
+
+    def _load_facts(self, controller, daterange):
+        """
+        Fetch and group all facts within ``daterange``.
+
+        Note:
+            This is run within the worker thread. It must not touch any widgets.
+
+        Returns:
+            FactGroups: All facts within ``daterange``.
+        """
+        start, end = daterange
+        return FactGroups(self._app.fact_cache.get_facts(controller.store, start, end))
+
+    def _on_facts_loaded(self, load_id, result, error):
+        """
+        Callback triggered once the background worker finished loading facts.
 
-        facts_window = Gtk.ScrolledWindow()
-        self.factlist = widgets.FactGrid(self._app.controller, self._grouped_facts.by_date)
-        facts_window.add(self.factlist)
-        self.main_box.pack_start(facts_window, True, True, 0)
+        Results of any load but the most recent one are discarded.
+        A TypeError may indicated that the passed daterange istances may be of
+        invalid type. A ValueError that end is before start. Any error is shown
+        to the user and an empty listing drawn, so the spinner does not keep
+        spinning forever.
+        """
+        if load_id != self._load_id:
+            return
+
+        self._loading = False
+        if error:
+            if isinstance(error, (TypeError, ValueError)):
+                message = None
+            else:
+                message = _("Facts could not be loaded.")
+            helpers.show_error(helpers.get_parent_window(self), error, message)
+            result = FactGroups()
+        self._set_groups(result)
+        self._draw()
+
+    def _set_groups(self, groups):
+        """Use a new ``FactGroups`` instance as basis for all our widgets."""
+        self._groups = groups
+        # Those are just references into ``groups``, so they stay up to date
+        # when ``groups`` gets changed.
+        self._grouped_facts = groups.grouped_facts
+        self._totals = groups.totals
+
+    def _apply_fact_change(self, old_fact=None, new_fact=None):
+        """
+        Incrementally apply a change of a single fact instead of reloading all facts.
 
+        Args:
+            old_fact (hamster_lib.Fact, optional): Fact as it was before the change.
+                ``None`` if the fact has been added.
+            new_fact (hamster_lib.Fact, optional): Fact as it is after the change.
+                ``None`` if the fact has been removed.
+        """
+        if self._loading or self._groups is None:
+            # The pending load may or may not include the change, so we start over.
+            self.refresh()
+            return
+
+        dates = set()
+        if old_fact and old_fact in self._groups:
+            dates.add(self._groups.remove(old_fact).date)
+        if new_fact and self._in_daterange(new_fact):
+            self._groups.add(new_fact)
+            dates.add(new_fact.date)
+        self._draw(dates)
+
+    def _in_daterange(self, fact):
+        """Check if a fact starts and ends within the current daterange."""
+        if not fact.end:
+            # *Ongoing facts* are never part of the overview.
+            return False
+        start, end = self._daterange
+        config = self._app._config
+        range_start = datetime.datetime.combine(start, config['day_start'])
+        range_end = time_helpers.end_day_to_datetime(end, config)
+        return range_start <= fact.start and fact.end <= range_end
+
+    def _get_layout(self):
+        """
+        Return a container holding all widgets of the dialog.
+
+        Those widgets are created only once and then updated in place. This way
+        scroll position and opened charts survive changes to the shown facts.
+        """
+        self._stack = Gtk.Stack()
+        self._spinner = Gtk.Spinner()
+        self._stack.add_named(self._spinner, 'spinner')
+
+        self._content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        self._facts_window = Gtk.ScrolledWindow()
+        self._content_box.pack_start(self._facts_window, True, True, 0)
         # [FIXME]
         # Evaluate transfer to helper or even hamster-lib.
-        self.totals_panel = widgets.Summary(self._get_highest_totals(self._totals.category, 3))
-        self.main_box.pack_start(self.totals_panel, False, False, 0)
+        self.totals_panel = widgets.Summary([])
+        self._content_box.pack_start(self.totals_panel, False, False, 0)
+        self._charts_button = Gtk.Button('click to show more details ...')
+        self._charts_button.set_sensitive(False)
+        self._charts_button.connect('clicked', self._on_charts_button)
+        self._content_box.pack_start(self._charts_button, False, True, 0)
+        self._stack.add_named(self._content_box, 'content')
+
+        # ``Gtk.Stack`` only switches to visible children.
+        self._spinner.show()
+        self._content_box.show_all()
+        return self._stack
+
+    def _show_spinner(self):
+        """
+        Show a spinner instead of the facts listing while facts are loaded.
+
+        If we just reload the daterange already shown, the current widgets stay
+        in place until they can be updated.
+        """
+        if self._groups is not None and self._drawn_daterange == self._daterange:
+            return
+        self._spinner.start()
+        self._stack.set_visible_child_name('spinner')
+
+    def _draw(self, dates=None):
+        """
+        Bring all widgets in line with the current set of facts.
 
-        charts_button = Gtk.Button('click to show more details ...')
-        if not self._facts:
-            charts_button.set_sensitive(False)
-        charts_button.connect('clicked', self._on_charts_button)
-        self.main_box.pack_start(charts_button, False, True, 0)
+        Args:
+            dates (set, optional): If given, only the facts of those dates
+                changed, so only their sections of the fact list are updated.
+        """
+        if not self._can_update_fact_list():
+            # Switching between list widgets or dateranges builds a new one.
+            if self.factlist:
+                self.factlist.destroy()
+            self.factlist = self._get_fact_list()
+            self._facts_window.add(self.factlist)
+            self.factlist.show_all()
+        elif dates is None:
+            self.factlist.update(self._grouped_facts.by_date)
+        else:
+            self.factlist.update_sections(self._grouped_facts.by_date, dates)
 
-        self.main_box.show_all()
+        self.totals_panel.update(self._get_highest_totals(self._totals.category, 3))
+        self._charts_button.set_sensitive(bool(self._groups))
+        if self._charts:
+            self._charts_widget.update(self._totals)
+
+        if self._drawn_daterange != self._daterange:
+            # The old scroll position is meaningless for a new daterange.
+            self._facts_window.get_vadjustment().set_value(0)
+            self._drawn_daterange = self._daterange
+        self._spinner.stop()
+        self._stack.set_visible_child_name('content')
+
+    def _can_update_fact_list(self):
+        """
+        Check whether the current fact list widget can be updated in place.
+
+        ``FactGrid.update`` reconciles all rows at once. Only a new ``FactGrid``
+        builds its rows progressively, so one is created for each new daterange.
+        """
+        if not isinstance(self.factlist, self._get_fact_list_class()):
+            return False
+        return (isinstance(self.factlist, widgets.FactTreeView) or
+                self._drawn_daterange == self._daterange)
+
+    def _get_fact_list_class(self):
+        """Return the widget class suitable for listing the current amount of facts."""
+        if len(self._groups) > LARGE_FACT_LIST_THRESHOLD:
+            return widgets.FactTreeView
+        return widgets.FactGrid
+
+    def _get_fact_list(self):
+        """Return a widget listing all facts, depending on their amount."""
+        widget_class = self._get_fact_list_class()
+        if widget_class == widgets.FactGrid:
+            return widgets.FactGrid(self._app.controller, self._grouped_facts.by_date,
+                                    progressive=True)
+        return widget_class(self._app.controller, self._grouped_facts.by_date)
 
     def _on_charts_button(self, button):
         """On button click either show or hide extended details."""
@@ -142,73 +475,11 @@ class OverviewDialog(Gtk.Dialog):
             self._charts = Gtk.ScrolledWindow()
             self._charts.set_min_content_height(dialog_height / 4)
             self._charts.set_min_content_width(dialog_width)
-            self._charts.add(widgets.Charts(self._totals))
-            self.main_box.pack_start(self._charts, False, False, 0)
+            self._charts_widget = widgets.Charts(self._totals)
+            self._charts.add(self._charts_widget)
+            self._content_box.pack_start(self._charts, False, False, 0)
             self.show_all()
 
-    # [FIXME]
-    # To avoid multiple calls to the backend, maybe some rudimentary caching
-    # would be sensible.
-    def _get_facts(self):
-        """
-        Collect and return all facts too be shown, not necessarily be visible.
-
-        A TypeError may indicated that the passed daterange istances may be of
-        invalid type. A ValueError that end is before start.
-        """
-        start, end = self._daterange
-        try:
-            result = self._app.store.facts.get_all(start, end)
-        except (TypeError, ValueError) as error:
-            helpers.show_error(helpers.get_parent_window(self), error)
-        else:
-            return result
-
-    def _group_facts(self):
-        """
-        Return ``self._facts`` grouped by various keys.
-
-        Note:
-            We handle totals as part of this method in order to limit the
-            amount of iterations over ``self._facts``.
-        """
-        # All facts for a given date
-        facts_by_date = defaultdict(list)
-        date_deltas = defaultdict(datetime.timedelta)
-        # All facts for a given category
-        facts_by_category = defaultdict(list)
-        category_deltas = defaultdict(datetime.timedelta)
-        # All facts for a given activity
-        facts_by_activity = defaultdict(list)
-        activity_deltas = defaultdict(datetime.timedelta)
-
-        GroupedFacts = namedtuple('GroupedFacts', ('by_activity', 'by_category', 'by_date'))
-
-        for fact in self._facts:
-            delta = fact.delta
-
-            facts_by_date[fact.date].append(fact)
-            date_deltas[fact.date] += delta
-
-            # Take note: ``Fact.activity`` is only unique for the composite key
-            # activity.name/activity.category!
-            facts_by_activity[fact.activity].append(fact)
-            activity_deltas[fact.activity] += delta
-
-            facts_by_category[fact.category].append(fact)
-            category_deltas[fact.category] += delta
-
-        grouped_facts = GroupedFacts(
-            by_activity=facts_by_activity,
-            by_category=facts_by_category,
-            by_date=facts_by_date,
-        )
-
-        totals = Totals(activity_deltas, category_deltas, date_deltas)
-
-        Result = namedtuple('Result', ('grouped_facts', 'totals'))
-        return Result(grouped_facts, totals)
-
     def _get_highest_totals(self, totals, amount):
         """Return specified amount of items with the highest value."""
         totals = sorted(totals.items(), key=operator.itemgetter(1),
@@ -239,7 +510,7 @@ class OverviewDialog(Gtk.Dialog):
 
     def _export_facts(self, target_format, target_path):
         """
-        Export current set of facts to file.
+        Export the facts currently shown to file.
 
         Args:
             target_format (text_type): Type of the export.
@@ -252,7 +523,7 @@ class OverviewDialog(Gtk.Dialog):
         }
 
         writer = export_writers[target_format](target_path)
-        writer.write_report(self._get_facts())
+        writer.write_report(self._facts)
 
     # Widgets
     def _get_summery_widget(self, category_totals):
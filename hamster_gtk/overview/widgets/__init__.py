@@ -18,5 +18,5 @@
 """This module provides widgets to be used by the overview dialog."""
 
 from .charts import Charts  # NOQA
-from .fact_grid import FactGrid  # NOQA
+from .fact_grid import FactGrid, FactTreeView  # NOQA
 from .misc import HeaderBar, Summary  # NOQA
@@ -19,9 +19,11 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import math
 import operator
 
-from gi.repository import GObject, Gtk
+from gi.repository import Gtk, Pango, PangoCairo
+from six import text_type
 
 from hamster_gtk import helpers
 
@@ -40,11 +42,18 @@ class Charts(Gtk.Grid):
         super(Charts, self).__init__()
         self.set_column_spacing(20)
         self.attach(Gtk.Label('Categories'), 0, 0, 1, 1)
-        self.attach(self._get_barcharts(totals.category), 0, 1, 1, 1)
         self.attach(Gtk.Label('Activities'), 1, 0, 1, 1)
-        self.attach(self._get_barcharts(totals.activity), 1, 1, 1, 1)
         self.attach(Gtk.Label('Dates'), 2, 0, 1, 1)
-        self.attach(self._get_barcharts(totals.date), 2, 1, 1, 1)
+        self.update(totals)
+
+    def update(self, totals):
+        """Show ``totals`` instead of the current ones."""
+        for column, column_totals in enumerate((totals.category, totals.activity, totals.date)):
+            barcharts = self.get_child_at(column, 1)
+            if barcharts:
+                barcharts.update(column_totals)
+            else:
+                self.attach(self._get_barcharts(column_totals), column, 1, 1, 1)
 
     def _get_barcharts(self, totals):
         """
@@ -54,91 +63,118 @@ class Charts(Gtk.Grid):
             totals (dict): A dict that provides delta values for given keys. {key: delta}.
 
         Returns:
-            Gtk.Grid: A Grid which contains one column and as many rows as there
-                are ``keys`` in ``totals``. Each row contains a barchart with labels
-                showing the delta relative to the highest delta value in ``totals``.
+            BarChartColumn: A widget that draws a row for each key in
+                ``totals``. Each row contains a barchart with labels showing
+                the delta relative to the highest delta value in ``totals``.
         """
-        # The highest amount of time spend. This is the scale for all other totals.
-        # Python 2.7 does not yet have support for the ``default`` kwarg.
-        if not totals:
-            max_total = 0
-        else:
-            max_total = max(totals.values())
-            # Sorting a dict like this returns a list of tuples.
-            totals = sorted(totals.items(), key=operator.itemgetter(1),
-                            reverse=True)
-
-        grid = Gtk.Grid()
-        grid.set_column_spacing(5)
-        grid.set_row_spacing(5)
-
-        # Build individual 'rows'.
-        row = 0
-        for category, delta in totals:
-            # For reducing font size we opt for explicit markup in accordance
-            # with (3.2) https://developer.gnome.org/gtk3/3.0/gtk-question-index.html#id530878
-            # As this solution is relative to the users default font size.
-            category_label = Gtk.Label()
-            category_label.set_selectable(True)
-            category_label.set_halign(Gtk.Align.START)
-            category_label.set_markup("<small>{}</small>".format(category))
-            bar_chart = HorizontalBarChart(delta.total_seconds(), max_total.total_seconds(), 100,
-                15)
-            delta_label = Gtk.Label()
-            delta_label.set_selectable(True)
-            delta_label.set_halign(Gtk.Align.START)
-            delta_label.set_markup("<small>{}</small>".format(GObject.markup_escape_text(
-                helpers.get_delta_string(delta))))
-            grid.attach(category_label, 0, row, 1, 1)
-            grid.attach(bar_chart, 1, row, 1, 1)
-            grid.attach(delta_label, 2, row, 1, 1)
-            row += 1
-        return grid
-
-
-class HorizontalBarChart(Gtk.DrawingArea):
-    """
-    A simple horizontal bar chart.
+        return BarChartColumn(totals)
 
-    Note:
-        This solution is not too general. It comes without any coordinate system and labeling.
-        If you need more, either work towards a dedicated library or incorporate any of the big
-        charting backends.
+
+class BarChartColumn(Gtk.DrawingArea):
     """
+    A column of labeled horizontal bar charts, drawn as a single widget.
 
-    def __init__(self, value, max_value, width=150, height=40):
-        """Initialize widget."""
-        super(HorizontalBarChart, self).__init__()
-        # [FIXME] Make things more flexible/customizable.
+    Creating a handful of widgets per key does not scale to hundreds of keys.
+    Instead rows are drawn with cairo and pango, right to the context GTK
+    passes on ``draw``. Only rows intersecting the area to be redrawn are
+    rendered, so the effort depends on the size of the viewport, not the amount
+    of rows.
+    """
 
-        self._value = float(value)
-        self._max_value = float(max_value)
-        # -1 for no hints
-        self._width_hint = width
-        self._height_hint = height
+    ROW_HEIGHT = 20
+    ROW_SPACING = 5
+    # Share of the available width used by the label, bar and delta respectively.
+    COLUMN_WIDTHS = (0.4, 0.4, 0.2)
+    BAR_COLOR = (0.8, 0.8, 0.8)
 
-        self.set_size_request(self._width_hint, self._height_hint)
+    def __init__(self, totals, width=250):
+        """
+        Initialize widget.
 
+        Args:
+            totals (dict): A dict that provides delta values for given keys. {key: delta}.
+            width (int, optional): Requested width of the widget.
+        """
+        super(BarChartColumn, self).__init__()
+        self._width_hint = width
+        self._rows = []
+        self._max_total = 0
+        self.set_has_tooltip(True)
         self.connect('draw', self._on_draw)
+        self.connect('query-tooltip', self._on_query_tooltip)
+        self.update(totals)
 
-    def _on_draw(self, widget, context):
-        """Method called on ``draw`` event. Renders the actual widget."""
-        context.set_source_rgb(0.8, 0.8, 0.8)
-        context.set_line_width(0.5)
-
-        allocation = self.get_allocation()
-        width_allocated = allocation.width
-        height_allocated = allocation.height
-
-        bar_length = width_allocated * (self._value / self._max_value)
-        # [FIXME] Revisit.
-        # bar_width = self._height_hint
-        bar_width = height_allocated
-
-        x_start, y_start = 0, 0
-
-        bar_x = int(x_start + bar_length)
-        bar_y = int(y_start + bar_width)
+    def update(self, totals):
+        """Show ``totals`` instead of the current ones."""
+        # The highest amount of time spend. This is the scale for all other totals.
+        # Python 2.7 does not yet have support for the ``default`` kwarg.
+        if not totals:
+            self._rows = []
+            self._max_total = 0
+        else:
+            self._max_total = max(totals.values()).total_seconds()
+            # Sorting a dict like this returns a list of tuples.
+            self._rows = [(text_type(key), delta.total_seconds(), helpers.get_delta_string(delta))
+                for key, delta in sorted(totals.items(), key=operator.itemgetter(1),
+                                         reverse=True)]
+        self.set_size_request(self._width_hint, len(self._rows) * self._row_pitch)
+        self.queue_draw()
+
+    @property
+    def _row_pitch(self):
+        """Vertical distance between the top of two rows."""
+        return self.ROW_HEIGHT + self.ROW_SPACING
+
+    def _get_visible_rows(self, top, bottom):
+        """Return the ``range`` of row indices intersecting ``top`` to ``bottom``."""
+        first = max(0, int(top // self._row_pitch))
+        last = min(len(self._rows), int(math.ceil(bottom / float(self._row_pitch))))
+        return range(first, last)
 
-        context.rectangle(x_start, y_start, bar_x, bar_y)
-        context.fill()
+    def _on_draw(self, widget, context):
+        """Draw the rows intersecting the area to be redrawn."""
+        x1, y1, x2, y2 = context.clip_extents()
+        self._render(context, self.get_allocated_width(), y1, y2)
+        return False
+
+    def _render(self, context, width, top, bottom):
+        """Draw all rows intersecting ``top`` to ``bottom`` to ``context``."""
+        label_width, bar_width, delta_width = [int(width * share)
+                                               for share in self.COLUMN_WIDTHS]
+        color = self.get_style_context().get_color(Gtk.StateFlags.NORMAL)
+        layout = PangoCairo.create_layout(context)
+        layout.set_ellipsize(Pango.EllipsizeMode.END)
+        font = self.get_style_context().get_font(Gtk.StateFlags.NORMAL)
+        # Mirror the former ``<small>`` markup as it is relative to the users font size.
+        font.set_size(int(font.get_size() * 0.8333))
+        layout.set_font_description(font)
+
+        for index in self._get_visible_rows(top, bottom):
+            label, seconds, delta = self._rows[index]
+            y = index * self._row_pitch
+
+            context.set_source_rgba(color.red, color.green, color.blue, color.alpha)
+            self._draw_text(context, layout, label, 0, y, label_width)
+            self._draw_text(context, layout, delta, label_width + bar_width, y, delta_width)
+
+            if self._max_total:
+                context.set_source_rgb(*self.BAR_COLOR)
+                context.rectangle(label_width, y,
+                    int(bar_width * (seconds / self._max_total)), self.ROW_HEIGHT)
+                context.fill()
+
+    def _draw_text(self, context, layout, text, x, y, width):
+        """Draw a single line of text, ellipsized to ``width``."""
+        layout.set_text(text, -1)
+        layout.set_width(width * Pango.SCALE)
+        context.move_to(x, y)
+        PangoCairo.show_layout(context, layout)
+
+    def _on_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        """Show key and delta of the hovered row as its label may be ellipsized."""
+        rows = self._get_visible_rows(y, y + 1)
+        if not rows:
+            return False
+        label, seconds, delta = self._rows[rows[0]]
+        tooltip.set_text('{}: {}'.format(label, delta))
+        return True
@@ -22,36 +22,181 @@
 # have a unicode issue!
 from __future__ import absolute_import
 
+import datetime
 import operator
 
-from gi.repository import GObject, Gtk
+from gi.repository import GLib, GObject, Gtk
 
 from hamster_gtk import helpers
 from hamster_gtk.misc.dialogs import EditFactDialog
 
 
+def _get_fact_key(fact):
+    """Return a key identifying ``fact`` across updates of its attributes."""
+    if fact.pk is None:
+        return id(fact)
+    return fact.pk
+
+
+def _update_fact(widget, controller, old_fact, new_fact):
+    """Save an edited fact and announce the change."""
+    try:
+        result = controller.store.facts.save(new_fact)
+    except (ValueError, KeyError) as message:
+        helpers.show_error(helpers.get_parent_window(widget), message)
+    else:
+        controller.signal_handler.emit('fact-updated', old_fact, result)
+
+
+def _delete_fact(widget, controller, fact):
+    """Delete fact from the backend and announce the change."""
+    try:
+        result = controller.store.facts.remove(fact)
+    except (ValueError, KeyError) as error:
+        helpers.show_error(helpers.get_parent_window(widget), error)
+    else:
+        controller.signal_handler.emit('fact-removed', fact)
+        return result
+
+
 class FactGrid(Gtk.Grid):
-    """Listing of facts per day."""
+    """
+    Listing of facts per day.
 
-    def __init__(self, controller, initial, *args, **kwargs):
+    In *progressive* mode only the first ``INITIAL_ROWS`` facts are added right
+    away, the remaining ones are added in chunks whenever the main loop is
+    idle. This way the first rows get painted without waiting for all others.
+    """
+
+    # Amount of facts added on initialization when building progressively.
+    INITIAL_ROWS = 50
+
+    def __init__(self, controller, initial, progressive=False, *args, **kwargs):
         """
         Initialize widget.
 
         Args:
             initial (dict): Dictionary where keys represent individual dates
                 and values an iterable of facts of that date.
+            progressive (bool, optional): If ``True`` only add the first rows
+                right away and everything else once the main loop is idle.
         """
         super(FactGrid, self).__init__(*args, **kwargs)
         self.set_column_spacing(0)
+        self._controller = controller
+        self._build_source = None
+        # Dates of all sections in the order they are shown.
+        self._dates = []
+        # Maps a date to the ``FactListBox`` listing its facts.
+        self._fact_lists = {}
+
+        builder = self._build(initial)
+        if progressive:
+            for added in builder:
+                if added >= self.INITIAL_ROWS:
+                    self._build_source = helpers.run_in_idle(builder)
+                    break
+            self.connect('destroy', self._on_destroy)
+        else:
+            for added in builder:
+                pass
+
+    def cancel(self):
+        """Stop adding any remaining rows."""
+        if self._build_source:
+            GLib.source_remove(self._build_source)
+            self._build_source = None
+
+    def update(self, by_date):
+        """
+        Show the facts of ``by_date``, touching only what actually changed.
+
+        Sections of dates no longer present get removed, new ones are
+        inserted and those that stay have their rows reconciled.
+
+        Args:
+            by_date (dict): Dictionary where keys represent individual dates
+                and values an iterable of facts of that date.
+        """
+        # Finish any progressive build first so we can reconcile complete sections.
+        self.cancel()
+
+        for date in [date for date in self._dates if date not in by_date]:
+            self._remove_section(date)
+
+        for row, date in enumerate(sorted(by_date, reverse=True)):
+            if date in self._fact_lists:
+                self._fact_lists[date].update(by_date[date])
+            else:
+                self.insert_row(row)
+                self._add_section(date, row, by_date[date])
 
+    def update_sections(self, by_date, dates):
+        """
+        Show the facts of ``by_date`` for ``dates`` only, leaving all other sections alone.
+
+        Args:
+            by_date (dict): Dictionary where keys represent individual dates
+                and values an iterable of facts of that date.
+            dates (set): Dates whose facts changed.
+        """
+        if self._build_source:
+            # Sections yet to be built would miss the change.
+            self.update(by_date)
+            return
+
+        for date in dates:
+            facts = by_date.get(date)
+            if date in self._fact_lists:
+                if facts:
+                    self._fact_lists[date].update(facts)
+                else:
+                    self._remove_section(date)
+            elif facts:
+                row = len([other for other in self._dates if other > date])
+                self.insert_row(row)
+                self._add_section(date, row, facts)
+
+    def _add_section(self, date, row, facts):
+        """Attach the widgets representing a date and its facts at ``row``."""
+        date_widget = self._get_date_widget(date)
+        fact_list = self._get_fact_list(self._controller, facts)
+        self.attach(date_widget, 0, row, 1, 1)
+        self.attach(fact_list, 1, row, 1, 1)
+        date_widget.show_all()
+        fact_list.show_all()
+        self._dates.insert(row, date)
+        self._fact_lists[date] = fact_list
+        return fact_list
+
+    def _remove_section(self, date):
+        """Remove the widgets representing a date and its facts."""
+        self.remove_row(self._dates.index(date))
+        self._dates.remove(date)
+        del self._fact_lists[date]
+
+    def _build(self, initial):
+        """
+        Add a section for each date and a row for each of its facts.
+
+        This is a generator that yields the total amount of added facts after
+        each one.
+        """
         initial = sorted(initial.items(), key=operator.itemgetter(0), reverse=True)
 
-        row = 0
-        for date, facts in initial:
+        added = 0
+        for row, (date, facts) in enumerate(initial):
             # [FIXME] Order by fact start
-            self.attach(self._get_date_widget(date), 0, row, 1, 1)
-            self.attach(self._get_fact_list(controller, facts), 1, row, 1, 1)
-            row += 1
+            fact_list = self._add_section(date, row, [])
+            for fact in facts:
+                fact_list.add_fact(fact)
+                added += 1
+                yield added
+        self._build_source = None
+
+    def _on_destroy(self, widget):
+        """Make sure we do not try to add rows to a destroyed widget."""
+        self.cancel()
 
     def _get_date_widget(self, date):
         """
@@ -93,6 +238,8 @@ class FactListBox(Gtk.ListBox):
         super(FactListBox, self).__init__()
 
         self._controller = controller
+        # Maps fact keys to the rows representing them.
+        self._rows = {}
 
         self.set_name('OverviewFactList')
         self.set_selection_mode(Gtk.SelectionMode.SINGLE)
@@ -100,8 +247,39 @@ class FactListBox(Gtk.ListBox):
         self.connect('row-activated', self._on_activate)
 
         for fact in facts:
-            row = FactListRow(fact)
-            self.add(row)
+            self.add_fact(fact)
+
+    def add_fact(self, fact, position=-1):
+        """Add a row representing ``fact``."""
+        row = FactListRow(fact)
+        self.insert(row, position)
+        row.show_all()
+        self._rows[_get_fact_key(fact)] = row
+        return row
+
+    def update(self, facts):
+        """
+        Show ``facts``, keeping all rows whose fact did not change.
+
+        Rows are identified by their facts PK. Rows of facts that got removed
+        are destroyed, those of changed facts are replaced. Rows of facts that
+        just moved are reordered.
+        """
+        keys = [_get_fact_key(fact) for fact in facts]
+        for key in set(self._rows) - set(keys):
+            self._rows.pop(key).destroy()
+
+        for position, (key, fact) in enumerate(zip(keys, facts)):
+            row = self._rows.get(key)
+            if row is not None and row.fact != fact:
+                row.destroy()
+                row = None
+            if row is None:
+                self.add_fact(fact, position)
+            elif row.get_index() != position:
+                # ``self._rows`` keeps the row alive while it is not part of the list.
+                self.remove(row)
+                self.insert(row, position)
 
     # Signal callbacks
     def _on_activate(self, widget, row):
@@ -113,27 +291,16 @@ class FactListBox(Gtk.ListBox):
         elif response == Gtk.ResponseType.REJECT:
             self._delete_fact(edit_dialog._fact)
         elif response == Gtk.ResponseType.APPLY:
-            self._update_fact(edit_dialog.updated_fact)
+            self._update_fact(edit_dialog._fact, edit_dialog.updated_fact)
         edit_dialog.destroy()
 
-    def _update_fact(self, fact):
+    def _update_fact(self, old_fact, new_fact):
         """Update the a fact with values from edit dialog."""
-        try:
-            self._controller.store.facts.save(fact)
-        except (ValueError, KeyError) as message:
-            helpers.show_error(helpers.get_parent_window(self), message)
-        else:
-            self._controller.signal_handler.emit('facts-changed')
+        _update_fact(self, self._controller, old_fact, new_fact)
 
     def _delete_fact(self, fact):
         """Delete fact from the backend. No further confirmation is required."""
-        try:
-            result = self._controller.store.facts.remove(fact)
-        except (ValueError, KeyError) as error:
-            helpers.show_error(helpers.get_parent_window(self), error)
-        else:
-            self._controller.signal_handler.emit('facts-changed')
-            return result
+        return _delete_fact(self, self._controller, fact)
 
 
 class FactListRow(Gtk.ListBoxRow):
@@ -243,3 +410,196 @@ class FactBox(Gtk.Box):
             GObject.markup_escape_text(fact.description)))
         description_label.props.halign = Gtk.Align.START
         return description_label
+
+
+class FactTreeView(Gtk.TreeView):
+    """
+    Listing of facts per day that scales to large amounts of facts.
+
+    Unlike :class:`FactGrid`, which creates a bunch of widgets for each fact,
+    this is backed by a ``Gtk.TreeStore``. Rows are rendered by cell renderers
+    and only those actually visible are drawn. Each date is represented by a
+    top level row acting as section header for the facts of that day.
+    """
+
+    def __init__(self, controller, initial, *args, **kwargs):
+        """
+        Initialize widget.
+
+        Args:
+            initial (dict): Dictionary where keys represent individual dates
+                and values an iterable of facts of that date.
+        """
+        super(FactTreeView, self).__init__(*args, **kwargs)
+        self._controller = controller
+        self.set_name('OverviewFactTreeView')
+        self.set_headers_visible(False)
+        self.props.activate_on_single_click = False
+
+        # The only column holds either a ``datetime.date`` (section header) or a fact.
+        self._store = Gtk.TreeStore(GObject.TYPE_PYOBJECT)
+        self._populate(initial)
+        self.set_model(self._store)
+
+        self.append_column(self._get_column(self._render_time))
+        fact_column = self._get_column(self._render_fact)
+        fact_column.set_expand(True)
+        self.append_column(fact_column)
+        self.append_column(self._get_column(self._render_delta))
+        self.expand_all()
+
+        self.connect('row-activated', self._on_row_activated)
+
+    def _populate(self, initial):
+        """Add one section per date and one row per fact to the store."""
+        # ``Gtk.TreeStore`` iters persist as long as their row exists.
+        self._sections = {}
+        for date, facts in sorted(initial.items(), key=operator.itemgetter(0), reverse=True):
+            date_iter = self._store.append(None, [date])
+            self._sections[date] = date_iter
+            for fact in sorted(facts, key=operator.attrgetter('start')):
+                self._store.append(date_iter, [fact])
+
+    def update(self, by_date):
+        """
+        Show the facts of ``by_date``, touching only rows that actually changed.
+
+        Args:
+            by_date (dict): Dictionary where keys represent individual dates
+                and values an iterable of facts of that date.
+        """
+        for date in [date for date in self._sections if date not in by_date]:
+            self._store.remove(self._sections.pop(date))
+
+        for position, date in enumerate(sorted(by_date, reverse=True)):
+            self._show_section(date, position, by_date[date])
+
+    def update_sections(self, by_date, dates):
+        """
+        Show the facts of ``by_date`` for ``dates`` only, leaving all other sections alone.
+
+        Args:
+            by_date (dict): Dictionary where keys represent individual dates
+                and values an iterable of facts of that date.
+            dates (set): Dates whose facts changed.
+        """
+        for date in dates:
+            facts = by_date.get(date)
+            if facts:
+                position = len([other for other in self._sections if other > date])
+                self._show_section(date, position, facts)
+            elif date in self._sections:
+                self._store.remove(self._sections.pop(date))
+
+    def _show_section(self, date, position, facts):
+        """Show the section of ``date`` at ``position``, listing ``facts``."""
+        date_iter = self._sections.get(date)
+        if date_iter is None:
+            date_iter = self._store.insert(None, position, [date])
+            self._sections[date] = date_iter
+        self._update_section(date_iter, sorted(facts, key=operator.attrgetter('start')))
+        self.expand_row(self._store.get_path(date_iter), False)
+
+    def _update_section(self, date_iter, facts):
+        """Reconcile the child rows of a section with ``facts``."""
+        children = {}
+        child = self._store.iter_children(date_iter)
+        while child is not None:
+            children[_get_fact_key(self._store[child][0])] = child
+            child = self._store.iter_next(child)
+
+        keys = [_get_fact_key(fact) for fact in facts]
+        for key in set(children) - set(keys):
+            self._store.remove(children.pop(key))
+
+        for position, (key, fact) in enumerate(zip(keys, facts)):
+            child = children.get(key)
+            if child is not None and self._store.get_path(child).get_indices()[-1] == position:
+                if self._store[child][0] != fact:
+                    self._store[child][0] = fact
+                continue
+            if child is not None:
+                self._store.remove(child)
+            children[key] = self._store.insert(date_iter, position, [fact])
+
+    def _get_column(self, render_func):
+        """Return a column that renders its cells with ``render_func``."""
+        renderer = Gtk.CellRendererText()
+        renderer.props.yalign = 0
+        column = Gtk.TreeViewColumn()
+        column.pack_start(renderer, True)
+        column.set_cell_data_func(renderer, render_func)
+        return column
+
+    # Cell data functions
+    def _render_time(self, column, cell, model, iter, data):
+        """Render the date for section headers, ``Fact.start`` and ``Fact.end`` otherwise."""
+        value = model[iter][0]
+        if self._is_date(value):
+            markup = '<b>{}</b>'.format(GObject.markup_escape_text(value.strftime("%A %b %d")))
+        else:
+            markup = GObject.markup_escape_text('{start} - {end}'.format(
+                start=value.start.strftime('%H:%M'), end=value.end.strftime('%H:%M')))
+        cell.set_property('markup', markup)
+
+    def _render_fact(self, column, cell, model, iter, data):
+        """Render activity, category, tags and description of a fact."""
+        value = model[iter][0]
+        if self._is_date(value):
+            markup = ''
+        else:
+            markup = self._get_fact_markup(value)
+        cell.set_property('markup', markup)
+
+    def _render_delta(self, column, cell, model, iter, data):
+        """Render ``Fact.delta``."""
+        value = model[iter][0]
+        if self._is_date(value):
+            text = ''
+        else:
+            text = '{} Minutes'.format(value.get_string_delta())
+        cell.set_property('text', text)
+
+    def _get_fact_markup(self, fact):
+        """Return markup representing everything about a fact but its times."""
+        if not fact.category:
+            category = 'not categorised'
+        else:
+            category = str(fact.category)
+        lines = ['{activity} - {category}'.format(
+            activity=GObject.markup_escape_text(fact.activity.name),
+            category=GObject.markup_escape_text(category))]
+        if fact.tags:
+            lines.append('<small>{}</small>'.format(GObject.markup_escape_text(
+                ' '.join(['#{}'.format(tag.name) for tag in fact.tags]))))
+        if fact.description:
+            lines.append('<small><i>{}</i></small>'.format(
+                GObject.markup_escape_text(fact.description)))
+        return '\n'.join(lines)
+
+    def _is_date(self, value):
+        """Check if a row value represents a section header."""
+        return isinstance(value, datetime.date)
+
+    # Signal callbacks
+    def _on_row_activated(self, view, path, column):
+        """Callback trigger if a row is 'activated'."""
+        fact = self._store[path][0]
+        if self._is_date(fact):
+            return
+
+        edit_dialog = EditFactDialog(helpers.get_parent_window(self), fact)
+        response = edit_dialog.run()
+        if response == Gtk.ResponseType.REJECT:
+            self._delete_fact(edit_dialog._fact)
+        elif response == Gtk.ResponseType.APPLY:
+            self._update_fact(edit_dialog._fact, edit_dialog.updated_fact)
+        edit_dialog.destroy()
+
+    def _update_fact(self, old_fact, new_fact):
+        """Update the a fact with values from edit dialog."""
+        _update_fact(self, self._controller, old_fact, new_fact)
+
+    def _delete_fact(self, fact):
+        """Delete fact from the backend. No further confirmation is required."""
+        return _delete_fact(self, self._controller, fact)
@@ -124,10 +124,21 @@ class Summary(Gtk.Box):
     def __init__(self, category_totals):
         """Initialize widget."""
         super(Summary, self).__init__()
-
-        for category, total in category_totals:
+        self._labels = []
+        self.update(category_totals)
+
+    def update(self, category_totals):
+        """Show new totals, reusing the existing labels where possible."""
+        category_totals = list(category_totals)
+        while len(self._labels) > len(category_totals):
+            self._labels.pop().destroy()
+        while len(self._labels) < len(category_totals):
             label = Gtk.Label()
+            self.pack_start(label, False, False, 10)
+            label.show()
+            self._labels.append(label)
+
+        for label, (category, total) in zip(self._labels, category_totals):
             label.set_markup("<b>{}:</b> {} minutes".format(
                 GObject.markup_escape_text(text_type(category)),
                 int(total.total_seconds() / 60)))
-            self.pack_start(label, False, False, 10)
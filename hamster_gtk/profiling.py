@@ -0,0 +1,321 @@
+# -*- encoding: utf-8 -*-
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Provide opt-in instrumentation of startup and keystroke latency.
+
+Set ``HAMSTER_GTK_PROFILE_KEYSTROKES`` to any non empty value to have timings
+of each keystroke in ``RawFactEntry`` recorded and a summary printed on exit.
+
+Set ``HAMSTER_GTK_TRACE_STARTUP`` to a path (or pass ``--trace-startup``) to
+have a timeline of the startup phases written there as Chrome trace events.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import io
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from six import text_type
+
+from .clock import clock
+
+# Environment variable enabling keystroke profiling.
+KEYSTROKE_PROFILING_VARIABLE = 'HAMSTER_GTK_PROFILE_KEYSTROKES'
+# Percentiles reported for each metric.
+PERCENTILES = (50, 95, 99)
+# Metrics recorded for ``RawFactEntry`` keystrokes.
+KEYSTROKE_METRICS = ('parse_time', 'lookup_time', 'model_switch_time', 'rows',
+                     'match_func_calls')
+
+# Environment variable holding the path a startup trace is written to.
+STARTUP_TRACE_VARIABLE = 'HAMSTER_GTK_TRACE_STARTUP'
+# Path used if ``--trace-startup`` is passed without one.
+DEFAULT_STARTUP_TRACE_PATH = 'hamster-gtk-startup-trace.json'
+
+logger = logging.getLogger(__name__)
+
+
+def is_keystroke_profiling_enabled(environ=os.environ):
+    """Check if keystroke profiling has been asked for by the environment."""
+    return bool(environ.get(KEYSTROKE_PROFILING_VARIABLE))
+
+
+def get_startup_trace_path(environ=os.environ):
+    """Return the path a startup trace is to be written to, ``None`` if not asked for."""
+    return environ.get(STARTUP_TRACE_VARIABLE) or None
+
+
+def get_percentile(values, percentile):
+    """
+    Return a percentile of ``values`` using the nearest rank method.
+
+    Args:
+        values (list): Sorted list of numbers.
+        percentile (int): Percentile to be returned, between ``0`` and ``100``.
+
+    Returns:
+        float: Value of the percentile, ``None`` if there are no values.
+    """
+    if not values:
+        return None
+    rank = int(math.ceil(percentile / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+class _NullContext(object):
+    """Context manager that does nothing at all."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Measurement(object):
+    """Context manager adding the time spent within it to a keystrokes metric."""
+
+    def __init__(self, keystroke, metric):
+        self._keystroke = keystroke
+        self._metric = metric
+
+    def __enter__(self):
+        self._start = clock()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = clock() - self._start
+        self._keystroke[self._metric] = self._keystroke.get(self._metric, 0) + elapsed
+        return False
+
+
+class _Span(object):
+    """Context manager recording the time spent within it as a complete trace event."""
+
+    def __init__(self, tracer, name):
+        self._tracer = tracer
+        self._name = name
+
+    def __enter__(self):
+        self._start = clock()
+        return self
+
+    def __exit__(self, *args):
+        self._tracer._add_event(self._name, 'X', self._start, dur=clock() - self._start)
+        return False
+
+
+class StartupTracer(object):
+    """
+    Record a timeline of startup phases.
+
+    Phases are written in Chrome's trace event format, so they can be inspected
+    with ``chrome://tracing`` or Perfetto. Timestamps are relative to the
+    tracers creation.
+
+    Tracing stops once all events passed to ``wait_for`` have been marked or
+    ``close`` is called, whichever comes first. If disabled, all methods do
+    nothing, so callers do not have to check.
+    """
+
+    _null_context = _NullContext()
+
+    def __init__(self, path=None):
+        """
+        Initialize tracer.
+
+        Args:
+            path (text_type, optional): Path the trace is written to. If ``None``,
+                nothing is recorded at all.
+        """
+        self.path = path
+        self.enabled = path is not None
+        self._origin = clock()
+        self._events = []
+        self._pending = set()
+
+    def span(self, name):
+        """
+        Return a context manager recording the time spent within it as ``name``.
+
+        Example:
+            with tracer.span('load config'):
+                load_config()
+        """
+        if not self.enabled:
+            return self._null_context
+        return _Span(self, name)
+
+    def begin(self, name):
+        """Begin a phase that ends with a call to ``end`` from the same thread."""
+        if self.enabled:
+            self._add_event(name, 'B', clock())
+
+    def end(self, name):
+        """End a phase begun by ``begin``."""
+        if self.enabled:
+            self._add_event(name, 'E', clock())
+
+    def wait_for(self, *names):
+        """Keep tracing until each of ``names`` has been passed to ``mark``."""
+        if self.enabled:
+            self._pending.update(names)
+
+    def mark(self, name):
+        """Record that ``name`` happened just now."""
+        if not self.enabled:
+            return
+        self._add_event(name, 'i', clock(), s='p')
+        if name in self._pending:
+            self._pending.remove(name)
+            if not self._pending:
+                self.close()
+
+    def close(self):
+        """Stop tracing and write all events recorded to ``path``."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        data = {'traceEvents': self._events, 'displayTimeUnit': 'ms'}
+        try:
+            with io.open(self.path, 'w', encoding='utf-8') as fobj:
+                fobj.write(text_type(json.dumps(data, ensure_ascii=False)))
+        except (IOError, OSError) as error:
+            logger.error("Failed to write the startup trace to %s: %s", self.path, error)
+
+    def _add_event(self, name, phase, moment, **kwargs):
+        """Add a trace event, ``moment`` and ``dur`` being ``clock`` seconds."""
+        event = {
+            'name': name,
+            'cat': 'startup',
+            'ph': phase,
+            'ts': self._get_microseconds(moment - self._origin),
+            'pid': os.getpid(),
+            'tid': threading.current_thread().ident,
+        }
+        if 'dur' in kwargs:
+            kwargs['dur'] = self._get_microseconds(kwargs['dur'])
+        event.update(kwargs)
+        self._events.append(event)
+
+    def _get_microseconds(self, seconds):
+        return round(seconds * 1000000, 1)
+
+
+class KeystrokeProfiler(object):
+    """
+    Record timings and counts of each keystroke.
+
+    A keystroke starts with ``begin`` and lasts until the next one begins, so
+    work GTK does later on (such as calling the completions match function for
+    each row) is accounted for as well. Metrics whose name ends in ``_time``
+    are durations in seconds, anything else is a count. Each keystroke records
+    a value for every metric known, ``0`` for those it did not trigger at all.
+
+    If disabled, all methods do nothing, so callers do not have to check.
+    """
+
+    _null_context = _NullContext()
+
+    def __init__(self, enabled=False, metrics=()):
+        """
+        Initialize profiler.
+
+        Args:
+            enabled (bool, optional): Whether anything is recorded at all.
+            metrics (iterable, optional): Metrics known in advance. Any other
+                metric becomes known once it is recorded for the first time.
+        """
+        self.enabled = enabled
+        # Maps each metric to the list of its values, one per keystroke.
+        self._samples = OrderedDict((metric, []) for metric in metrics)
+        self._keystrokes = 0
+        self._keystroke = None
+
+    def begin(self):
+        """Start recording a new keystroke."""
+        if not self.enabled:
+            return
+        self.finish()
+        self._keystroke = OrderedDict()
+
+    def finish(self):
+        """Stop recording the current keystroke, if any."""
+        if self._keystroke is None:
+            return
+        for metric in self._keystroke:
+            if metric not in self._samples:
+                self._samples[metric] = [0] * self._keystrokes
+        for metric, values in self._samples.items():
+            values.append(self._keystroke.get(metric, 0))
+        self._keystrokes += 1
+        self._keystroke = None
+
+    def measure(self, metric):
+        """
+        Return a context manager adding the time spent within it to ``metric``.
+
+        Example:
+            with profiler.measure('parse_time'):
+                parse(text)
+        """
+        if self._keystroke is None:
+            return self._null_context
+        return _Measurement(self._keystroke, metric)
+
+    def count(self, metric, amount=1):
+        """Add ``amount`` to a count of the current keystroke."""
+        if self._keystroke is not None:
+            self._keystroke[metric] = self._keystroke.get(metric, 0) + amount
+
+    def get_report(self):
+        """
+        Return percentiles of each metric over all keystrokes recorded so far.
+
+        Returns:
+            collections.OrderedDict: Maps each metric to a dictionary mapping
+            each of ``PERCENTILES`` to its value.
+        """
+        self.finish()
+        report = OrderedDict()
+        if not self._keystrokes:
+            return report
+        for metric, values in self._samples.items():
+            values = sorted(values)
+            report[metric] = OrderedDict(
+                (percentile, get_percentile(values, percentile)) for percentile in PERCENTILES)
+        return report
+
+    def format_report(self):
+        """Return ``get_report`` as human readable text, durations in milliseconds."""
+        report = self.get_report()
+        lines = ['Keystroke latency ({} keystrokes):'.format(self._keystrokes)]
+        for metric, percentiles in report.items():
+            columns = []
+            for percentile, value in percentiles.items():
+                if metric.endswith('_time'):
+                    columns.append('p{} {:8.3f} ms'.format(percentile, value * 1000))
+                else:
+                    columns.append('p{} {:8d}'.format(percentile, int(value)))
+            lines.append('  {:<18} {}'.format(metric, '  '.join(columns)))
+        return '\n'.join(lines)
@@ -85,6 +85,8 @@ class CurrentFactBox(Gtk.Box):
         # Switch to Grid based layout.
         super(CurrentFactBox, self).__init__(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         self._controller = controller
+        # The *ongoing fact* currently shown.
+        self._fact = None
         self.content = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
         self.pack_start(self.content, False, False, 0)
 
@@ -101,6 +103,7 @@ class CurrentFactBox(Gtk.Box):
                 # switch to this screen has been triggered without an ongoing
                 # fact existing.
                 self.content.pack_start(self._get_invalid_label(), True, True, 0)
+        self._fact = fact
         self.content.pack_start(self._get_fact_label(fact), True, True, 0)
         self.content.pack_start(self._get_cancel_button(), False, False, 0)
         self.content.pack_start(self._get_save_button(), False, False, 0)
@@ -136,6 +139,8 @@ class CurrentFactBox(Gtk.Box):
             helpers.show_error(helpers.get_parent_window(self), err)
         else:
             self.emit('tracking-stopped')
+            if self._fact:
+                self._controller.signal_handler.emit('fact-removed', self._fact)
 
     def _on_save_button(self, button):
         """
@@ -144,13 +149,17 @@ class CurrentFactBox(Gtk.Box):
         Save *ongoing fact* to storage.
         """
         try:
-            self._controller.store.facts.stop_tmp_fact()
+            fact = self._controller.store.facts.stop_tmp_fact()
         except Exception as error:
             helpers.show_error(helpers.get_parent_window(self), error)
         else:
             self.emit('tracking-stopped')
-            # Inform the controller about the chance.
-            self._controller.signal_handler.emit('facts-changed')
+            # Inform the controller about the chance. The *ongoing fact* is
+            # replaced by the now stored fact.
+            if self._fact:
+                self._controller.signal_handler.emit('fact-updated', self._fact, fact)
+            else:
+                self._controller.signal_handler.emit('fact-added', fact)
 
 
 class StartTrackingBox(Gtk.Box):
@@ -223,9 +232,14 @@ class StartTrackingBox(Gtk.Box):
                 helpers.show_error(self.get_top_level(), error)
             else:
                 self.emit('tracking-started')
-                self._app.controller.signal_handler.emit('facts-changed')
+                self._app.controller.signal_handler.emit('fact-added', fact)
                 self.reset()
 
+    def start_tracking(self, raw_fact):
+        """Start a new *ongoing fact* as if ``raw_fact`` had been entered by the user."""
+        self.raw_fact_entry.props.text = raw_fact
+        self._start_ongoing_fact()
+
     def reset(self):
         """Clear all data entry fields."""
         self.raw_fact_entry.props.text = ''
@@ -17,8 +17,8 @@ with open('HISTORY.rst', encoding='utf-8') as history_file:
     history = history_file.read().replace('.. :changelog:', '')
 
 requirements = [
-    'orderedset',
-    'hamster-lib >= 0.13.0',
+    # ``FactCache`` relies on ``FactManager._get_all(partial=True)``.
+    'hamster-lib >= 0.13.0, < 0.14',
 ]
 
 setup(
@@ -46,7 +46,7 @@ setup(
     ],
     entry_points='''
     [gui_scripts]
-    hamster-gtk=hamster_gtk.hamster_gtk:_main
+    hamster-gtk=hamster_gtk.launcher:main
     ''',
 
     package_data={
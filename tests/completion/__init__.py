@@ -0,0 +1 @@
+"""Unittests for the completion submodule."""
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""Fixtures for unittesting the completion submodule."""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+import pytest
+
+from hamster_gtk.completion import CompletionIndex
+
+
+@pytest.fixture
+def completion_index(request, app, tmpdir):
+    """Return a ``CompletionIndex`` instance that has not been populated yet."""
+    index = CompletionIndex(app)
+    index._path = tmpdir.join('completion-index.json').strpath
+    return index
+
+
+@pytest.fixture
+def recent_fact_factory(request, fact_factory):
+    """Return a callable that builds stored facts within the autocompletion window."""
+    def build(**kwargs):
+        start = datetime.datetime.now() - datetime.timedelta(hours=3)
+        defaults = {'start': start, 'end': start + datetime.timedelta(hours=1)}
+        defaults.update(kwargs)
+        return fact_factory(**defaults)
+    return build
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for FrecencyScores."""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+import pytest
+
+from hamster_gtk.completion.frecency import FrecencyScores
+
+
+@pytest.fixture
+def scores(request):
+    """Return empty ``FrecencyScores`` with a half life of one day."""
+    return FrecencyScores(half_life=datetime.timedelta(days=1))
+
+
+class TestFrecencyScores(object):
+    """Unittests for FrecencyScores."""
+
+    def test_get_current(self, scores):
+        """Make sure the weight of a use halves after each half life."""
+        now = datetime.datetime(2016, 4, 1, 12)
+        scores.add_use('foo', now - datetime.timedelta(days=1))
+        scores.add_use('foo', now - datetime.timedelta(days=2))
+        assert scores.get_current('foo', now) == pytest.approx(0.75)
+
+    def test_get_ranking(self, scores):
+        """Make sure a recent use outweighs two uses that are long ago."""
+        now = datetime.datetime(2016, 4, 1, 12)
+        scores.add_use('old', now - datetime.timedelta(days=5))
+        scores.add_use('old', now - datetime.timedelta(days=5))
+        scores.add_use('recent', now)
+        assert scores.get('recent') > scores.get('old')
+
+    def test_remove_use(self, scores):
+        """Make sure removing the last use drops the key."""
+        now = datetime.datetime(2016, 4, 1, 12)
+        scores.add_use('foo', now)
+        scores.remove_use('foo', now)
+        assert len(scores) == 0
+
+    def test_dump_restore(self, scores):
+        """Make sure scores survive a roundtrip."""
+        scores.add_use(('activity', 'foo'), datetime.datetime(2016, 4, 1, 12))
+        restored = FrecencyScores(half_life=datetime.timedelta(days=1))
+        assert restored.restore(scores.dump())
+        assert restored.get(('activity', 'foo')) == scores.get(('activity', 'foo'))
+
+    def test_restore_other_half_life(self, scores):
+        """Make sure scores computed with a different half life are not used."""
+        scores.add_use('foo', datetime.datetime(2016, 4, 1, 12))
+        assert FrecencyScores(half_life=datetime.timedelta(days=2)).restore(
+            scores.dump()) is False
+
+    @pytest.mark.parametrize('data', ({}, {'half_life': 86400.0, 'scores': [[]]}, None))
+    def test_restore_invalid(self, scores, data):
+        """Make sure unusable data is ignored."""
+        assert scores.restore(data) is False
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for CompletionIndex."""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+import os.path
+
+import pytest
+from hamster_lib import Tag
+
+from hamster_gtk.completion import CompletionIndex
+from hamster_gtk.completion.index import SEGMENTS
+from hamster_gtk.completion.sources import (ActivityUsage, ActivityUse, DescriptionUsage,
+                                            TagUsage, get_activity_key)
+
+
+def get_usage(*facts):
+    """Return ``ActivityUsage`` tuples counting one use per fact."""
+    return [ActivityUsage(*(get_activity_key(fact.activity) + (1, fact.start)))
+            for fact in facts]
+
+
+class TestCompletionIndex(object):
+    """Unittests for CompletionIndex."""
+
+    def test_match_not_populated(self, app, completion_index, mocker):
+        """Make sure the index is populated in the background once it is first queried."""
+        app.worker.submit = mocker.MagicMock()
+        assert completion_index.match('activity', '') == []
+        assert completion_index.match('activity', '') == []
+        assert app.worker.submit.call_count == 1
+        assert completion_index._repopulate is None
+
+    def test_match(self, completion_index, mocker):
+        """Make sure prefix matches come first, each ranked by usage."""
+        now = datetime.datetime.now()
+        completion_index._get_usage = mocker.MagicMock(return_value=[
+            ActivityUsage('coding', None, 1, now),
+            ActivityUsage('decoding', None, 5, now),
+            ActivityUsage('codereview', None, 3, now),
+            ActivityUsage('meeting', None, 9, now),
+        ])
+        completion_index.populate()
+        result = completion_index.match('activity', 'Cod')
+        assert result == ['codereview', 'coding', 'decoding']
+
+    def test_match_fuzzy(self, completion_index, mocker):
+        """Make sure fuzzy matches are added after all other matches."""
+        now = datetime.datetime.now()
+        completion_index._get_usage = mocker.MagicMock(return_value=[
+            ActivityUsage('meeting', None, 1, now),
+            ActivityUsage('metal', None, 9, now),
+            ActivityUsage('coding', None, 1, now),
+        ])
+        completion_index.populate()
+        assert completion_index.match('activity', 'metting') == ['meeting']
+        assert completion_index.match('activity', 'met') == ['metal', 'meeting']
+
+    def test_match_tags(self, completion_index, mocker):
+        """Make sure tags are ranked by usage."""
+        now = datetime.datetime.now()
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index._get_tag_usage = mocker.MagicMock(return_value=[
+            TagUsage('work', 1, now),
+            TagUsage('workshop', 5, now),
+        ])
+        completion_index.populate()
+        assert completion_index.match('tags', 'wor') == ['workshop', 'work']
+
+    def test_match_description(self, completion_index, mocker):
+        """Make sure only descriptions of the given activity are returned."""
+        now = datetime.datetime.now()
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index._get_description_usage = mocker.MagicMock(return_value=[
+            DescriptionUsage('foo', 'bar', 'planning', 1, now),
+            DescriptionUsage('foo', None, 'plumbing', 1, now),
+        ])
+        completion_index.populate()
+        assert completion_index.match('description', 'pl', activity='foo@bar') == ['planning']
+        assert completion_index.match('description', 'pl', activity='baz') == []
+
+    def test_add_fact_tags_description(self, completion_index, recent_fact_factory, mocker):
+        """Make sure tags and the description of a new fact are indexed incrementally."""
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        fact = recent_fact_factory(pk=1, tags=[Tag('meeting')])
+        activity = get_activity_key(fact.activity)
+        activity_text = '{}@{}'.format(*activity)
+        completion_index.add_fact(fact)
+        assert completion_index.match('tags', '') == ['meeting']
+        assert completion_index.match('description', '', activity=activity_text) == [
+            fact.description]
+        completion_index.remove_fact(fact)
+        assert completion_index.match('tags', '') == []
+        assert completion_index.match('description', '', activity=activity_text) == []
+
+    def test_match_limit(self, completion_index, recent_fact_factory, mocker):
+        """Make sure no more than ``limit`` candidates are returned."""
+        completion_index._get_usage = mocker.MagicMock(return_value=get_usage(
+            *[recent_fact_factory() for index in range(5)]))
+        completion_index.populate()
+        assert len(completion_index.match('activity', '', limit=3)) == 3
+
+    def test_populate(self, completion_index, recent_fact_factory, mocker):
+        """Make sure each segment model holds unique texts."""
+        fact = recent_fact_factory(pk=1)
+        duplicate = recent_fact_factory(pk=2, activity=fact.activity)
+        completion_index._get_usage = mocker.MagicMock(return_value=get_usage(fact, duplicate))
+        completion_index.populate()
+        for segment in SEGMENTS:
+            assert len(completion_index._candidates[segment]) == 1
+        assert completion_index._usage['activity'][fact.activity.name][0] == 2
+
+    def test_match_frecency(self, completion_index, mocker):
+        """Make sure recent uses outweigh frequent but old ones."""
+        now = datetime.datetime.now()
+        old = now - datetime.timedelta(days=60)
+        completion_index._get_usage = mocker.MagicMock(return_value=[
+            ActivityUsage('coding', None, 3, old),
+            ActivityUsage('cooking', None, 1, now),
+        ])
+        completion_index._get_uses = mocker.MagicMock(return_value=[
+            ActivityUse('coding', None, old),
+            ActivityUse('coding', None, old),
+            ActivityUse('coding', None, old),
+            ActivityUse('cooking', None, now),
+        ])
+        completion_index.populate()
+        assert completion_index.match('activity', 'co') == ['cooking', 'coding']
+
+    def test_populate_loads_snapshot(self, app, completion_index, mocker):
+        """Make sure the persisted index is used instead of querying the database."""
+        mocker.patch('hamster_gtk.completion.storage.get_database_mtime', return_value=1.0)
+        completion_index._get_usage = mocker.MagicMock(return_value=[
+            ActivityUsage('coding', None, 1, datetime.datetime.now())])
+        completion_index.populate()
+        completion_index._scores.add_use(('activity', 'coding'), datetime.datetime.now())
+        completion_index.save()
+        loaded = CompletionIndex(app)
+        loaded._path = completion_index._path
+        loaded._get_usage = mocker.MagicMock(return_value=[])
+        loaded._get_uses = mocker.MagicMock(return_value=[])
+        loaded.populate()
+        assert loaded._get_usage.called is False
+        assert loaded._get_uses.called is False
+        assert loaded.match('activity', '') == ['coding']
+        assert ('activity', 'coding') in loaded._scores
+
+    def test_populate_snapshot_other_database(self, app, completion_index, mocker):
+        """Make sure the persisted index is rebuilt if the database has been changed."""
+        mocker.patch('hamster_gtk.completion.storage.get_database_mtime', return_value=1.0)
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        completion_index._database_mtime = -1
+        completion_index.save()
+        completion_index._populated = False
+        completion_index.populate()
+        assert completion_index._get_usage.call_count == 2
+
+    def test_populate_snapshot_outdated(self, completion_index, mocker):
+        """Make sure candidates not used within the reference frame are dropped."""
+        mocker.patch('hamster_gtk.completion.storage.get_database_mtime', return_value=1.0)
+        old = datetime.datetime.now() - datetime.timedelta(days=400)
+        completion_index._get_usage = mocker.MagicMock(return_value=[
+            ActivityUsage('coding', None, 1, old)])
+        completion_index.populate()
+        completion_index.save()
+        completion_index._populated = False
+        completion_index.populate()
+        assert completion_index._get_usage.call_count == 1
+        assert completion_index.match('activity', '') == []
+
+    def test_populate_snapshot_unknown_mtime(self, completion_index, mocker):
+        """Make sure no snapshot is used if the database modification time is unknown."""
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        assert completion_index._database_mtime is None
+        completion_index.save()
+        assert os.path.exists(completion_index._path) is False
+        completion_index._database_mtime = 1.0
+        completion_index.save()
+        completion_index._populated = False
+        completion_index.populate()
+        assert completion_index._get_usage.call_count == 2
+
+    def test_save_error(self, completion_index, mocker):
+        """Make sure failing to write the snapshot is logged rather than raised."""
+        completion_index._populated = True
+        completion_index._database_mtime = 1.0
+        completion_index._path = os.path.join(completion_index._path, 'missing', 'index.json')
+        logger = mocker.patch('hamster_gtk.completion.index.logger')
+        completion_index.save()
+        assert logger.error.called
+
+    def test_populate_rescore(self, completion_index, mocker):
+        """Make sure scores are recomputed if requested."""
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index._get_uses = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        completion_index._get_uses.reset_mock()
+        completion_index.populate(rescore=True)
+        assert completion_index._get_uses.called
+
+    def test_populate_async(self, app, completion_index, mocker):
+        """Make sure only one population is run at a time."""
+        app.worker.submit = mocker.MagicMock()
+        completion_index.populate_async()
+        completion_index.populate_async(rescore=True)
+        assert app.worker.submit.call_count == 1
+        assert completion_index._repopulate is True
+
+    def test_ensure_populated(self, app, completion_index, mocker):
+        """Make sure the index is populated only once."""
+        app.worker.submit = mocker.MagicMock()
+        completion_index.ensure_populated()
+        completion_index.ensure_populated()
+        assert app.worker.submit.call_count == 1
+        assert completion_index._repopulate is None
+        completion_index._populating = False
+        completion_index._populated = True
+        completion_index.ensure_populated()
+        assert app.worker.submit.call_count == 1
+
+    @pytest.mark.parametrize(('keys', 'expectation'), (
+        ({'autocomplete_activities_range'}, True),
+        ({'day_start', 'fact_min_delta'}, True),
+        ({'db_path'}, True),
+        ({'autocomplete_split_activity'}, False),
+        ({'fact_min_delta'}, False),
+    ))
+    def test__on_config_changed(self, app, completion_index, keys, expectation, mocker):
+        """Make sure the index is only populated again if its timeframe or database changed."""
+        completion_index._populated = True
+        completion_index.populate_async = mocker.MagicMock()
+        app.controller.signal_handler.emit('config-changed', frozenset(keys))
+        app.controller.signal_handler.flush()
+        assert completion_index.populate_async.called is expectation
+
+    @pytest.mark.parametrize(('keys', 'expectation'), (
+        ({'autocomplete_activities_range'}, True),
+        ({'db_path'}, True),
+        ({'store', 'day_start'}, True),
+        ({'day_start'}, False),
+    ))
+    def test__on_config_changed_rescore(self, completion_index, keys, expectation, mocker):
+        """Make sure scores are recomputed if uses may have been unaccounted for."""
+        completion_index._populated = True
+        completion_index.populate_async = mocker.MagicMock()
+        completion_index._on_config_changed(None, frozenset(keys))
+        completion_index.populate_async.assert_called_with(rescore=expectation)
+
+    @pytest.mark.parametrize(('keys', 'expectation'), (
+        ({'db_path'}, False),
+        ({'autocomplete_activities_range'}, True),
+    ))
+    def test__on_config_changed_snapshot(self, completion_index, keys, expectation, mocker):
+        """Make sure the snapshot is dropped once the database changed."""
+        completion_index.populate_async = mocker.MagicMock()
+        with open(completion_index._path, 'w') as fobj:
+            fobj.write('{}')
+        completion_index._on_config_changed(None, frozenset(keys))
+        assert os.path.exists(completion_index._path) is expectation
+
+    def test__on_populated(self, app, completion_index, mocker):
+        """Make sure collected candidates are applied and listeners are notified."""
+        app.worker.submit = mocker.MagicMock()
+        ready = mocker.MagicMock()
+        app.controller.signal_handler.connect('completion-index-ready', ready)
+        completion_index.populate_async()
+        now = datetime.datetime.now()
+        completion_index._get_usage = mocker.MagicMock(return_value=[
+            ActivityUsage('coding', None, 1, now)])
+        collected = completion_index._collect(app.controller.store, app._config, now, now,
+                                              False, False)
+        completion_index._on_populated((now, collected), None)
+        assert completion_index.match('activity', '') == ['coding']
+        assert ready.called
+        assert app.worker.submit.call_count == 1
+
+    def test__on_populated_error(self, app, completion_index, mocker):
+        """Make sure a failed population is logged and retried only after a delay."""
+        app.worker.submit = mocker.MagicMock()
+        ready = mocker.MagicMock()
+        app.controller.signal_handler.connect('completion-index-ready', ready)
+        clock = mocker.patch('hamster_gtk.completion.index._clock', return_value=100)
+        logger = mocker.patch('hamster_gtk.completion.index.logger')
+        completion_index.populate_async()
+        completion_index._on_populated(None, ValueError())
+        assert logger.error.called
+        assert ready.called is False
+        assert completion_index._populated is False
+        completion_index.match('activity', '')
+        assert app.worker.submit.call_count == 1
+        clock.return_value = 200
+        completion_index.match('activity', '')
+        assert app.worker.submit.call_count == 2
+
+    def test__on_populated_error_backoff(self, completion_index, mocker):
+        """Make sure the retry delay grows with each failure in a row."""
+        mocker.patch('hamster_gtk.completion.index._clock', return_value=0)
+        mocker.patch('hamster_gtk.completion.index.logger')
+        delays = []
+        for attempt in range(10):
+            completion_index._on_populated(None, ValueError())
+            delays.append(completion_index._retry_at)
+        assert delays[:3] == [5, 10, 20]
+        assert delays[-1] == 300
+
+    def test__on_populated_repopulate(self, app, completion_index, recent_fact_factory,
+                                      mocker):
+        """Make sure facts changed while populating trigger another population."""
+        app.worker.submit = mocker.MagicMock()
+        completion_index.populate_async()
+        app.controller.signal_handler.emit('fact-added', recent_fact_factory(pk=1))
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        now = datetime.datetime.now()
+        collected = completion_index._collect(app.controller.store, app._config, now, now,
+                                              False, False)
+        completion_index._on_populated((now, collected), None)
+        assert app.worker.submit.call_count == 2
+
+    def test__on_fact_changed_own_commit(self, completion_index, recent_fact_factory, mocker):
+        """Make sure our own commits keep the index valid."""
+        get_mtime = mocker.patch('hamster_gtk.completion.index.storage.get_database_mtime')
+        completion_index._database_mtime = completion_index._committed_mtime = 1
+        get_mtime.return_value = 1
+        completion_index._on_before_commit(None)
+        get_mtime.return_value = 2
+        completion_index._on_after_commit(None)
+        completion_index._on_fact_added(None, recent_fact_factory(pk=1))
+        assert completion_index._database_mtime == 2
+
+    def test__on_fact_changed_external_commit(self, completion_index, recent_fact_factory,
+                                              mocker):
+        """Make sure changes by others are not hidden by a commit of ours."""
+        get_mtime = mocker.patch('hamster_gtk.completion.index.storage.get_database_mtime')
+        completion_index._database_mtime = completion_index._committed_mtime = 1
+        get_mtime.return_value = 5
+        completion_index._on_before_commit(None)
+        completion_index._on_after_commit(None)
+        completion_index._on_fact_added(None, recent_fact_factory(pk=1))
+        assert completion_index._database_mtime is None
+
+    def test__on_fact_changed_ongoing(self, completion_index, recent_fact_factory, mocker):
+        """Make sure starting an ongoing fact, which commits nothing, keeps the mtime."""
+        mocker.patch('hamster_gtk.completion.index.storage.get_database_mtime',
+                     return_value=5)
+        completion_index._database_mtime = completion_index._committed_mtime = 1
+        completion_index._on_fact_added(None, recent_fact_factory(pk=None, end=None))
+        assert completion_index._database_mtime == 1
+
+    def test_commits_watched(self, app, completion_index, mocker):
+        """Make sure commits of the applications store are noticed."""
+        completion_index._committed_mtime = 1
+        mocker.patch('hamster_gtk.completion.index.storage.get_database_mtime',
+                     return_value=2)
+        app.controller.store.session.commit()
+        assert completion_index._committed_mtime is None
+
+    def test__collect_job(self, app, completion_index, mocker):
+        """Make sure the workers own store is queried."""
+        controller = mocker.MagicMock()
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index._get_tag_usage = mocker.MagicMock(return_value=[])
+        completion_index._get_description_usage = mocker.MagicMock(return_value=[])
+        completion_index._get_uses = mocker.MagicMock(return_value=[])
+        now = datetime.datetime.now()
+        start, collected = completion_index._collect_job(controller, app._config, now, now,
+                                                         True, False)
+        completion_index._get_usage.assert_called_with(controller.store, now, now)
+        assert len(collected[4]) == 0
+
+    def test__get_window(self, app, completion_index):
+        """Make sure the configured reference frame is used."""
+        start, end = completion_index._get_window()
+        today = datetime.date.today()
+        offset = datetime.timedelta(days=app._config['autocomplete_activities_range'])
+        assert start == datetime.datetime.combine(today - offset, app._config['day_start'])
+        assert end > datetime.datetime.combine(today, app._config['day_start'])
+
+    def test_add_fact(self, completion_index, recent_fact_factory, mocker):
+        """Make sure a new activity is inserted."""
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        completion_index.add_fact(recent_fact_factory(pk=1))
+        assert len(completion_index._candidates['activity']) == 1
+
+    def test_add_fact_ongoing(self, completion_index, recent_fact_factory, mocker):
+        """Make sure facts that have not been stored yet are ignored."""
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        completion_index.add_fact(recent_fact_factory(pk=None, end=None))
+        assert len(completion_index._candidates['activity']) == 0
+
+    def test_add_fact_scores(self, completion_index, recent_fact_factory, mocker):
+        """Make sure a new fact counts as use of its activity."""
+        completion_index._get_usage = mocker.MagicMock(return_value=[])
+        completion_index.populate()
+        fact = recent_fact_factory(pk=1)
+        completion_index.add_fact(fact)
+        assert ('activity', fact.activity.name) in completion_index._scores
+        completion_index.remove_fact(fact)
+        assert ('activity', fact.activity.name) not in completion_index._scores
+
+    def test_remove_fact(self, completion_index, recent_fact_factory, mocker):
+        """Make sure an entry is removed once no fact refers to it anymore."""
+        fact = recent_fact_factory(pk=1)
+        duplicate = recent_fact_factory(pk=2, activity=fact.activity)
+        completion_index._get_usage = mocker.MagicMock(return_value=get_usage(fact, duplicate))
+        completion_index.populate()
+        completion_index.remove_fact(fact)
+        assert len(completion_index._candidates['activity']) == 1
+        completion_index.remove_fact(duplicate)
+        assert len(completion_index._candidates['activity']) == 0
+
+    def test_fact_updated_signal(self, app, completion_index, recent_fact_factory, mocker):
+        """Make sure updated facts replace their old version."""
+        old_fact = recent_fact_factory(pk=1)
+        completion_index._get_usage = mocker.MagicMock(return_value=get_usage(old_fact))
+        completion_index.populate()
+        new_fact = recent_fact_factory(pk=1)
+        app.controller.signal_handler.emit('fact-updated', old_fact, new_fact)
+        assert list(completion_index._candidates['activity']) == [new_fact.activity.name]
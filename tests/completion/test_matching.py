@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for the completion matching module."""
+
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+
+from hamster_gtk.completion.matching import CandidateIndex, fuzzy_score
+
+
+@pytest.fixture
+def candidate_index(request):
+    """Return a ``CandidateIndex`` with a few candidates."""
+    index = CandidateIndex()
+    for text in ('Coding', 'decoding', 'code review', 'meeting'):
+        index.add(text)
+    return index
+
+
+class TestCandidateIndex(object):
+    """Unittests for CandidateIndex."""
+
+    @pytest.mark.parametrize(('query', 'expectation'), (
+        ('', {'Coding', 'decoding', 'code review', 'meeting'}),
+        ('cod', {'Coding', 'code review'}),
+        ('CODE', {'code review'}),
+        ('x', set()),
+    ))
+    def test_get_prefix_matches(self, candidate_index, query, expectation):
+        """Make sure candidates starting with the query are found, regardless of case."""
+        assert candidate_index.get_prefix_matches(query) == expectation
+
+    @pytest.mark.parametrize(('query', 'expectation'), (
+        ('', {'Coding', 'decoding', 'code review', 'meeting'}),
+        ('e', {'decoding', 'code review', 'meeting'}),
+        ('odin', {'Coding', 'decoding'}),
+        ('ding', {'Coding', 'decoding'}),
+        ('eetmee', set()),
+    ))
+    def test_get_substring_matches(self, candidate_index, query, expectation):
+        """Make sure candidates containing the query are found, regardless of case."""
+        assert candidate_index.get_substring_matches(query) == expectation
+
+    def test_get_substring_matches_ngrams_out_of_order(self, candidate_index):
+        """Make sure containing all n-grams of the query is not sufficient."""
+        candidate_index.add('abcdbcx')
+        assert candidate_index.get_substring_matches('abcx') == set()
+
+    def test_matches_are_frozen(self, candidate_index):
+        """Make sure matches returned do not change along with the index."""
+        prefix_matches = candidate_index.get_prefix_matches('cod')
+        substring_matches = candidate_index.get_substring_matches('cod')
+        candidate_index.add('codec')
+        assert isinstance(prefix_matches, frozenset)
+        assert 'codec' not in prefix_matches
+        assert isinstance(substring_matches, frozenset)
+        assert 'codec' not in substring_matches
+
+    def test_remove(self, candidate_index):
+        """Make sure a removed candidate is not found anymore."""
+        candidate_index.remove('Coding')
+        assert 'Coding' not in candidate_index
+        assert candidate_index.get_prefix_matches('cod') == {'code review'}
+        assert candidate_index.get_substring_matches('odin') == {'decoding'}
+
+    def test_remove_unknown(self, candidate_index):
+        """Make sure removing an unknown candidate raises."""
+        with pytest.raises(KeyError):
+            candidate_index.remove('foo')
+
+    def test_get_fuzzy_matches(self, candidate_index):
+        """Make sure candidates containing the query as subsequence are found."""
+        assert set(candidate_index.get_fuzzy_matches('cdg')) == {'Coding', 'decoding'}
+
+    def test_get_fuzzy_matches_exclude(self, candidate_index):
+        """Make sure excluded candidates are skipped."""
+        assert set(candidate_index.get_fuzzy_matches('cdg', exclude={'Coding'})) == {'decoding'}
+
+    def test_get_fuzzy_matches_budget(self, candidate_index, mocker):
+        """Make sure scoring stops once the budget is exceeded."""
+        for number in range(1000):
+            candidate_index.add('coding {}'.format(number))
+        mocker.patch('hamster_gtk.completion.matching._clock', side_effect=range(1000))
+        assert len(candidate_index.get_fuzzy_matches('cdg', budget=0.5)) < 1000
+
+
+class TestFuzzyScore(object):
+    """Unittests for fuzzy_score."""
+
+    @pytest.mark.parametrize(('query', 'folded'), (
+        ('xyz', 'meeting'),
+        ('gm', 'meeting'),
+        ('mxxg', 'meeting'),
+    ))
+    def test_no_match(self, query, folded):
+        """Make sure candidates not containing the query are rejected."""
+        assert fuzzy_score(query, folded) is None
+
+    def test_consecutive(self):
+        """Make sure consecutive characters score higher than scattered ones."""
+        assert fuzzy_score('cod', 'coding') > fuzzy_score('cod', 'c-o-d')
+
+    def test_boundary(self):
+        """Make sure matches at word boundaries score higher."""
+        assert fuzzy_score('r', 'code review') > fuzzy_score('r', 'coder')
+
+    def test_shortest_window(self):
+        """Make sure the best occurrence of the query is scored."""
+        assert fuzzy_score('ab', 'a---ab') == fuzzy_score('ab', 'ab')
+
+    def test_typo(self):
+        """Make sure a single typo is tolerated, but penalized."""
+        assert fuzzy_score('metting', 'meeting') is not None
+        assert fuzzy_score('metting', 'meeting') < fuzzy_score('meeting', 'meeting')
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for the completion data sources."""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+import hamster_lib
+from hamster_lib import Fact, Tag
+
+from hamster_gtk.completion import sources
+
+
+def test_get_activity_usage(config):
+    """Make sure usage is aggregated per activity/category pair."""
+    controller = hamster_lib.HamsterControl(config)
+    start = datetime.datetime(2016, 4, 1, 8)
+    for offset, raw_fact in enumerate(('foo@bar', 'foo@bar', 'baz')):
+        fact = Fact.create_from_raw_fact(raw_fact)
+        fact.start = start + datetime.timedelta(hours=2 * offset)
+        fact.end = fact.start + datetime.timedelta(hours=1)
+        controller.store.facts.save(fact)
+    end = start + datetime.timedelta(days=1)
+    result = sources.get_activity_usage(controller.store, start, end)
+    assert result == [
+        sources.ActivityUsage('baz', None, 1, start + datetime.timedelta(hours=4)),
+        sources.ActivityUsage('foo', 'bar', 2, start + datetime.timedelta(hours=2)),
+    ]
+
+
+def test_get_activity_usage_other_store(mocker, fact):
+    """Make sure stores without SQL support are handled by aggregating facts."""
+    store = mocker.MagicMock()
+    store.facts.get_all.return_value = [fact]
+    result = sources.get_activity_usage(store, fact.start, fact.end)
+    assert result == [sources.ActivityUsage(fact.activity.name, fact.category.name, 1,
+                                            fact.start)]
+
+
+def test_aggregate_activity_usage(fact_factory):
+    """Make sure facts sharing an activity are counted and the latest start is kept."""
+    fact = fact_factory()
+    later = fact_factory(activity=fact.activity, start=fact.start + datetime.timedelta(days=1))
+    other = fact_factory(start=fact.start - datetime.timedelta(days=1))
+    result = sources.aggregate_activity_usage([fact, other, later])
+    assert result == [
+        sources.ActivityUsage(fact.activity.name, fact.category.name, 2, later.start),
+        sources.ActivityUsage(other.activity.name, other.category.name, 1, other.start),
+    ]
+
+
+def test_get_tag_usage(config):
+    """Make sure usage is aggregated per tag."""
+    controller = hamster_lib.HamsterControl(config)
+    start = datetime.datetime(2016, 4, 1, 8)
+    for offset, tags in enumerate((['foo', 'bar'], ['foo'])):
+        fact = Fact.create_from_raw_fact('baz')
+        fact.tags = set([Tag(tag) for tag in tags])
+        fact.start = start + datetime.timedelta(hours=2 * offset)
+        fact.end = fact.start + datetime.timedelta(hours=1)
+        controller.store.facts.save(fact)
+    end = start + datetime.timedelta(days=1)
+    result = sources.get_tag_usage(controller.store, start, end)
+    assert result == [
+        sources.TagUsage('foo', 2, start + datetime.timedelta(hours=2)),
+        sources.TagUsage('bar', 1, start),
+    ]
+
+
+def test_get_description_usage(config):
+    """Make sure usage is aggregated per activity and description, ignoring empty ones."""
+    controller = hamster_lib.HamsterControl(config)
+    start = datetime.datetime(2016, 4, 1, 8)
+    for offset, description in enumerate(('planning', 'planning', None)):
+        fact = Fact.create_from_raw_fact('foo@bar')
+        fact.description = description
+        fact.start = start + datetime.timedelta(hours=2 * offset)
+        fact.end = fact.start + datetime.timedelta(hours=1)
+        controller.store.facts.save(fact)
+    end = start + datetime.timedelta(days=1)
+    result = sources.get_description_usage(controller.store, start, end)
+    assert result == [sources.DescriptionUsage('foo', 'bar', 'planning', 2,
+                                               start + datetime.timedelta(hours=2))]
+
+
+def test_aggregate_tag_usage(fact_factory):
+    """Make sure facts sharing a tag are counted."""
+    fact = fact_factory(tags=[Tag('foo')])
+    later = fact_factory(tags=[Tag('foo')], start=fact.start + datetime.timedelta(days=1))
+    result = sources.aggregate_tag_usage([fact, later])
+    assert result == [sources.TagUsage('foo', 2, later.start)]
+
+
+def test_aggregate_description_usage(fact_factory):
+    """Make sure facts without description are ignored."""
+    fact = fact_factory()
+    other = fact_factory(description=None)
+    result = sources.aggregate_description_usage([fact, other])
+    assert result == [sources.DescriptionUsage(fact.activity.name, fact.category.name,
+                                               fact.description, 1, fact.start)]
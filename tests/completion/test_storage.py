@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for persisting the completion index."""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+import pytest
+
+from hamster_gtk.completion import storage
+
+
+@pytest.fixture
+def snapshot(request):
+    """Return an ``IndexSnapshot`` with a few entries."""
+    now = datetime.datetime(2016, 4, 1, 12, 30)
+    return storage.IndexSnapshot('/tmp/hamster.sqlite', 1234.5, now, {
+        'activity': {'coding': [2, now], 'meeting': [1, None]},
+        ('description', 'coding@work'): {'review': [1, now]},
+    }, {'half_life': 1.0, 'scores': []})
+
+
+def test_write_read_snapshot(snapshot, tmpdir):
+    """Make sure snapshots survive a roundtrip."""
+    path = tmpdir.join('index.json').strpath
+    storage.write_snapshot(path, snapshot)
+    assert storage.read_snapshot(path) == snapshot
+
+
+@pytest.mark.parametrize('content', ('', '{"version": 0}', '{"version": 1}', 'foo'))
+def test_read_snapshot_invalid(tmpdir, content):
+    """Make sure unusable files are ignored."""
+    path = tmpdir.join('index.json')
+    path.write(content)
+    assert storage.read_snapshot(path.strpath) is None
+
+
+def test_read_snapshot_missing(tmpdir):
+    """Make sure a missing file is handled."""
+    assert storage.read_snapshot(tmpdir.join('missing.json').strpath) is None
+
+
+def test_remove_snapshot(snapshot, tmpdir):
+    """Make sure the snapshot is removed and a missing one is ignored."""
+    path = tmpdir.join('index.json').strpath
+    storage.write_snapshot(path, snapshot)
+    storage.remove_snapshot(path)
+    assert not tmpdir.join('index.json').check()
+    storage.remove_snapshot(path)
+
+
+def test_watch_commits(app, mocker):
+    """Make sure callbacks are triggered around commits of SQLAlchemy stores."""
+    before, after = mocker.MagicMock(), mocker.MagicMock()
+    assert storage.watch_commits(app.controller.store, before, after)
+    app.controller.store.session.commit()
+    assert before.called
+    assert after.called
+
+
+def test_watch_commits_other_store(mocker):
+    """Make sure other stores are not watched."""
+    assert storage.watch_commits(mocker.MagicMock(), None, None) is False
+
+
+def test_get_database_mtime(tmpdir):
+    """Make sure the modification time of sqlite files is returned."""
+    path = tmpdir.join('hamster.sqlite')
+    path.write('')
+    config = {'db_engine': 'sqlite', 'db_path': path.strpath}
+    assert storage.get_database_mtime(config) == path.mtime()
+    config['db_path'] = tmpdir.join('missing.sqlite').strpath
+    assert storage.get_database_mtime(config) is None
+
+
+def test_get_database_id():
+    """Make sure databases other than sqlite are identified by their connection details."""
+    config = {'db_engine': 'postgresql', 'db_user': 'hamster', 'db_host': 'localhost',
+              'db_port': 5432, 'db_name': 'hamster'}
+    assert storage.get_database_id(config) == 'postgresql://hamster@localhost:5432/hamster'
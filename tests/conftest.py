@@ -13,6 +13,7 @@ from hamster_lib.helpers.config_helpers import HamsterAppDirs
 from pytest_factoryboy import register
 
 from hamster_gtk import hamster_gtk
+from hamster_gtk.fact_cache import FactCache
 
 from . import factories
 
@@ -111,3 +112,9 @@ def config(request, tmpdir):
         'autocomplete_split_activity': False,
     }
     return config
+
+
+@pytest.fixture
+def fact_cache(request, config):
+    """Return an empty ``FactCache`` instance."""
+    return FactCache(config)
@@ -20,11 +20,8 @@
 
 from __future__ import absolute_import, unicode_literals
 
-from orderedset import OrderedSet
-
-from gi.repository import Gtk
-
 from hamster_gtk.misc.widgets.raw_fact_entry import RawFactCompletion
+from hamster_gtk.profiling import KeystrokeProfiler
 
 
 def test_init(app, mocker):
@@ -34,23 +31,28 @@ def test_init(app, mocker):
     assert result.get_text_column() == 0
 
 
-def test__get_stores(raw_fact_completion, activity_factory, mocker):
-    """Make sure the ``ListStore`` is populated to our expectations."""
-    raw_fact_completion._get_activities = mocker.MagicMock(
-        return_value=activity_factory.build_batch(5))
-    raw_fact_completion._populate_stores(None)
-    assert raw_fact_completion._get_activities.called
-    for key, store in raw_fact_completion.segment_models.items():
-        assert isinstance(store, Gtk.ListStore)
-        assert len(store) == 5
-
-
-def test__get_activities(app, raw_fact_completion, fact_factory, mocker):
-    """Make sure that we fetch the right activities and remove duplicates."""
-    # In reality we can not get duplicate facts but separate facts with the
-    # same ``Activity`` but this will do just fine.
-    fact_1, fact_2 = fact_factory.build_batch(2)
-    app.controller.facts.get_all = mocker.MagicMock(
-        return_value=[fact_1, fact_2, fact_1])
-    result = raw_fact_completion._get_activities()
-    assert result == OrderedSet([fact_1.activity, fact_2.activity])
+def test_update_matches(app, raw_fact_completion, mocker):
+    """Make sure the model holds exactly the matches provided by the index."""
+    app.completion_index.match = mocker.MagicMock(return_value=['foo', 'foobar'])
+    raw_fact_completion.update_matches('activity', 'foo')
+    app.completion_index.match.assert_called_with('activity', 'foo', activity=None)
+    assert [row[0] for row in raw_fact_completion.get_model()] == ['foo', 'foobar']
+
+
+def test_clear_matches(app, raw_fact_completion, mocker):
+    """Make sure all rows are removed."""
+    app.completion_index.match = mocker.MagicMock(return_value=['foo'])
+    raw_fact_completion.update_matches('activity', 'foo')
+    raw_fact_completion.clear_matches()
+    assert len(raw_fact_completion.get_model()) == 0
+
+
+def test_update_matches_profiled(app, raw_fact_completion, mocker):
+    """Make sure timings and row count are recorded if profiling is enabled."""
+    app.keystroke_profiler = KeystrokeProfiler(enabled=True)
+    app.completion_index.match = mocker.MagicMock(return_value=['foo', 'foobar'])
+    app.keystroke_profiler.begin()
+    raw_fact_completion.update_matches('activity', 'foo')
+    report = app.keystroke_profiler.get_report()
+    assert set(report) == {'lookup_time', 'model_switch_time', 'rows'}
+    assert report['rows'][50] == 2
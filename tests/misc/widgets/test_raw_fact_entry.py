@@ -20,14 +20,127 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import pytest
+
 from hamster_gtk.misc.widgets import RawFactEntry
+from hamster_gtk.misc.widgets.raw_fact_entry import RawFactSegments
+from hamster_gtk.profiling import KeystrokeProfiler
 
 
 def test_init(app):
         assert RawFactEntry(app)
 
 
-def test__on_facts_changed(raw_fact_entry):
+def test_facts_changed_keeps_completion(app, raw_fact_entry):
+        """Make sure the completion is not recreated if facts change."""
         old_completion = raw_fact_entry.get_completion()
-        raw_fact_entry._on_facts_changed(None)
-        assert raw_fact_entry.get_completion() is not old_completion
+        app.controller.signal_handler.flush()
+        app.controller.signal_handler.emit('facts-changed')
+        app.controller.signal_handler.flush()
+        assert raw_fact_entry.get_completion() is old_completion
+
+
+@pytest.mark.parametrize(('keys', 'expectation'), (
+    ({'autocomplete_split_activity'}, True),
+    ({'day_start'}, False),
+))
+def test__on_config_changed(app, raw_fact_entry, keys, expectation):
+        """Make sure the split activity setting is picked up once it changed."""
+        app._config = dict(app._config, autocomplete_split_activity=True)
+        raw_fact_entry._split_activity_autocomplete = False
+        raw_fact_entry._on_config_changed(None, frozenset(keys))
+        assert raw_fact_entry._split_activity_autocomplete is expectation
+
+
+def test__on_destroy(app, raw_fact_entry, mocker):
+        """Make sure the config handler is disconnected."""
+        raw_fact_entry._on_config_changed = mocker.MagicMock()
+        raw_fact_entry.destroy()
+        assert app.controller.signal_handler.handler_is_connected(
+            raw_fact_entry._config_handler_id) is False
+
+
+@pytest.mark.parametrize(('text', 'segment', 'expectation'), (
+    ('foo@bar #a #b', 'tags', 'b'),
+    ('foo@bar #a, desc', 'description', 'desc'),
+    ('foo@bar', 'category', 'bar'),
+))
+def test_get_segment_text(raw_fact_entry, text, segment, expectation):
+        """Make sure segment prefixes and previous tags are stripped."""
+        raw_fact_entry.set_text(text)
+        raw_fact_entry.current_segment = segment
+        assert raw_fact_entry.get_segment_text() == expectation
+
+
+@pytest.mark.parametrize(('text', 'segment', 'expectation'), (
+    ('foo@bar #a #b', 'tags', 'foo@bar #a #baz'),
+    ('foo@bar #a, d', 'description', 'foo@bar #a, desc'),
+))
+def test_replace_segment_text(raw_fact_entry, text, segment, expectation):
+        """Make sure only the currently edited tag or the description is replaced."""
+        raw_fact_entry.set_text(text)
+        raw_fact_entry.current_segment = segment
+        raw_fact_entry.replace_segment_text('baz' if segment == 'tags' else 'desc')
+        assert raw_fact_entry.get_text() == expectation
+
+
+@pytest.mark.parametrize(('text', 'expectation'), (
+    ('foo@bar #a, desc', 'foo@bar'),
+    ('foo, desc', 'foo'),
+    ('@bar', None),
+))
+def test_get_activity_text(raw_fact_entry, text, expectation):
+        """Make sure the activity entered is returned as ``activity+category`` text."""
+        raw_fact_entry.set_text(text)
+        assert raw_fact_entry.get_activity_text() == expectation
+
+
+def test__on_changed_description(app, raw_fact_entry, mocker):
+        """Make sure descriptions are suggested for the activity entered."""
+        app.completion_index.match = mocker.MagicMock(return_value=[])
+        raw_fact_entry.set_text('foo@bar, de')
+        raw_fact_entry.set_position(-1)
+        raw_fact_entry._on_changed(raw_fact_entry)
+        app.completion_index.match.assert_called_with('description', 'de', activity='foo@bar')
+
+
+def test_typing_keeps_segments(raw_fact_entry, mocker):
+        """Make sure typing and deleting within a segment does not parse the text again."""
+        raw_fact_entry.set_text('foo@bar, baz')
+        update = mocker.patch.object(raw_fact_entry.segments, 'update',
+                                     wraps=raw_fact_entry.segments.update)
+        for position, char in ((3, 'd'), (8, 'x'), (14, 'z')):
+            raw_fact_entry.set_position(position)
+            raw_fact_entry.insert_text(char, position)
+        raw_fact_entry.delete_text(1, 2)
+        text = raw_fact_entry.get_text()
+        assert text == 'fod@barx, bazz'
+        assert update.called is False
+        expectation = RawFactSegments(text)
+        for segment in ('activity', 'category', 'description'):
+            assert raw_fact_entry.segments.get_span(segment) == expectation.get_span(segment)
+
+
+def test__get_insert_position_pointer(raw_fact_entry):
+        """Make sure the cursor position is used if ``insert-text`` passes a pointer."""
+        raw_fact_entry.set_text('foo')
+        raw_fact_entry.set_position(2)
+        assert raw_fact_entry._get_insert_position(object()) == 2
+
+
+def test_replacing_text_is_one_keystroke(app, raw_fact_entry, mocker):
+        """Make sure text replaced by a single edit counts as one keystroke."""
+        app.keystroke_profiler = KeystrokeProfiler(enabled=True)
+        raw_fact_entry.set_text('foo')
+        raw_fact_entry.set_text('bar')
+        raw_fact_entry.insert_text('z', 3)
+        app.keystroke_profiler.finish()
+        assert app.keystroke_profiler._keystrokes == 3
+
+
+def test_completion_index_ready(app, raw_fact_entry, mocker):
+        """Make sure suggestions are updated once the completion index is ready."""
+        raw_fact_entry.has_focus = mocker.MagicMock(return_value=True)
+        raw_fact_entry._on_changed = mocker.MagicMock()
+        app.controller.signal_handler.emit('completion-index-ready')
+        assert raw_fact_entry._on_changed.called
@@ -0,0 +1,102 @@
+# -*- encoding: utf-8 -*-
+
+
+# This file is part of 'hamster-gtk'.
+#
+# 'hamster-gtk' is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# 'hamster-gtk' is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with 'hamster-gtk'.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Unittests for RawFactSegments."""
+
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+
+from hamster_gtk.misc.widgets.raw_fact_entry import RawFactSegments
+
+
+def get_spans(segments):
+    """Return the spans of all segments present."""
+    return {segment: segments.get_span(segment) for segment in RawFactSegments.SEGMENTS
+            if segments.get_span(segment)}
+
+
+@pytest.mark.parametrize(('text', 'expectation'), (
+    ('10:00 foo@bar #a, desc', {'timeinfo': (0, 6), 'activity': (6, 9), 'category': (9, 13),
+                                'tags': (13, 16), 'description': (16, 22)}),
+    ('foo', {'activity': (0, 3)}),
+    ('', {}),
+))
+def test_update(text, expectation):
+    """Make sure all present segments are found."""
+    assert get_spans(RawFactSegments(text)) == expectation
+
+
+@pytest.mark.parametrize(('text', 'position', 'inserted'), (
+    ('foo@bar #a, desc', 2, 'xy'),
+    ('foo@bar #a, desc', 5, 'x'),
+    ('foo@bar #a, desc', 16, ', more'),
+    ('foo@bar #a, desc', 8, 'x'),
+    ('foo@bar', 3, ' #'),
+    ('-5x foo', 2, 'y'),
+))
+def test_insert(text, position, inserted):
+    """Make sure incremental updates match parsing the new text from scratch."""
+    segments = RawFactSegments(text)
+    segments.insert(position, inserted)
+    expectation = RawFactSegments(text[:position] + inserted + text[position:])
+    assert get_spans(segments) == get_spans(expectation)
+    assert segments.text == expectation.text
+
+
+@pytest.mark.parametrize(('text', 'start', 'end'), (
+    ('foo@bar #a, desc', 1, 2),
+    ('foo@bar #ab, desc', 10, 11),
+    ('foo@bar #a, desc', 9, 10),
+    ('-5x foo', 2, 3),
+    ('foo@bar', 3, -1),
+))
+def test_delete(text, start, end):
+    """Make sure incremental updates match parsing the new text from scratch."""
+    segments = RawFactSegments(text)
+    segments.delete(start, end)
+    expectation = RawFactSegments(text[:start] + (text[end:] if end >= 0 else ''))
+    assert get_spans(segments) == get_spans(expectation)
+
+
+def test_insert_shifts(mocker):
+    """Make sure inserting letters within a segment does not parse the text again."""
+    segments = RawFactSegments('foo@bar #a, desc')
+    segments.update = mocker.MagicMock()
+    segments.insert(5, 'xy')
+    assert segments.update.called is False
+    assert segments.get_span('tags') == (9, 12)
+
+
+@pytest.mark.parametrize(('position', 'split', 'expectation'), (
+    (0, False, 'activity+category'),
+    (3, True, 'category'),
+    (3, False, 'activity+category'),
+    (7, True, 'category'),
+    (10, True, 'description'),
+    (12, True, 'description'),
+))
+def test_get_segment_at(position, split, expectation):
+    """Make sure segment boundaries are resolved as expected."""
+    segments = RawFactSegments('foo@bar #a, desc')
+    assert segments.get_segment_at(position, split) == expectation
+
+
+def test_get_text_activity_category():
+    """Make sure ``activity+category`` spans both segments."""
+    assert RawFactSegments('foo@bar #a').get_text('activity+category') == 'foo@bar'
@@ -5,7 +5,6 @@
 from __future__ import absolute_import, unicode_literals
 
 import datetime
-import random
 
 import pytest
 
@@ -37,6 +36,12 @@ def fact_list_box(request, app, set_of_facts):
     return widgets.fact_grid.FactListBox(app.controller, set_of_facts)
 
 
+@pytest.fixture
+def fact_tree_view(request, app, set_of_facts):
+    """Return a FactTreeView with random facts, all listed for today."""
+    return widgets.fact_grid.FactTreeView(app.controller, {datetime.date.today(): set_of_facts})
+
+
 @pytest.fixture
 def factlist_row(request, fact):
     """Return a plain FactListRow instance."""
@@ -57,25 +62,6 @@ def overview_dialog(main_window, app):
 # Data
 
 
-@pytest.fixture
-def bar_chart_data(request):
-    """
-    Return a (value, max_value) tuple suitable to instantiate a BarChart.
-
-    The value is randomized. BarChart widgets also expect a max_value that
-    establishes the baseline (100%) for the chart. This fixtures provides such
-    a value that makes sure that in effect the value is is in between 5% - 100%
-    of that max value.
-    """
-    value = random.randrange(1, 100)
-    # In case value is max value for the total set
-    minimal_max_value = value
-    # Value is at least 5% of the max value for total set
-    maximal_max_value = 20 * value
-    max_value = random.randrange(minimal_max_value, maximal_max_value)
-    return (value, max_value)
-
-
 @pytest.fixture
 def category_highest_totals(request, faker):
     """Provide a list of timedeltas representing highest category totals."""
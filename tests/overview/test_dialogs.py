@@ -1,33 +1,162 @@
 # -*- coding: utf-8 -*-
 
 
+import datetime
+
 import pytest
 
+from hamster_gtk.overview.dialogs.overview_dialog import (LARGE_FACT_LIST_THRESHOLD,
+                                                         FactGroups)
+
 
 class TestOverviewDialog(object):
     """Unittests for the overview dialog."""
 
-    def test__get_facts(self, overview_dialog, mocker):
-        """Make sure that daterange is considered when fetching facts."""
-        overview_dialog._app.store.facts.get_all = mocker.MagicMock()
-        overview_dialog._get_facts()
-        assert overview_dialog._app.store.facts.get_all.called_with(*overview_dialog._daterange)
+    def test_refresh(self, overview_dialog, mocker):
+        """Make sure facts are loaded by the background worker."""
+        overview_dialog._app.worker.submit = mocker.MagicMock()
+        old_load_id = overview_dialog._load_id
+        overview_dialog.refresh()
+        assert overview_dialog._load_id == old_load_id + 1
+        assert overview_dialog._app.worker.submit.called
+
+    @pytest.mark.parametrize(('keys', 'expectation'), (
+        ({'day_start'}, True),
+        ({'db_engine', 'db_path'}, True),
+        ({'autocomplete_split_activity'}, False),
+    ))
+    def test__on_config_changed(self, overview_dialog, keys, expectation, mocker):
+        """Make sure facts are only loaded again if their grouping or database changed."""
+        overview_dialog.refresh = mocker.MagicMock()
+        overview_dialog._on_config_changed(None, frozenset(keys))
+        assert overview_dialog.refresh.called is expectation
+
+    def test__load_facts(self, overview_dialog, app, fact_factory, mocker):
+        """Make sure facts are fetched for the given daterange and grouped."""
+        facts = fact_factory.build_batch(3)
+        controller = mocker.MagicMock()
+        app.fact_cache.get_facts = mocker.MagicMock(return_value=facts)
+        daterange = overview_dialog._daterange
+        result = overview_dialog._load_facts(controller, daterange)
+        app.fact_cache.get_facts.assert_called_with(controller.store, *daterange)
+        assert isinstance(result, FactGroups)
+        assert result.facts == facts
+
+    def test__on_facts_loaded(self, overview_dialog, fact_factory, mocker):
+        """Make sure the most recent result gets drawn."""
+        overview_dialog._draw = mocker.MagicMock()
+        facts = fact_factory.build_batch(3)
+        overview_dialog._on_facts_loaded(overview_dialog._load_id, FactGroups(facts), None)
+        assert overview_dialog._facts == facts
+        assert overview_dialog._loading is False
+        assert overview_dialog._draw.called
+
+    def test__on_facts_loaded_outdated(self, overview_dialog, mocker):
+        """Make sure that results of a superseded load are discarded."""
+        overview_dialog._draw = mocker.MagicMock()
+        overview_dialog._on_facts_loaded(overview_dialog._load_id - 1, mocker.MagicMock(), None)
+        assert overview_dialog._draw.called is False
 
     @pytest.mark.parametrize('exception', (TypeError, ValueError))
-    def test__get_facts_handled_exception(self, overview_dialog, exception, mocker):
+    def test__on_facts_loaded_handled_exception(self, overview_dialog, exception, mocker):
         """Make sure that we show error dialog if we encounter an expected exception."""
-        overview_dialog._app.store.facts.get_all = mocker.MagicMock(side_effect=exception)
+        overview_dialog._draw = mocker.MagicMock()
         show_error = mocker.patch(
             'hamster_gtk.overview.dialogs.overview_dialog.helpers.show_error')
-        result = overview_dialog._get_facts()
-        assert result is None
+        overview_dialog._on_facts_loaded(overview_dialog._load_id, None, exception())
         assert show_error.called
+        assert overview_dialog._facts == []
+
+    def test__on_facts_loaded_unexpected_exception(self, overview_dialog, mocker):
+        """Make sure an unexpected error is shown and the spinner replaced."""
+        show_error = mocker.patch(
+            'hamster_gtk.overview.dialogs.overview_dialog.helpers.show_error')
+        overview_dialog._on_facts_loaded(overview_dialog._load_id, None, KeyError())
+        assert show_error.called
+        assert overview_dialog._facts == []
+        assert overview_dialog._stack.get_visible_child_name() == 'content'
+
+    def test__apply_fact_change_added(self, overview_dialog, fact_factory, mocker):
+        """Make sure an added fact within the daterange is grouped without reloading."""
+        overview_dialog._draw = mocker.MagicMock()
+        overview_dialog.refresh = mocker.MagicMock()
+        overview_dialog._on_facts_loaded(overview_dialog._load_id, FactGroups(), None)
+        start, end = overview_dialog._daterange
+        fact_start = datetime.datetime.combine(start, datetime.time(12, 0))
+        fact = fact_factory.build(start=fact_start)
+        overview_dialog._apply_fact_change(new_fact=fact)
+        assert overview_dialog._facts == [fact]
+        assert overview_dialog.refresh.called is False
+        overview_dialog._draw.assert_called_once_with({fact.date})
+
+    def test__apply_fact_change_moved_out(self, overview_dialog, fact_factory, mocker):
+        """Make sure only the section of the date a fact has been moved from is redrawn."""
+        start, end = overview_dialog._daterange
+        old_fact = fact_factory.build(pk=1, start=datetime.datetime.combine(
+            start, datetime.time(12, 0)))
+        new_fact = fact_factory.build(pk=1, start=datetime.datetime.combine(
+            start - datetime.timedelta(days=3), datetime.time(12, 0)))
+        overview_dialog._on_facts_loaded(overview_dialog._load_id,
+            FactGroups([old_fact, fact_factory.build(pk=2)]), None)
+        overview_dialog.factlist.update_sections = mocker.MagicMock()
+        overview_dialog._apply_fact_change(old_fact, new_fact)
+        overview_dialog.factlist.update_sections.assert_called_once_with(
+            overview_dialog._grouped_facts.by_date, {old_fact.date})
+
+    def test__apply_fact_change_outside_daterange(self, overview_dialog, fact_factory, mocker):
+        """Make sure facts outside the daterange are ignored."""
+        overview_dialog._draw = mocker.MagicMock()
+        overview_dialog._on_facts_loaded(overview_dialog._load_id, FactGroups(), None)
+        start, end = overview_dialog._daterange
+        fact_start = datetime.datetime.combine(start - datetime.timedelta(days=3),
+                                               datetime.time(12, 0))
+        overview_dialog._apply_fact_change(new_fact=fact_factory.build(start=fact_start))
+        assert overview_dialog._facts == []
 
-    def test__get_facts_unhandled_exception(self, overview_dialog, mocker):
-        """Make sure that we do not intercept unexpected exceptions."""
-        overview_dialog._app.store.facts.get_all = mocker.MagicMock(side_effect=Exception)
-        with pytest.raises(Exception):
-            overview_dialog._get_facts()
+    def test__apply_fact_change_while_loading(self, overview_dialog, fact, mocker):
+        """Make sure we start over if facts are still being loaded."""
+        overview_dialog.refresh = mocker.MagicMock()
+        overview_dialog._loading = True
+        overview_dialog._apply_fact_change(new_fact=fact)
+        assert overview_dialog.refresh.called
+
+    @pytest.mark.parametrize(('amount', 'expectation'), (
+        (0, 'FactGrid'),
+        (LARGE_FACT_LIST_THRESHOLD + 1, 'FactTreeView'),
+    ))
+    def test__get_fact_list(self, overview_dialog, fact_factory, amount, expectation):
+        """Make sure large amounts of facts are listed by a ``FactTreeView``."""
+        overview_dialog._set_groups(FactGroups(fact_factory.build_batch(amount)))
+        result = overview_dialog._get_fact_list()
+        assert type(result).__name__ == expectation
+
+    def test__draw_updates_fact_list(self, overview_dialog, fact_factory):
+        """Make sure the fact list widget is updated instead of rebuilt."""
+        overview_dialog._set_groups(FactGroups(fact_factory.build_batch(2)))
+        overview_dialog._draw()
+        factlist = overview_dialog.factlist
+        overview_dialog._groups.add(fact_factory())
+        overview_dialog._draw()
+        assert overview_dialog.factlist is factlist
+        assert overview_dialog._stack.get_visible_child_name() == 'content'
+
+    def test__draw_new_daterange(self, overview_dialog, fact_factory):
+        """Make sure a new daterange is listed by a new, progressively built fact grid."""
+        overview_dialog._set_groups(FactGroups(fact_factory.build_batch(2)))
+        overview_dialog._draw()
+        factlist = overview_dialog.factlist
+        start, end = overview_dialog._daterange
+        overview_dialog._daterange = (start - datetime.timedelta(days=7), start)
+        overview_dialog._draw()
+        assert overview_dialog.factlist is not factlist
+        assert type(overview_dialog.factlist).__name__ == 'FactGrid'
+
+    def test__show_spinner_same_daterange(self, overview_dialog, fact_factory):
+        """Make sure reloading the shown daterange keeps the current widgets visible."""
+        overview_dialog._set_groups(FactGroups(fact_factory.build_batch(2)))
+        overview_dialog._draw()
+        overview_dialog._show_spinner()
+        assert overview_dialog._stack.get_visible_child_name() == 'content'
 
     # [FIXME]
     # It is probably good to also have a more comprehensive test that actually
@@ -37,7 +166,7 @@ class TestOverviewDialog(object):
         ('ical', 'hamster_gtk.overview.dialogs.overview_dialog.reports.ICALWriter'),
         ('xml', 'hamster_gtk.overview.dialogs.overview_dialog.reports.XMLWriter')
     ))
-    def test__export_facts(self, overview_dialog, tmpdir, mocker, format_writer):
+    def test__export_facts(self, overview_dialog, tmpdir, mocker, format_writer, fact_factory):
         """
         Make sure the proper report class is instantiated and writter.
 
@@ -46,8 +175,72 @@ class TestOverviewDialog(object):
         """
         target_format, writer = format_writer
         writer = mocker.patch(writer)
-        overview_dialog._get_facts = mocker.MagicMock(return_value={})
+        facts = fact_factory.build_batch(2)
+        overview_dialog._set_groups(FactGroups(facts))
         result = overview_dialog._export_facts(target_format, tmpdir.strpath)
         assert result is None
-        assert writer.called
-        assert overview_dialog._get_facts.called
+        writer.return_value.write_report.assert_called_once_with(facts)
+
+
+class TestFactGroups(object):
+    """Unittests for the incremental fact aggregation."""
+
+    def test_init(self, set_of_facts):
+        """Make sure initial facts are grouped and totaled."""
+        result = FactGroups(set_of_facts)
+        assert result.facts == set_of_facts
+        for fact in set_of_facts:
+            assert fact in result.grouped_facts.by_date[fact.date]
+            assert fact in result.grouped_facts.by_activity[fact.activity]
+        assert sum(result.totals.date.values(), datetime.timedelta()) == sum(
+            [fact.delta for fact in set_of_facts], datetime.timedelta())
+
+    def test_add(self, fact):
+        """Make sure an added fact is part of all its groups."""
+        groups = FactGroups()
+        groups.add(fact)
+        assert groups.grouped_facts.by_category[fact.category] == [fact]
+        assert groups.totals.activity[fact.activity] == fact.delta
+
+    def test_remove(self, fact_factory):
+        """Make sure totals are adjusted and empty groups dropped."""
+        fact_1 = fact_factory.build(pk=1)
+        fact_2 = fact_factory.build(pk=2)
+        groups = FactGroups([fact_1, fact_2])
+        groups.remove(fact_1)
+        assert groups.facts == [fact_2]
+        assert fact_1 not in groups.grouped_facts.by_date.get(fact_1.date, [])
+        assert fact_1.activity not in groups.totals.activity
+
+    def test_update_keeps_order(self, fact_factory):
+        """Make sure an updated fact is listed according to its new start."""
+        start = datetime.datetime(2016, 4, 1, 8)
+        facts = [fact_factory.build(pk=pk, start=start + datetime.timedelta(hours=pk),
+                                    end=start + datetime.timedelta(hours=pk, minutes=30))
+                 for pk in range(1, 4)]
+        groups = FactGroups(facts)
+        new_fact = fact_factory.build(pk=3, start=start,
+                                      end=start + datetime.timedelta(minutes=30))
+        groups.update(facts[2], new_fact)
+        assert groups.grouped_facts.by_date[new_fact.date] == [new_fact, facts[0], facts[1]]
+
+    def test_remove_without_pk(self, fact_factory):
+        """Make sure facts without a PK are identified by the instance itself."""
+        fact = fact_factory.build(pk=None)
+        groups = FactGroups([fact])
+        assert groups.remove(fact) is fact
+        assert len(groups) == 0
+
+    def test_remove_unknown_fact(self, fact):
+        """Make sure removing a fact that is not present raises."""
+        with pytest.raises(KeyError):
+            FactGroups().remove(fact)
+
+    def test_update(self, fact_factory):
+        """Make sure a fact is matched by its PK when updated."""
+        old_fact = fact_factory.build(pk=1)
+        new_fact = fact_factory.build(pk=1)
+        groups = FactGroups([old_fact])
+        groups.update(old_fact, new_fact)
+        assert groups.facts == [new_fact]
+        assert new_fact.activity in groups.totals.activity
@@ -18,6 +18,56 @@ class TestFactGrid(object):
         fact_grid = widgets.FactGrid(app.controller, {})
         assert fact_grid
 
+    def test_init_progressive(self, app, fact_factory, mocker):
+        """Make sure only the first rows are added right away."""
+        run_in_idle = mocker.patch('hamster_gtk.overview.widgets.fact_grid.helpers.run_in_idle')
+        mocker.patch.object(widgets.FactGrid, 'INITIAL_ROWS', 2)
+        fact_grid = widgets.FactGrid(app.controller, {datetime.date.today():
+            fact_factory.build_batch(5)}, progressive=True)
+        fact_list = fact_grid.get_child_at(1, 0)
+        assert len(fact_list.get_children()) == 2
+        builder = run_in_idle.call_args[0][0]
+        list(builder)
+        assert len(fact_list.get_children()) == 5
+
+    def test_cancel(self, app, fact_factory, mocker):
+        """Make sure a pending progressive build is stopped."""
+        mocker.patch('hamster_gtk.overview.widgets.fact_grid.helpers.run_in_idle',
+                     return_value=42)
+        source_remove = mocker.patch('hamster_gtk.overview.widgets.fact_grid.GLib.source_remove')
+        mocker.patch.object(widgets.FactGrid, 'INITIAL_ROWS', 1)
+        fact_grid = widgets.FactGrid(app.controller, {datetime.date.today():
+            fact_factory.build_batch(3)}, progressive=True)
+        fact_grid.cancel()
+        source_remove.assert_called_once_with(42)
+
+    def test_update(self, app, fact_factory):
+        """Make sure sections are inserted and removed while others are kept."""
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        fact_grid = widgets.FactGrid(app.controller, {today: [fact_factory()]})
+        today_list = fact_grid.get_child_at(1, 0)
+        fact_grid.update({yesterday: [fact_factory()], today: [fact_factory()]})
+        assert fact_grid.get_child_at(1, 0) is today_list
+        assert fact_grid._dates == [today, yesterday]
+        fact_grid.update({yesterday: [fact_factory()]})
+        assert fact_grid._dates == [yesterday]
+        assert today not in fact_grid._fact_lists
+
+    def test_update_sections(self, app, fact_factory, mocker):
+        """Make sure only sections of the given dates are touched."""
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        before = yesterday - datetime.timedelta(days=1)
+        fact_grid = widgets.FactGrid(app.controller, {today: [fact_factory()],
+                                                      before: [fact_factory()]})
+        today_list = fact_grid._fact_lists[today]
+        today_list.update = mocker.MagicMock()
+        fact_grid.update_sections({yesterday: [fact_factory()]}, {yesterday, before})
+        assert fact_grid._dates == [today, yesterday]
+        assert fact_grid.get_child_at(1, 0) is today_list
+        assert today_list.update.called is False
+
     def test__get_date_widget(self, fact_grid):
         """Make sure expected label is returned."""
         result = fact_grid._get_date_widget(datetime.date.today())
@@ -38,6 +88,35 @@ class TestFactListBox(object):
         assert isinstance(result, widgets.fact_grid.FactListBox)
         assert len(result.get_children()) == len(set_of_facts)
 
+    def test_update(self, app, fact_factory):
+        """Make sure only rows of changed facts are replaced."""
+        kept, changed, removed = [fact_factory(pk=pk) for pk in (1, 2, 3)]
+        fact_list_box = widgets.fact_grid.FactListBox(app.controller, [kept, changed, removed])
+        kept_row = fact_list_box.get_row_at_index(0)
+        new = fact_factory(pk=4)
+        changed_copy = fact_factory(pk=2)
+        fact_list_box.update([kept, changed_copy, new])
+        assert fact_list_box.get_row_at_index(0) is kept_row
+        assert [row.fact for row in fact_list_box.get_children()] == [kept, changed_copy, new]
+
+    def test_update_keeps_following_rows(self, app, fact_factory):
+        """Make sure inserting or removing a fact keeps the rows of all others."""
+        first, second, third = [fact_factory(pk=pk) for pk in (1, 2, 3)]
+        fact_list_box = widgets.fact_grid.FactListBox(app.controller, [first, third])
+        rows = fact_list_box.get_children()
+        fact_list_box.update([first, second, third])
+        assert fact_list_box.get_row_at_index(2) is rows[1]
+        fact_list_box.update([second, third])
+        assert fact_list_box.get_row_at_index(1) is rows[1]
+
+    def test_update_reorders_rows(self, app, fact_factory):
+        """Make sure rows of facts that just moved are kept."""
+        first, second = [fact_factory(pk=pk) for pk in (1, 2)]
+        fact_list_box = widgets.fact_grid.FactListBox(app.controller, [first, second])
+        rows = fact_list_box.get_children()
+        fact_list_box.update([second, first])
+        assert fact_list_box.get_children() == [rows[1], rows[0]]
+
     def test__on_activate_reject(self, fact_list_box, fact, mocker):
         """Make sure an edit dialog is created, processed and then destroyed."""
         fact_list_box.get_toplevel = Gtk.Window
@@ -60,14 +139,23 @@ class TestFactListBox(object):
         fact_list_box._on_activate(None, row)
         assert fact_list_box._update_fact.called
 
+    def test__update_fact(self, fact_list_box, fact_factory, mocker):
+        """Make sure that ``fact-updated`` signal is emitted with old and new fact."""
+        old_fact, new_fact = fact_factory.build_batch(2)
+        fact_list_box._controller.store.facts.save = mocker.MagicMock(return_value=new_fact)
+        fact_list_box._controller.signal_handler.emit = mocker.MagicMock()
+        fact_list_box._update_fact(old_fact, new_fact)
+        fact_list_box._controller.signal_handler.emit.assert_called_with(
+            'fact-updated', old_fact, new_fact)
+
     def test__delete_fact(self, request, fact_list_box, fact, mocker):
-        """Make sure that ``facts-changed`` signal is emitted."""
+        """Make sure that ``fact-removed`` signal is emitted."""
         fact_list_box._controller.store.facts.remove = mocker.MagicMock()
-        fact_list_box.emit = mocker.MagicMock()
+        fact_list_box._controller.signal_handler.emit = mocker.MagicMock()
         result = fact_list_box._delete_fact(fact)
         assert fact_list_box._controller.store.facts.remove.called
         assert result is result
-        assert fact_list_box.emit.called_with('facts-changed')
+        fact_list_box._controller.signal_handler.emit.assert_called_with('fact-removed', fact)
 
     @pytest.mark.parametrize('exception', (KeyError, ValueError))
     def test__delete_fact_expected_exception(self, request, fact_list_box, exception, fact,
@@ -88,6 +176,74 @@ class TestFactListBox(object):
             fact_list_box._on_cancel_button(fact)
 
 
+class TestFactTreeView(object):
+    """Unittests for FactTreeView."""
+
+    def test_init(self, app, fact_factory):
+        """Make sure there is a section row per date holding its facts."""
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        result = widgets.FactTreeView(app.controller, {
+            yesterday: fact_factory.build_batch(2),
+            today: fact_factory.build_batch(3),
+        })
+        store = result.get_model()
+        assert [row[0] for row in store] == [today, yesterday]
+        assert [len(list(row.iterchildren())) for row in store] == [3, 2]
+
+    def test_update(self, app, fact_factory):
+        """Make sure sections and rows get reconciled with new facts."""
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        kept = fact_factory(pk=1, start=datetime.datetime.combine(today, datetime.time(8)))
+        removed = fact_factory(pk=2, start=datetime.datetime.combine(today, datetime.time(9)))
+        tree_view = widgets.FactTreeView(app.controller, {today: [kept, removed]})
+        added = fact_factory(pk=3)
+        tree_view.update({today: [kept], yesterday: [added]})
+        store = tree_view.get_model()
+        assert [row[0] for row in store] == [today, yesterday]
+        assert [child[0] for child in store[0].iterchildren()] == [kept]
+        assert [child[0] for child in store[1].iterchildren()] == [added]
+
+    def test_update_sections(self, app, fact_factory):
+        """Make sure only sections of the given dates are touched."""
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        before = yesterday - datetime.timedelta(days=1)
+        kept = fact_factory(pk=1)
+        tree_view = widgets.FactTreeView(app.controller, {today: [kept],
+                                                          before: [fact_factory(pk=2)]})
+        added = fact_factory(pk=3)
+        tree_view.update_sections({yesterday: [added]}, {yesterday, before})
+        store = tree_view.get_model()
+        assert [row[0] for row in store] == [today, yesterday]
+        assert [child[0] for child in store[0].iterchildren()] == [kept]
+        assert [child[0] for child in store[1].iterchildren()] == [added]
+
+    def test__get_fact_markup(self, fact_tree_view, fact):
+        """Make sure activity, tags and description are included."""
+        result = fact_tree_view._get_fact_markup(fact)
+        assert fact.activity.name in result
+        for tag in fact.tags:
+            assert tag.name in result
+
+    def test__on_row_activated_date(self, fact_tree_view, mocker):
+        """Make sure activating a section header does not open an edit dialog."""
+        dialog = mocker.patch('hamster_gtk.overview.widgets.fact_grid.EditFactDialog')
+        fact_tree_view._on_row_activated(fact_tree_view, Gtk.TreePath.new_first(), None)
+        assert dialog.called is False
+
+    def test__on_row_activated_apply(self, fact_tree_view, mocker):
+        """Make sure an edit dialog is created, processed and then destroyed."""
+        fact_tree_view.get_toplevel = Gtk.Window
+        mocker.patch('hamster_gtk.overview.widgets.fact_grid.EditFactDialog.run',
+                     return_value=Gtk.ResponseType.APPLY)
+        fact_tree_view._update_fact = mocker.MagicMock()
+        fact_tree_view._on_row_activated(fact_tree_view, Gtk.TreePath.new_from_string('0:0'),
+                                         None)
+        assert fact_tree_view._update_fact.called
+
+
 class TestFactListRow(object):
     """Unittests for FactListRow."""
 
@@ -162,22 +318,59 @@ class TestCharts(object):
     def test__get_barcharts(self, charts, totals):
         """Make sure widget matches expectations."""
         result = charts._get_barcharts(totals.category)
-        assert isinstance(result, Gtk.Grid)
-        # Each category will trigger adding 3 children.
-        assert len(result.get_children()) == 3 * len(totals.category)
+        assert isinstance(result, widgets.charts.BarChartColumn)
+        assert len(result._rows) == len(totals.category)
 
+    def test_update(self, charts, totals):
+        """Make sure the existing columns are updated."""
+        column = charts.get_child_at(1, 1)
+        charts.update(totals._replace(activity=totals.category))
+        assert charts.get_child_at(1, 1) is column
+        assert len(column._rows) == len(totals.category)
 
-class TestHorizontalBarChart(object):
-    """Unittests for HorizontalBarChart."""
 
-    # [FIXME]
-    # Figure out a way to test the draw function properly.
+class TestBarChartColumn(object):
+    """Unittests for BarChartColumn."""
 
-    def test_init(self, bar_chart_data):
-        """Make sure instance matches expectations."""
-        value, max_value = bar_chart_data
-        result = widgets.charts.HorizontalBarChart(value, max_value)
-        assert isinstance(result, widgets.charts.HorizontalBarChart)
+    def test_init(self, totals):
+        """Make sure rows are ordered by descending delta."""
+        result = widgets.charts.BarChartColumn(totals.category)
+        seconds = [row[1] for row in result._rows]
+        assert seconds == sorted(seconds, reverse=True)
+
+    def test_init_empty(self):
+        """Make sure empty totals are handled."""
+        result = widgets.charts.BarChartColumn([])
+        assert result._rows == []
+
+    @pytest.mark.parametrize(('top', 'bottom', 'expectation'), (
+        (0, 1, [0]),
+        (0, 50, [0, 1]),
+        (30, 51, [1, 2]),
+        (0, 1000, [0, 1, 2, 3, 4]),
+    ))
+    def test__get_visible_rows(self, totals, top, bottom, expectation):
+        """Make sure only rows intersecting the given area are considered."""
+        column = widgets.charts.BarChartColumn(totals.category)
+        assert list(column._get_visible_rows(top, bottom)) == expectation
+
+    def test__on_draw(self, totals, mocker):
+        """Make sure only the area to be redrawn is rendered."""
+        column = widgets.charts.BarChartColumn(totals.category)
+        column._render = mocker.MagicMock()
+        context = mocker.MagicMock()
+        context.clip_extents.return_value = (0, 30, 250, 51)
+        column._on_draw(column, context)
+        column._render.assert_called_once_with(context, column.get_allocated_width(), 30, 51)
+
+    def test__render(self, totals, mocker):
+        """Make sure only rows intersecting the given area are drawn."""
+        column = widgets.charts.BarChartColumn(totals.category)
+        mocker.patch('hamster_gtk.overview.widgets.charts.PangoCairo')
+        column._draw_text = mocker.MagicMock()
+        column._render(mocker.MagicMock(), 250, 30, 51)
+        # Label and delta of rows 1 and 2.
+        assert column._draw_text.call_count == 4
 
 
 class TestSummary(object):
@@ -188,3 +381,10 @@ class TestSummary(object):
         result = widgets.Summary(category_highest_totals)
         assert isinstance(result, widgets.Summary)
         assert len(result.get_children()) == len(category_highest_totals)
+
+    def test_update(self, category_highest_totals):
+        """Make sure labels are reused and surplus ones removed."""
+        summary = widgets.Summary(category_highest_totals)
+        labels = summary.get_children()
+        summary.update(category_highest_totals[:1])
+        assert summary.get_children() == labels[:1]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for the shared clock."""
+
+from __future__ import absolute_import, unicode_literals
+
+import subprocess
+import sys
+
+from hamster_gtk.clock import clock
+
+
+def test_clock():
+    """Make sure the clock never goes backwards."""
+    first = clock()
+    assert clock() >= first
+
+
+def test_clock_deferred_imports():
+    """Make sure the clock does not import GTK, as modules imported without it use it."""
+    script = ('import sys, hamster_gtk.clock, hamster_gtk.profiling\n'
+              'print("\\n".join(sys.modules))')
+    output = set(subprocess.check_output([sys.executable, '-c', script],
+                                         universal_newlines=True).splitlines())
+    assert 'gi' not in output
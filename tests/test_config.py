@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for the config cache."""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+
+import pytest
+
+from hamster_gtk.config import Config, ConfigCache, get_changed_keys
+
+
+@pytest.fixture
+def config_path(tmpdir):
+    """Return the path of an existing config file."""
+    path = tmpdir.join('hamster-gtk.conf')
+    path.write('foo')
+    return path.strpath
+
+
+def test_config_immutable():
+    """Make sure a config can be read but not changed."""
+    config = Config({'foo': 1})
+    assert config['foo'] == 1
+    assert config == {'foo': 1}
+    assert dict(config) == {'foo': 1}
+    with pytest.raises(TypeError):
+        config['foo'] = 2
+
+
+def test_get_changed_keys():
+    """Make sure added, removed and changed keys are returned."""
+    old = {'foo': 1, 'bar': 2, 'baz': 3}
+    new = {'foo': 1, 'bar': 4, 'qux': 5}
+    assert get_changed_keys(old, new) == {'bar', 'baz', 'qux'}
+    assert get_changed_keys(old, dict(old)) == frozenset()
+
+
+def test_get(config_path, mocker):
+    """Make sure the file is only parsed once as long as it is unchanged."""
+    cache = ConfigCache(config_path)
+    load = mocker.MagicMock(return_value={'foo': 1})
+    result = cache.get(load)
+    assert result == {'foo': 1}
+    assert isinstance(result, Config)
+    assert cache.get(load) is result
+    assert load.call_count == 1
+
+
+def test_get_changed(config_path, mocker):
+    """Make sure the file is parsed again once it changed."""
+    cache = ConfigCache(config_path)
+    cache.get(mocker.MagicMock(return_value={'foo': 1}))
+    with open(config_path, 'w') as fobj:
+        fobj.write('foobar')
+    assert cache.get(mocker.MagicMock(return_value={'foo': 2})) == {'foo': 2}
+
+
+def test_get_replaced(config_path, tmpdir, mocker):
+    """Make sure replacing the file counts as a change."""
+    cache = ConfigCache(config_path)
+    cache.get(mocker.MagicMock(return_value={'foo': 1}))
+    other_path = tmpdir.join('other.conf')
+    other_path.write('bar')
+    stat = os.stat(config_path)
+    os.utime(other_path.strpath, (stat.st_atime, stat.st_mtime))
+    os.rename(other_path.strpath, config_path)
+    assert cache.get(mocker.MagicMock(return_value={'foo': 2})) == {'foo': 2}
+
+
+def test_get_missing(tmpdir, mocker):
+    """Make sure a missing file is parsed each time, as loading it creates it."""
+    cache = ConfigCache(tmpdir.join('missing.conf').strpath)
+    load = mocker.MagicMock(return_value={'foo': 1})
+    cache.get(load)
+    cache.get(load)
+    assert load.call_count == 2
+
+
+def test_set(config_path, mocker):
+    """Make sure a config just written is used without parsing it."""
+    cache = ConfigCache(config_path)
+    cache.get(mocker.MagicMock(return_value={'foo': 1}))
+    with open(config_path, 'w') as fobj:
+        fobj.write('foobar')
+    cache.set({'foo': 2})
+    load = mocker.MagicMock()
+    assert cache.get(load) == {'foo': 2}
+    assert not load.called
+
+
+def test_invalidate(config_path, mocker):
+    """Make sure the file is parsed again after invalidation."""
+    cache = ConfigCache(config_path)
+    load = mocker.MagicMock(return_value={'foo': 1})
+    cache.get(load)
+    cache.invalidate()
+    cache.get(load)
+    assert load.call_count == 2
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for the fact cache."""
+
+from __future__ import absolute_import, unicode_literals
+
+import datetime
+
+import pytest
+
+from hamster_gtk.fact_cache import FactCache
+
+
+def test_get_facts(fact_cache, fact_factory, mocker):
+    """Make sure facts are bucketed by their (work) day and filtered by range."""
+    day = datetime.date(2016, 4, 1)
+    start = datetime.datetime(2016, 4, 1, 12, 0)
+    fact_1 = fact_factory.build(start=start, end=start + datetime.timedelta(hours=1))
+    # Ends after the daterange is over.
+    fact_2 = fact_factory.build(start=start, end=start + datetime.timedelta(days=1))
+    store = mocker.MagicMock()
+    store.facts._get_all.return_value = [fact_1, fact_2]
+    assert fact_cache.get_facts(store, day, day) == [fact_1]
+    assert fact_cache.get_facts(store, day, day + datetime.timedelta(days=1)) == [fact_1, fact_2]
+
+
+def test_get_facts_cached(fact_cache, mocker):
+    """Make sure cached days are not queried again."""
+    store = mocker.MagicMock()
+    store.facts._get_all.return_value = []
+    day = datetime.date(2016, 4, 1)
+    fact_cache.get_facts(store, day, day + datetime.timedelta(days=2))
+    fact_cache.get_facts(store, day, day + datetime.timedelta(days=2))
+    assert store.facts._get_all.call_count == 1
+
+
+def test_get_facts_missing_runs(fact_cache, mocker):
+    """Make sure only uncached days are queried, one query per consecutive run."""
+    store = mocker.MagicMock()
+    store.facts._get_all.return_value = []
+    day = datetime.date(2016, 4, 10)
+    fact_cache.get_facts(store, day, day)
+    store.facts._get_all.reset_mock()
+    fact_cache.get_facts(store, day - datetime.timedelta(days=2),
+                         day + datetime.timedelta(days=2))
+    assert store.facts._get_all.call_count == 2
+
+
+@pytest.mark.parametrize(('start', 'end', 'exception'), (
+    (datetime.date(2016, 4, 2), datetime.date(2016, 4, 1), ValueError),
+    (None, datetime.date(2016, 4, 1), TypeError),
+    (datetime.datetime(2016, 4, 1, 10), datetime.date(2016, 4, 1), TypeError),
+))
+def test_get_facts_invalid_range(fact_cache, mocker, start, end, exception):
+    """Make sure invalid dateranges raise the same errors the backend does."""
+    with pytest.raises(exception):
+        fact_cache.get_facts(mocker.MagicMock(), start, end)
+
+
+def test_lru_eviction(config, mocker):
+    """Make sure the least recently used days are dropped first."""
+    fact_cache = FactCache(config, size=2)
+    store = mocker.MagicMock()
+    store.facts._get_all.return_value = []
+    day_1, day_2, day_3 = [datetime.date(2016, 4, day) for day in (1, 2, 3)]
+    fact_cache.get_facts(store, day_1, day_1)
+    fact_cache.get_facts(store, day_2, day_2)
+    fact_cache.get_facts(store, day_1, day_1)
+    fact_cache.get_facts(store, day_3, day_3)
+    assert list(fact_cache._days.keys()) == [day_1, day_3]
+
+
+def test_invalidate_fact(fact_cache, fact_factory, mocker):
+    """Make sure only the day of the given fact is invalidated."""
+    store = mocker.MagicMock()
+    store.facts._get_all.return_value = []
+    day = datetime.date(2016, 4, 1)
+    fact_cache.get_facts(store, day, day + datetime.timedelta(days=1))
+    fact = fact_factory.build(start=datetime.datetime(2016, 4, 1, 12, 0))
+    fact_cache.invalidate_fact(fact)
+    assert list(fact_cache._days.keys()) == [day + datetime.timedelta(days=1)]
+
+
+def test_get_day(fact_cache):
+    """Make sure ``day_start`` is respected when determining a facts day."""
+    assert fact_cache.get_day(datetime.datetime(2016, 4, 2, 4, 0)) == datetime.date(2016, 4, 1)
+    assert fact_cache.get_day(datetime.datetime(2016, 4, 2, 6, 0)) == datetime.date(2016, 4, 2)
@@ -5,7 +5,7 @@ from __future__ import unicode_literals
 import datetime
 import os.path
 
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
 
 import hamster_gtk.hamster_gtk as hamster_gtk
 from hamster_gtk.tracking import TrackingScreen
@@ -19,13 +19,70 @@ class TestHamsterGTK(object):
         app = hamster_gtk.HamsterGTK()
         assert app
 
+    def test__startup_registers_resources(self, app):
+        """Make sure our resource bundle is available once started up."""
+        assert hamster_gtk.resources is not None
+        hamster_gtk.register_resources()
+        assert hamster_gtk.resources is not None
+
+    def test__activate_populates_once(self, app, mocker):
+        """Make sure repeated activations do not populate the completion index again."""
+        app.window = mocker.MagicMock()
+        app.add_window = mocker.MagicMock()
+        app.worker.submit = mocker.MagicMock()
+        app._activate(app)
+        app._activate(app)
+        assert app.worker.submit.call_count == 1
+
+    def test__on_first_draw(self, app, mocker):
+        """Make sure the first draw is marked and we are not called again."""
+        app.startup_tracer = mocker.MagicMock()
+        app._draw_handler_id = 42
+        window = mocker.MagicMock()
+        assert app._on_first_draw(window, None) is False
+        window.disconnect.assert_called_with(42)
+        app.startup_tracer.mark.assert_called_with('first draw')
+
     def test__reload_config(self, app, config, mocker):
         """Make sure a config is retrieved and stored as instance attribute."""
         app._get_config_from_file = mocker.MagicMock(return_value=config)
+        app._config_cache.invalidate()
         result = app._reload_config()
         assert result == config
         assert app._config == config
 
+    def test__reload_config_unchanged(self, app, mocker):
+        """Make sure the config file is not parsed again unless it changed."""
+        config = app._config
+        app._get_config_from_file = mocker.MagicMock()
+        assert app._reload_config() is config
+        assert not app._get_config_from_file.called
+
+    def test_save_config(self, app, config, mocker):
+        """Make sure the config saved is used without parsing the file again."""
+        mocker.patch('hamster_gtk.hamster_gtk.config_helpers.write_config_file')
+        app._get_config_from_file = mocker.MagicMock()
+        app.save_config(config)
+        assert app._config == config
+        assert not app._get_config_from_file.called
+
+    def test_save_config_changed_keys(self, app, mocker):
+        """Make sure only the keys actually changed are announced."""
+        mocker.patch('hamster_gtk.hamster_gtk.config_helpers.write_config_file')
+        app.controller.signal_handler.emit = mocker.MagicMock()
+        split_activity = app._config['autocomplete_split_activity']
+        config = dict(app._config, autocomplete_split_activity=not split_activity)
+        app.save_config(config)
+        app.controller.signal_handler.emit.assert_called_once_with(
+            'config-changed', frozenset(['autocomplete_split_activity']))
+
+    def test_save_config_unchanged(self, app, mocker):
+        """Make sure nothing is announced if the config did not change."""
+        mocker.patch('hamster_gtk.hamster_gtk.config_helpers.write_config_file')
+        app.controller.signal_handler.emit = mocker.MagicMock()
+        app.save_config(dict(app._config))
+        assert not app.controller.signal_handler.emit.called
+
     def test__get_default_config(self, app, appdirs):
         """Make sure the defaults use appdirs for relevant paths."""
         result = app._get_default_config()
@@ -63,40 +120,84 @@ class TestHamsterGTK(object):
         """Make sure the controller *and* client config is updated."""
         app._reload_config = mocker.MagicMock(return_value=config)
         app.controller.update_config = mocker.MagicMock()
-        app._config_changed(None)
+        app.worker.update_config = mocker.MagicMock()
+        app.fact_cache.update_config = mocker.MagicMock()
+        app._config_changed(None, frozenset(['db_path']))
         assert app._reload_config.called
-        assert app.controller.update_config.called_with(config)
+        app.controller.update_config.assert_called_with(config)
+        app.worker.update_config.assert_called_with(config)
+        app.fact_cache.update_config.assert_called_with(config)
+
+    def test__config_changed_day_start(self, app, config, mocker):
+        """Make sure the store is kept if the database did not change."""
+        app._reload_config = mocker.MagicMock(return_value=config)
+        app.controller.update_config = mocker.MagicMock()
+        app.fact_cache.update_config = mocker.MagicMock()
+        store = app.controller.store
+        app._config_changed(None, frozenset(['day_start']))
+        assert not app.controller.update_config.called
+        assert app.controller.store is store
+        assert store.config is config
+        app.fact_cache.update_config.assert_called_with(config)
+
+    def test__config_changed_frontend(self, app, config, mocker):
+        """Make sure the backend is left alone if only frontend settings changed."""
+        app._reload_config = mocker.MagicMock(return_value=config)
+        app.controller.update_config = mocker.MagicMock()
+        app.worker.update_config = mocker.MagicMock()
+        app.fact_cache.update_config = mocker.MagicMock()
+        app._config_changed(None, frozenset(['autocomplete_split_activity']))
+        assert not app.controller.update_config.called
+        assert not app.worker.update_config.called
+        assert not app.fact_cache.update_config.called
+
+    def test__fact_updated(self, app, fact_factory, mocker):
+        """Make sure only the days of the affected facts are invalidated."""
+        old_fact, new_fact = fact_factory.build_batch(2)
+        app.fact_cache.invalidate_fact = mocker.MagicMock()
+        app.controller.signal_handler.emit('fact-updated', old_fact, new_fact)
+        app.fact_cache.invalidate_fact.assert_any_call(old_fact)
+        app.fact_cache.invalidate_fact.assert_any_call(new_fact)
 
     def test__create_actions(self, app, mocker):
         """Test that that actions are created."""
         app.add_action = mocker.MagicMock()
         app._create_actions()
-        assert app.add_action.call_count == 4
+        assert app.add_action.call_count == 5
 
     def test__on_about_action(self, app, mocker):
         """Make sure an about dialog is created."""
-        about_class = mocker.patch('hamster_gtk.hamster_gtk.AboutDialog')
+        about_class = mocker.patch('hamster_gtk.misc.HamsterAboutDialog')
         app._on_about_action(None, None)
         assert about_class.called
         assert about_class.return_value.run.called
 
     def test__on_overview_action(self, app, mocker):
         """Make sure an overview dialog is created."""
-        overview_class = mocker.patch('hamster_gtk.hamster_gtk.OverviewDialog')
+        overview_class = mocker.patch('hamster_gtk.overview.OverviewDialog')
         app._on_overview_action(None, None)
         assert overview_class.called
         assert overview_class.return_value.run.called
 
     def test__on_preferences_action(self, app, mocker):
         """Make sure a preference dialog is created."""
-        preferences_class = mocker.patch('hamster_gtk.hamster_gtk.PreferencesDialog')
+        preferences_class = mocker.patch('hamster_gtk.preferences.PreferencesDialog')
         app._on_preferences_action(None, None)
         assert preferences_class.called
         assert preferences_class.return_value.run.called
 
+    def test__on_start_tracking_action(self, app, mocker):
+        """Make sure the raw fact passed is started within the main window."""
+        app.activate = mocker.MagicMock()
+        app.window = mocker.MagicMock()
+        app._on_start_tracking_action(None, GLib.Variant('s', 'foo@bar'))
+        assert app.activate.called
+        start_tracking_view = app.window.get_child.return_value.start_tracking_view
+        start_tracking_view.start_tracking.assert_called_with('foo@bar')
+
     def test__on_preferences_action_apply(self, app, mocker):
         """Make sure config is saved when apply is pressed in preference dialog."""
-        mocker.patch('hamster_gtk.hamster_gtk.PreferencesDialog.run',
+        mocker.patch('hamster_gtk.preferences.PreferencesDialog.run',
             return_value=Gtk.ResponseType.APPLY)
         app.save_config = mocker.MagicMock()
         app._on_preferences_action(None, None)
@@ -104,13 +205,62 @@ class TestHamsterGTK(object):
 
     def test__on_preferences_action_cancel(self, app, mocker):
         """Make sure config is not saved when cancel is pressed in preference dialog."""
-        mocker.patch('hamster_gtk.hamster_gtk.PreferencesDialog.run',
+        mocker.patch('hamster_gtk.preferences.PreferencesDialog.run',
             return_value=Gtk.ResponseType.CANCEL)
         app.save_config = mocker.MagicMock()
         app._on_preferences_action(None, None)
         assert not app.save_config.called
 
 
+class TestSignalHandler(object):
+    """Unittests for the signal handler."""
+
+    def test_emit_coalesced(self, mocker):
+        """Make sure multiple emissions of coalesced signals are delivered once."""
+        signal_handler = hamster_gtk.SignalHandler()
+        callback = mocker.MagicMock()
+        signal_handler.connect('facts-changed', callback)
+        signal_handler.emit('facts-changed')
+        signal_handler.emit('facts-changed')
+        assert callback.called is False
+        signal_handler.flush()
+        assert callback.call_count == 1
+
+    def test_emit_not_coalesced(self, fact, mocker):
+        """Make sure any other signal is delivered right away."""
+        signal_handler = hamster_gtk.SignalHandler()
+        callback = mocker.MagicMock()
+        signal_handler.connect('fact-added', callback)
+        signal_handler.emit('fact-added', fact)
+        callback.assert_called_once_with(signal_handler, fact)
+
+    def test_batch(self, mocker):
+        """Make sure coalesced signals are delivered once the outermost batch is left."""
+        signal_handler = hamster_gtk.SignalHandler()
+        facts_callback = mocker.MagicMock()
+        config_callback = mocker.MagicMock()
+        signal_handler.connect('facts-changed', facts_callback)
+        signal_handler.connect('config-changed', config_callback)
+        with signal_handler.batch():
+            with signal_handler.batch():
+                signal_handler.emit('facts-changed')
+                signal_handler.emit('config-changed', frozenset(['day_start']))
+            signal_handler.emit('facts-changed')
+            assert facts_callback.called is False
+        assert facts_callback.call_count == 1
+        assert config_callback.call_count == 1
+
+    def test_emit_coalesced_arguments(self, mocker):
+        """Make sure the changed keys of coalesced emissions are merged."""
+        signal_handler = hamster_gtk.SignalHandler()
+        callback = mocker.MagicMock()
+        signal_handler.connect('config-changed', callback)
+        signal_handler.emit('config-changed', frozenset(['day_start']))
+        signal_handler.emit('config-changed', frozenset(['db_path']))
+        signal_handler.flush()
+        callback.assert_called_once_with(signal_handler, frozenset(['day_start', 'db_path']))
+
+
 class TestMainWindow(object):
     """Unittests for the main application window."""
 
@@ -143,6 +293,6 @@ class TestHeaderBar(object):
     def test__on_overview_button(self, main_window, mocker):
         """Make sure a new overview is created if none exist."""
         bar = main_window.get_titlebar()
-        overview_class = mocker.patch('hamster_gtk.hamster_gtk.OverviewDialog')
+        overview_class = mocker.patch('hamster_gtk.overview.OverviewDialog')
         bar._on_overview_button(None)
         assert overview_class.called
@@ -23,6 +23,21 @@ def test_get_parent_window(request):
     assert helpers.get_parent_window(label) == window
 
 
+def test_run_in_idle(request, mocker):
+    """Make sure the iterable is consumed in chunks until it is exhausted."""
+    idle_add = mocker.patch('hamster_gtk.helpers.GLib.idle_add')
+    # Each chunk gets to process two items before its budget is exceeded.
+    mocker.patch('hamster_gtk.helpers._clock', side_effect=[0, 0, 1, 2, 2, 3, 4, 4])
+    consumed = []
+    helpers.run_in_idle((consumed.append(item) for item in range(3)), budget=1)
+    run_chunk = idle_add.call_args[0][0]
+    assert consumed == []
+    assert run_chunk() is True
+    assert consumed == [0, 1]
+    assert run_chunk() is False
+    assert consumed == [0, 1, 2]
+
+
 @pytest.mark.parametrize(('text', 'expectation'), [
     # Date, time and datetime
     ('2016-02-01 12:00 ',
@@ -134,6 +149,30 @@ def test_decompose_raw_fact_string(request, text, expectation):
         assert result is None
 
 
+def test_raw_fact_parser_parse(request):
+    """Make sure results are memoized."""
+    parser = helpers.RawFactParser()
+    result = parser.parse('foo@bar')
+    assert result.group('activity') == 'foo'
+    assert parser.parse('foo@bar') is result
+
+
+def test_raw_fact_parser_parse_many_tags(request):
+    """Make sure failing matches on many tags do not backtrack exponentially."""
+    text = 'foo@bar {},'.format(' '.join(['#tag{}'.format(index) for index in range(50)]))
+    assert helpers.RawFactParser().parse(text) is None
+
+
+def test_raw_fact_parser_parse_evicts_least_recently_used(request):
+    """Make sure only ``cache_size`` results are kept."""
+    parser = helpers.RawFactParser(cache_size=2)
+    parser.parse('foo')
+    parser.parse('bar')
+    parser.parse('foo')
+    parser.parse('baz')
+    assert list(parser._cache) == ['foo', 'baz']
+
+
 @pytest.mark.parametrize(('minutes', 'expectation'), (
     (1, '1 min'),
     (30, '30 min'),
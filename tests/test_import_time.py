@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Make sure importing the main module stays cheap.
+
+Dialogs and the modules only they use are imported once their action fires.
+Each test runs a fresh interpreter so that modules imported by other tests do
+not get in the way.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import subprocess
+import sys
+
+import pytest
+
+# Modules that must not be imported before their dialog is asked for.
+DEFERRED_MODULES = (
+    'hamster_gtk.overview',
+    'hamster_gtk.overview.dialogs.export_dialog',
+    'hamster_gtk.overview.widgets.charts',
+    'hamster_gtk.preferences',
+)
+# Amount of the most expensive imports listed should a test fail.
+REPORT_LENGTH = 15
+
+
+def get_import_times(module):
+    """
+    Import ``module`` in a fresh interpreter with ``-X importtime``.
+
+    Returns:
+        list: ``(cumulative, module)`` tuples, cumulative time in microseconds.
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+        stderr=subprocess.STDOUT, universal_newlines=True)
+    result = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        result.append((int(cumulative), name.strip()))
+    return result
+
+
+def format_report(import_times):
+    """Return the most expensive imports as human readable text."""
+    lines = ['{:>10} us  {}'.format(cumulative, name)
+             for cumulative, name in sorted(import_times, reverse=True)[:REPORT_LENGTH]]
+    return '\n'.join(['Most expensive imports:'] + lines)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="'-X importtime' requires python 3.7")
+def test_main_module_import_time():
+    """Make sure dialogs are not imported along with the main module."""
+    import_times = get_import_times('hamster_gtk.hamster_gtk')
+    imported = {name for cumulative, name in import_times}
+    assert 'hamster_gtk.hamster_gtk' in imported
+    assert not imported.intersection(DEFERRED_MODULES), format_report(import_times)
+
+
+def test_launcher_deferred_imports():
+    """Make sure the launcher imports neither GTK nor the backend."""
+    script = ('import sys, hamster_gtk.launcher\n'
+              'print("\\n".join(sys.modules))')
+    output = set(subprocess.check_output([sys.executable, '-c', script],
+                                         universal_newlines=True).splitlines())
+    assert not output.intersection(('gi.repository.Gtk', 'hamster_lib', 'sqlalchemy'))
+
+
+def test_main_module_deferred_imports():
+    """Make sure no deferred module ends up in ``sys.modules``, on any python version."""
+    script = ('import sys, hamster_gtk.hamster_gtk\n'
+              'print("\\n".join(sys.modules))')
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert not set(output.splitlines()).intersection(DEFERRED_MODULES)
+
+
+def test_completion_deferred_imports():
+    """Make sure the completion package leaves importing SQLAlchemy to its first query."""
+    script = ('import sys, hamster_gtk.completion\n'
+              'print("\\n".join(sys.modules))')
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert 'sqlalchemy' not in output.splitlines()
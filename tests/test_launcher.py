@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for the launcher."""
+
+from __future__ import absolute_import, unicode_literals
+
+import pytest
+
+from hamster_gtk import launcher
+
+
+@pytest.mark.parametrize(('argv', 'expectation'), (
+    ([], None),
+    (['--overview'], ('overview', None)),
+    (['--preferences'], ('preferences', None)),
+))
+def test_get_action(argv, expectation):
+    """Make sure the action asked for is returned."""
+    assert launcher.get_action(launcher.get_parser().parse_args(argv)) == expectation
+
+
+def test_get_action_start():
+    """Make sure the raw fact is passed as action parameter."""
+    name, parameter = launcher.get_action(launcher.get_parser().parse_args(['--start', 'foo@bar']))
+    assert name == 'start-tracking'
+    assert parameter.get_string() == 'foo@bar'
+
+
+def test_get_parser_exclusive():
+    """Make sure only one action can be asked for at a time."""
+    with pytest.raises(SystemExit):
+        launcher.get_parser().parse_args(['--overview', '--preferences'])
+
+
+@pytest.mark.parametrize('action', (None, ('overview', None)))
+def test_forward(action, mocker):
+    """Make sure activation or the action is forwarded to the running instance."""
+    application_class = mocker.patch.object(launcher.Gio, 'Application')
+    app = application_class.return_value
+    app.get_is_remote.return_value = True
+    assert launcher.forward(action)
+    if action:
+        app.activate_action.assert_called_with(*action)
+        assert not app.activate.called
+    else:
+        assert app.activate.called
+    assert app.get_dbus_connection.return_value.flush_sync.called
+
+
+def test_forward_primary(mocker):
+    """Make sure nothing is forwarded if there is no running instance after all."""
+    application_class = mocker.patch.object(launcher.Gio, 'Application')
+    app = application_class.return_value
+    app.get_is_remote.return_value = False
+    assert not launcher.forward()
+    assert not app.activate.called
+
+
+def test_main_running(mocker):
+    """Make sure the application itself is not started if an instance is running."""
+    mocker.patch('hamster_gtk.launcher.is_running', return_value=True)
+    forward = mocker.patch('hamster_gtk.launcher.forward', return_value=True)
+    application_class = mocker.patch('hamster_gtk.hamster_gtk.HamsterGTK')
+    assert launcher.main(['--overview']) == 0
+    forward.assert_called_with(('overview', None))
+    assert not application_class.called
+
+
+def test_main_not_running(mocker):
+    """Make sure the application is started if there is no running instance."""
+    mocker.patch('hamster_gtk.launcher.is_running', return_value=False)
+    forward = mocker.patch('hamster_gtk.launcher.forward')
+    application_class = mocker.patch('hamster_gtk.hamster_gtk.HamsterGTK')
+    application_class.return_value.run.return_value = 0
+    assert launcher.main([]) == 0
+    assert not forward.called
+    assert application_class.return_value.run.called
+
+
+def test_main_trace_startup(mocker):
+    """Make sure the application is passed a tracer if asked for."""
+    mocker.patch('hamster_gtk.launcher.is_running', return_value=False)
+    application_class = mocker.patch('hamster_gtk.hamster_gtk.HamsterGTK')
+    launcher.main(['--trace-startup'])
+    tracer = application_class.call_args[1]['startup_tracer']
+    assert tracer.enabled
+    assert tracer.path == launcher.DEFAULT_STARTUP_TRACE_PATH
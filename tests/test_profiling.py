@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""Unittests for keystroke profiling."""
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+import pytest
+
+from hamster_gtk import profiling
+from hamster_gtk.profiling import KeystrokeProfiler, StartupTracer
+
+
+@pytest.mark.parametrize(('environ', 'expectation'), (
+    ({}, False),
+    ({profiling.KEYSTROKE_PROFILING_VARIABLE: ''}, False),
+    ({profiling.KEYSTROKE_PROFILING_VARIABLE: '1'}, True),
+))
+def test_is_keystroke_profiling_enabled(environ, expectation):
+    """Make sure profiling is only enabled if the variable is set."""
+    assert profiling.is_keystroke_profiling_enabled(environ) is expectation
+
+
+@pytest.mark.parametrize(('environ', 'expectation'), (
+    ({}, None),
+    ({profiling.STARTUP_TRACE_VARIABLE: ''}, None),
+    ({profiling.STARTUP_TRACE_VARIABLE: 'trace.json'}, 'trace.json'),
+))
+def test_get_startup_trace_path(environ, expectation):
+    """Make sure the path is taken from the environment."""
+    assert profiling.get_startup_trace_path(environ) == expectation
+
+
+@pytest.mark.parametrize(('percentile', 'expectation'), (
+    (0, 1),
+    (50, 50),
+    (95, 95),
+    (99, 99),
+    (100, 100),
+))
+def test_get_percentile(percentile, expectation):
+    """Make sure the nearest rank is returned."""
+    assert profiling.get_percentile(list(range(1, 101)), percentile) == expectation
+
+
+def test_get_percentile_empty():
+    """Make sure there is no percentile of nothing."""
+    assert profiling.get_percentile([], 50) is None
+
+
+def test_disabled():
+    """Make sure nothing is recorded unless enabled."""
+    profiler = KeystrokeProfiler()
+    profiler.begin()
+    with profiler.measure('parse_time'):
+        pass
+    profiler.count('rows', 3)
+    assert profiler.get_report() == {}
+
+
+def test_get_report():
+    """Make sure each keystroke contributes one value per metric."""
+    profiler = KeystrokeProfiler(enabled=True)
+    for rows in range(1, 101):
+        profiler.begin()
+        with profiler.measure('parse_time'):
+            pass
+        with profiler.measure('parse_time'):
+            pass
+        profiler.count('rows', rows)
+    report = profiler.get_report()
+    assert list(report) == ['parse_time', 'rows']
+    assert report['rows'] == {50: 50, 95: 95, 99: 99}
+    assert all(value >= 0 for value in report['parse_time'].values())
+
+
+def test_get_report_zeros():
+    """Make sure metrics a keystroke did not trigger count as zero for it."""
+    profiler = KeystrokeProfiler(enabled=True, metrics=('rows', 'match_func_calls'))
+    for rows in (0, 0, 0, 5):
+        profiler.begin()
+        if rows:
+            profiler.count('rows', rows)
+    profiler.begin()
+    profiler.count('fuzzy_calls')
+    report = profiler.get_report()
+    assert list(report) == ['rows', 'match_func_calls', 'fuzzy_calls']
+    assert report['rows'] == {50: 0, 95: 5, 99: 5}
+    assert report['match_func_calls'] == {50: 0, 95: 0, 99: 0}
+    assert report['fuzzy_calls'] == {50: 0, 95: 1, 99: 1}
+
+
+def test_get_report_no_keystrokes():
+    """Make sure known metrics are not reported before any keystroke."""
+    profiler = KeystrokeProfiler(enabled=True, metrics=('rows',))
+    assert profiler.get_report() == {}
+
+
+def test_count_outside_keystroke():
+    """Make sure anything happening before the first keystroke is ignored."""
+    profiler = KeystrokeProfiler(enabled=True)
+    profiler.count('match_func_calls')
+    assert profiler.get_report() == {}
+
+
+def test_format_report():
+    """Make sure durations are reported in milliseconds."""
+    profiler = KeystrokeProfiler(enabled=True)
+    profiler.begin()
+    profiler.count('rows', 7)
+    profiler._keystroke['parse_time'] = 0.002
+    result = profiler.format_report()
+    assert result.startswith('Keystroke latency (1 keystrokes):')
+    assert '2.000 ms' in result
+    assert 'rows' in result
+
+
+class TestStartupTracer(object):
+    """Unittests for the startup tracer."""
+
+    def test_disabled(self):
+        """Make sure nothing is recorded or written unless enabled."""
+        tracer = StartupTracer()
+        with tracer.span('foo'):
+            pass
+        tracer.mark('bar')
+        tracer.close()
+        assert not tracer.enabled
+        assert tracer._events == []
+
+    def test_close(self, tmpdir):
+        """Make sure all events are written as chrome trace events."""
+        path = tmpdir.join('trace.json').strpath
+        tracer = StartupTracer(path)
+        with tracer.span('foo'):
+            pass
+        tracer.begin('bar')
+        tracer.end('bar')
+        tracer.mark('baz')
+        tracer.close()
+        with open(path) as fobj:
+            events = json.load(fobj)['traceEvents']
+        assert [(event['name'], event['ph']) for event in events] == [
+            ('foo', 'X'), ('bar', 'B'), ('bar', 'E'), ('baz', 'i')]
+        assert events[0]['dur'] >= 0
+        assert events[1]['ts'] <= events[2]['ts']
+        assert not tracer.enabled
+
+    def test_close_error(self, tmpdir, mocker):
+        """Make sure failing to write the trace is logged rather than raised."""
+        logger = mocker.patch('hamster_gtk.profiling.logger')
+        tracer = StartupTracer(tmpdir.join('missing', 'trace.json').strpath)
+        tracer.mark('foo')
+        tracer.close()
+        assert logger.error.called
+        assert not tracer.enabled
+
+    def test_wait_for(self, tmpdir):
+        """Make sure tracing stops once all events waited for happened."""
+        tracer = StartupTracer(tmpdir.join('trace.json').strpath)
+        tracer.wait_for('foo', 'bar')
+        tracer.mark('foo')
+        assert tracer.enabled
+        tracer.mark('bar')
+        assert not tracer.enabled
+        assert tmpdir.join('trace.json').check()
@@ -58,6 +58,23 @@ class TestStartTrackingBox(object):
         start_tracking_box._on_start_tracking_button(None)
         assert start_tracking_box._app.controller.store.facts.save.called
 
+    def test__start_ongoing_fact_fact_added(self, start_tracking_box, fact, mocker):
+        """Make sure the new *ongoing fact* is announced."""
+        start_tracking_box._app.controller.store.facts.save = mocker.MagicMock(
+            return_value=fact)
+        start_tracking_box._app.controller.signal_handler.emit = mocker.MagicMock()
+        start_tracking_box.raw_fact_entry.props.text = 'foo@bar'
+        start_tracking_box._start_ongoing_fact()
+        start_tracking_box._app.controller.signal_handler.emit.assert_called_with(
+            'fact-added', fact)
+
+    def test_start_tracking(self, start_tracking_box, mocker):
+        """Make sure the raw fact passed is started."""
+        start_tracking_box._start_ongoing_fact = mocker.MagicMock()
+        start_tracking_box.start_tracking('foo@bar')
+        assert start_tracking_box.raw_fact_entry.props.text == 'foo@bar'
+        assert start_tracking_box._start_ongoing_fact.called
+
     def test__reset(self, start_tracking_box):
         """Make sure all relevant widgets are reset."""
         start_tracking_box.raw_fact_entry.props.text = 'foobar'
@@ -111,6 +128,25 @@ class TestCurrentFactBox(object):
         assert result is None
         assert current_fact_box.emit.called_with('tracking-stopped')
 
+    def test_on_cancel_button_fact_removed(self, current_fact_box, fact, mocker):
+        """Make sure the canceled *ongoing fact* is announced as removed."""
+        current_fact_box._controller.store.facts.cancel_tmp_fact = mocker.MagicMock()
+        current_fact_box._controller.signal_handler.emit = mocker.MagicMock()
+        current_fact_box.update(fact)
+        current_fact_box._on_cancel_button(None)
+        current_fact_box._controller.signal_handler.emit.assert_called_with('fact-removed', fact)
+
+    def test_on_save_button_fact_updated(self, current_fact_box, fact_factory, mocker):
+        """Make sure the *ongoing fact* is announced as replaced by the stored fact."""
+        ongoing_fact, stored_fact = fact_factory.build_batch(2)
+        current_fact_box._controller.store.facts.stop_tmp_fact = mocker.MagicMock(
+            return_value=stored_fact)
+        current_fact_box._controller.signal_handler.emit = mocker.MagicMock()
+        current_fact_box.update(ongoing_fact)
+        current_fact_box._on_save_button(None)
+        current_fact_box._controller.signal_handler.emit.assert_called_with(
+            'fact-updated', ongoing_fact, stored_fact)
+
     def test_on_cancel_buton_expected_exception(self, request, current_fact_box, mocker):
         """Make sure that we show error dialog if we encounter an expected exception."""
         current_fact_box._controller.store.facts.cancel_tmp_fact = mocker.MagicMock(